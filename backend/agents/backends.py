@@ -0,0 +1,351 @@
+"""
+Model Backends - Pluggable providers behind both agents
+Each agent sends its calls to a ModelBackend chosen by configuration rather
+than a hard-wired client. The choices are the OpenAI API, the Hugging Face
+router, a small model run in-process on the CPU, or a deterministic stand-in.
+The agents keep memoization, retries, circuit breaking and metrics; a
+backend only turns messages into a completion (or a stream of deltas).
+
+The in-process backends batch concurrent requests. Calls that arrive while a
+generation is running are generated together as the next batch, so a burst
+of single-agent solves costs a few forward passes rather than one per
+request, and no network round trip. The local backend needs the optional
+`torch` and `transformers` packages. The stand-in answers with scripted text
+after a simulated, batch-size-dependent delay, so load tests run offline and
+reproducibly.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from agents.batching import MicroBatcher, MicroBatchSettings
+from agents.clients import ClientRegistry, get_client_registry
+from services.metrics import estimate_tokens
+
+BACKENDS = ("openai", "huggingface", "local", "standin")
+
+# Environment variable holding each remote backend's API key
+KEY_VARIABLES = {"openai": "OPENAI_API_KEY", "huggingface": "HUGGINGFACE_API_KEY"}
+
+
+class ModelSettings(BaseSettings):
+    """Backend selection, overridable with MODEL_* environment variables"""
+    model_config = SettingsConfigDict(env_prefix="MODEL_")
+
+    single_backend: str = "huggingface"  # One of BACKENDS, for the single agent
+    single_model: Optional[str] = None   # Defaults to the backend's own model
+    multi_backend: str = "openai"        # One of BACKENDS, for the debate agents
+    multi_model: Optional[str] = None
+    local_path: str = "HuggingFaceTB/SmolLM2-360M-Instruct"  # Hub id or directory for the local backend
+    local_threads: int = 0               # torch CPU threads (0 keeps torch's default)
+    standin_latency_ms: float = 0.0      # Stand-in delay per batch
+    standin_item_ms: float = 0.0         # Plus this much per request in the batch
+
+
+class Completion(NamedTuple):
+    """A generated reply and its token counts (None when the backend reports no usage)"""
+    text: str
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+
+
+class ModelBackend:
+    """Turns chat messages into a completion for one provider and model"""
+    name = "backend"  # Provider label for metrics, retries and the circuit breaker
+    batched = False   # Whether complete_batch generates a batch in one pass
+
+    def __init__(self, model: str):
+        self.model = model
+
+    async def complete(self, messages: List[dict], params: dict) -> Completion:
+        """Make one completion call; errors are raised as-is for the agent to classify"""
+        raise NotImplementedError
+
+    def stream(self, messages: List[dict], params: dict) -> AsyncIterator[str]:
+        """Make one streaming call, yielding text deltas"""
+        raise NotImplementedError
+
+    async def complete_batch(self, batch: List[List[dict]], params: dict) -> List[Union[Completion, Exception]]:
+        """Complete several conversations; by default they go out as parallel calls, each failing on its own"""
+        return await asyncio.gather(*(self.complete(messages, params) for messages in batch), return_exceptions=True)
+
+    async def warm_up(self):
+        """Do the one-off work the first call would otherwise pay for (by default there is none)"""
+
+
+class OpenAIBackend(ModelBackend):
+    """The OpenAI chat completions API (OPENAI_BASE_URL points it at any compatible server)"""
+    name = "openai"
+
+    def __init__(self, model: str, api_key: str, clients: ClientRegistry):
+        super().__init__(model)
+        self.clients = clients
+        self.client = clients.openai(api_key)
+
+    async def complete(self, messages: List[dict], params: dict) -> Completion:
+        async with self.clients.host_slot(str(self.client.base_url)):
+            response = await self.client.chat.completions.create(model=self.model, messages=messages, **params)
+        usage = response.usage
+        return Completion(response.choices[0].message.content,
+                          usage.prompt_tokens if usage else None,
+                          usage.completion_tokens if usage else None)
+
+    async def warm_up(self):
+        # Any response will do: it leaves a pooled connection open with the TLS handshake done
+        await self.clients.http.head(str(self.client.base_url))
+
+    async def stream(self, messages: List[dict], params: dict) -> AsyncIterator[str]:
+        async with self.clients.host_slot(str(self.client.base_url)):
+            stream = await self.client.chat.completions.create(
+                model=self.model, messages=messages, stream=True, **params
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+
+class RouterBackend(ModelBackend):
+    """The Hugging Face router's OpenAI-style chat completions endpoint"""
+    name = "huggingface"
+
+    def __init__(self, model: str, api_key: str, clients: ClientRegistry):
+        if not api_key or api_key == "your_huggingface_api_key_here":
+            raise ValueError("Please set a valid HUGGINGFACE_API_KEY in your .env file")
+        super().__init__(model)
+        self.clients = clients
+        # Overridable so load tests can point the agent at a local stand-in server
+        self.api_url = os.getenv("HF_ROUTER_URL", "https://router.huggingface.co/v1/chat/completions")
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+
+    async def complete(self, messages: List[dict], params: dict) -> Completion:
+        payload = {"model": self.model, "messages": messages, **params}
+        async with self.clients.host_slot(self.api_url):
+            response = await self.clients.http.post(self.api_url, headers=self.headers, json=payload)
+        response.raise_for_status()
+        result = response.json()
+        if not result.get("choices"):
+            raise ValueError(f"Unexpected response format: {result}")
+        usage = result.get("usage") or {}
+        return Completion(result["choices"][0]["message"]["content"],
+                          usage.get("prompt_tokens"), usage.get("completion_tokens"))
+
+    async def warm_up(self):
+        await self.clients.http.head(self.api_url)
+
+    async def stream(self, messages: List[dict], params: dict) -> AsyncIterator[str]:
+        payload = {"model": self.model, "messages": messages, "stream": True, **params}
+        async with self.clients.host_slot(self.api_url):
+            async with self.clients.http.stream("POST", self.api_url, headers=self.headers,
+                                                json=payload) as response:
+                if response.is_error:
+                    await response.aread()
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    choices = json.loads(data).get("choices") or [{}]
+                    delta = choices[0].get("delta", {}).get("content")
+                    if delta:
+                        yield delta
+
+
+class BatchedBackend(ModelBackend):
+    """
+    An in-process engine that generates a whole batch in one pass, in a
+    worker thread so the event loop stays free. get_model_backend puts a
+    MicroBatcher in front of it, which forms the batches and runs one at a time.
+    """
+    batched = True
+
+    def generate(self, batch: List[List[dict]], params: dict) -> List[Completion]:
+        """Generate one completion per conversation (runs in a worker thread)"""
+        raise NotImplementedError
+
+    async def complete_batch(self, batch: List[List[dict]], params: dict) -> List[Completion]:
+        return await asyncio.to_thread(self.generate, batch, params)
+
+    async def complete(self, messages: List[dict], params: dict) -> Completion:
+        return (await self.complete_batch([messages], params))[0]
+
+    async def stream(self, messages: List[dict], params: dict) -> AsyncIterator[str]:
+        # Generation is batched, so the reply arrives as a single delta
+        yield (await self.complete(messages, params)).text
+
+
+class LocalBackend(BatchedBackend):
+    """A small causal LM run on the CPU with transformers"""
+    name = "local"
+
+    def __init__(self, path: str, threads: int = 0):
+        super().__init__(path)
+        try:
+            import torch
+            from transformers import AutoModelForCausalLM, AutoTokenizer
+        except ImportError as error:
+            raise RuntimeError("The local model backend needs torch and transformers: "
+                               "pip install torch transformers") from error
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(path)
+        # Left padding keeps every prompt's last token aligned for batched generation
+        self.tokenizer.padding_side = "left"
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.llm = AutoModelForCausalLM.from_pretrained(path, torch_dtype=torch.float32)
+        self.llm.eval()
+
+    def generate(self, batch: List[List[dict]], params: dict) -> List[Completion]:
+        prompts = [self.tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+                   for messages in batch]
+        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True)
+        options = {"max_new_tokens": params.get("max_tokens", 256), "pad_token_id": self.tokenizer.pad_token_id}
+        temperature = params.get("temperature", 0)
+        if temperature > 0:
+            options.update(do_sample=True, temperature=temperature)
+        else:
+            options["do_sample"] = False
+
+        with self.torch.inference_mode():
+            output = self.llm.generate(**inputs, **options)
+
+        prompt_length = inputs["input_ids"].shape[1]
+        completions = []
+        for row, mask in zip(output, inputs["attention_mask"]):
+            generated = row[prompt_length:]
+            completions.append(Completion(
+                self.tokenizer.decode(generated, skip_special_tokens=True),
+                int(mask.sum()),
+                int((generated != self.tokenizer.pad_token_id).sum())
+            ))
+        return completions
+
+
+def scripted_reply(messages: List[dict]) -> str:
+    """Pick a scripted reply based on which agent is asking"""
+    system_prompt = messages[0]["content"] if messages else ""
+
+    if "Agent 2 (Critic)" in system_prompt:
+        return (
+            "Checking each step of Agent 1's work.\n"
+            "60 * 8 = 480\n"
+            "VERDICT: CORRECT\n"
+            "MY ANSWER: 480 miles"
+        )
+    if "Agent 1 (Proposer)" in system_prompt:
+        return (
+            "Step 1: The return trip is 3 hours at 80 mph.\n"
+            "80 * 3 = 240\n"
+            "Step 2: The round trip is twice the one-way distance.\n"
+            "240 * 2 = 480\n"
+            "MY PROPOSED ANSWER: 480 miles"
+        )
+    return (
+        "Step 1: 80 * 3 = 240\n"
+        "Step 2: 240 * 2 = 480\n"
+        "FINAL ANSWER: 480"
+    )
+
+
+class StandInBackend(BatchedBackend):
+    """Deterministic scripted replies after a simulated batch delay, for load tests"""
+    name = "standin"
+
+    def __init__(self, latency_ms: float = 0.0, item_ms: float = 0.0):
+        super().__init__("standin")
+        self.latency_ms = latency_ms
+        self.item_ms = item_ms
+
+    def generate(self, batch: List[List[dict]], params: dict) -> List[Completion]:
+        delay = self.latency_ms + self.item_ms * len(batch)
+        if delay:
+            time.sleep(delay / 1000)
+        replies = [scripted_reply(messages) for messages in batch]
+        return [Completion(reply, *estimate_tokens(messages, reply)) for messages, reply in zip(batch, replies)]
+
+
+# Remote backends' default models; the in-process ones name their own
+DEFAULT_MODELS = {
+    "openai": "gpt-4o",
+    # A small model that will struggle with complex reasoning. Other small models to try:
+    # "google/gemma-2b-it", "microsoft/phi-2"
+    "huggingface": "katanemo/Arch-Router-1.5B:hf-inference",
+}
+
+_settings: Optional[ModelSettings] = None
+# Shared micro-batchers: in-process engines by (kind, model), remote single-agent backends by (kind, model, API key)
+_batchers: Dict[Tuple[str, Optional[str], Optional[str]], MicroBatcher] = {}
+# The startup warm-up builds backends in a worker thread while requests build them on the event loop
+_batchers_lock = threading.Lock()
+
+
+def get_model_settings() -> ModelSettings:
+    """Get the backend selection, read from the environment on first use"""
+    global _settings
+    if _settings is None:
+        _settings = ModelSettings()
+        for role in ("single", "multi"):
+            kind = getattr(_settings, f"{role}_backend")
+            if kind not in BACKENDS:
+                raise ValueError(f"Unknown MODEL_{role.upper()}_BACKEND {kind!r}; expected one of {BACKENDS}")
+    return _settings
+
+
+def api_key_variable(role: str) -> Optional[str]:
+    """The environment variable holding the API key for a role's backend (None for in-process ones)"""
+    return KEY_VARIABLES.get(getattr(get_model_settings(), f"{role}_backend"))
+
+
+def get_model_backend(role: str, api_key: Optional[str] = None, clients: Optional[ClientRegistry] = None,
+                      model: Optional[str] = None) -> ModelBackend:
+    """
+    Build the configured backend for "single" or "multi", behind a shared
+    MicroBatcher where batched. `model` overrides the configured model on
+    remote backends; an in-process engine always serves its loaded model.
+    """
+    settings = get_model_settings()
+    batching = MicroBatchSettings()
+    kind = getattr(settings, f"{role}_backend")
+    model = model or getattr(settings, f"{role}_model")
+    with _batchers_lock:
+        if kind in KEY_VARIABLES:
+            model = model or DEFAULT_MODELS[kind]
+            key = (kind, model, api_key)
+            if role == "single" and batching.remote and key in _batchers:
+                return _batchers[key]
+            backend_class = OpenAIBackend if kind == "openai" else RouterBackend
+            backend = backend_class(model, api_key, clients or get_client_registry())
+            if role != "single" or not batching.remote:
+                return backend
+        else:
+            # Loading a model is expensive and batching only helps when requests share it,
+            # so roles share an engine when they use the same model
+            path = (model or settings.local_path) if kind == "local" else None
+            key = (kind, path, None)
+            if key in _batchers:
+                return _batchers[key]
+            if kind == "local":
+                backend = LocalBackend(path, settings.local_threads)
+            else:
+                backend = StandInBackend(settings.standin_latency_ms, settings.standin_item_ms)
+
+        _batchers[key] = MicroBatcher(backend, batching)
+        return _batchers[key]
+
+
+def get_batchers() -> List[MicroBatcher]:
+    """The micro-batchers created so far"""
+    return list(_batchers.values())
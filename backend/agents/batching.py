@@ -0,0 +1,174 @@
+"""
+Micro-batching - Collect concurrent model calls and dispatch them together
+A MicroBatcher sits in front of a model backend. The first call into an
+empty queue opens a batching window. The batch is dispatched when it reaches
+the maximum size or when its oldest call has waited the maximum added wait,
+whichever comes first. Calls are only batched together when they share
+sampling parameters. Each caller then gets its own completion back.
+
+In-process engines generate the whole batch in one pass, one batch at a time,
+and calls keep collecting while the engine is busy. Remote providers take one
+conversation per request, so a remote batch goes out as parallel calls on the
+pooled connections; that only evens a burst out into windows, so it is
+opt-in. Batch sizes and wait times go to /metrics, and throughput is at
+GET /api/batching/stats.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import TYPE_CHECKING, AsyncIterator, Deque, List, Optional, Set, Tuple
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from services.metrics import MODEL_BATCH_SIZE, MODEL_BATCH_WAIT
+
+if TYPE_CHECKING:
+    from agents.backends import Completion, ModelBackend
+
+
+class MicroBatchSettings(BaseSettings):
+    """Micro-batching settings, overridable with MICROBATCH_* environment variables"""
+    model_config = SettingsConfigDict(env_prefix="MICROBATCH_")
+
+    max_size: int = 8          # Calls dispatched together at most
+    max_wait_ms: float = 10.0  # Longest a call waits for its batch to fill (0 dispatches at once)
+    # In-process backends are always batched; this also batches the single agent's remote calls
+    remote: bool = False
+    throughput_window: float = 60.0  # Seconds of recent batches the reported throughput covers
+
+
+class _Call:
+    __slots__ = ("messages", "params", "future", "arrived")
+
+    def __init__(self, messages: List[dict], params: dict):
+        self.messages = messages
+        self.params = params
+        self.future = asyncio.get_running_loop().create_future()
+        self.arrived = time.monotonic()
+
+
+class MicroBatcher:
+    """Batches concurrent calls to one backend, and is used in its place"""
+
+    def __init__(self, backend: "ModelBackend", settings: Optional[MicroBatchSettings] = None):
+        self.backend = backend
+        self.name = backend.name
+        self.model = backend.model
+        self.settings = settings or MicroBatchSettings()
+        self.max_size = max(1, self.settings.max_size)
+        self.max_wait = max(0.0, self.settings.max_wait_ms) / 1000
+        # An in-process engine runs one batch at a time; remote batches go out as soon as they form
+        self._engine = asyncio.Semaphore(1) if backend.batched else None
+        self._pending: Deque[_Call] = deque()
+        self._arrival = asyncio.Event()
+        self._scheduler: Optional[asyncio.Task] = None
+        self._dispatches: Set[asyncio.Task] = set()
+        self._recent: Deque[Tuple[float, int]] = deque()  # (finished at, batch size)
+        self.batches = 0
+        self.requests = 0
+
+    async def complete(self, messages: List[dict], params: dict) -> "Completion":
+        call = _Call(messages, params)
+        self._pending.append(call)
+        self._arrival.set()
+        if self._scheduler is None or self._scheduler.done():
+            self._scheduler = asyncio.ensure_future(self._schedule())
+        return await call.future
+
+    async def stream(self, messages: List[dict], params: dict) -> AsyncIterator[str]:
+        if not self.backend.batched:
+            # Streams cannot share a remote call, so they go straight through
+            async for delta in self.backend.stream(messages, params):
+                yield delta
+            return
+        # A batched engine returns whole replies, so the reply arrives as a single delta
+        yield (await self.complete(messages, params)).text
+
+    async def warm_up(self):
+        await self.backend.warm_up()
+
+    async def _schedule(self):
+        while self._pending:
+            # Hold the window open until the batch is full or its oldest call has waited long enough
+            deadline = self._pending[0].arrived + self.max_wait
+            while len(self._pending) < self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._arrival.clear()
+                try:
+                    await asyncio.wait_for(self._arrival.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            if self._engine is not None:
+                await self._engine.acquire()  # Calls keep arriving while the engine is busy
+            batch, params = self._take()
+            if not batch:
+                if self._engine is not None:
+                    self._engine.release()
+                continue
+            task = asyncio.ensure_future(self._dispatch(batch, params))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    def _take(self) -> Tuple[List[_Call], dict]:
+        """The oldest waiting call plus up to max_size - 1 others with the same sampling parameters"""
+        batch: List[_Call] = []
+        params: dict = {}
+        rest: Deque[_Call] = deque()
+        while self._pending:
+            call = self._pending.popleft()
+            if call.future.done():  # The caller gave up
+                continue
+            if not batch:
+                params = call.params
+            if len(batch) < self.max_size and call.params == params:
+                batch.append(call)
+            else:
+                rest.append(call)
+        self._pending = rest
+        return batch, params
+
+    async def _dispatch(self, batch: List[_Call], params: dict):
+        now = time.monotonic()
+        for call in batch:
+            MODEL_BATCH_WAIT.observe(self.name, value=now - call.arrived)
+        MODEL_BATCH_SIZE.observe(self.name, value=len(batch))
+        self.batches += 1
+        self.requests += len(batch)
+
+        try:
+            results = await self.backend.complete_batch([call.messages for call in batch], params)
+        except Exception as error:
+            results = [error] * len(batch)
+        finally:
+            if self._engine is not None:
+                self._engine.release()
+
+        self._recent.append((time.monotonic(), len(batch)))
+        for call, result in zip(batch, results):
+            if call.future.done():
+                continue
+            if isinstance(result, BaseException):
+                call.future.set_exception(result)
+            else:
+                call.future.set_result(result)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        while self._recent and now - self._recent[0][0] > self.settings.throughput_window:
+            self._recent.popleft()
+        return {
+            "provider": self.name,
+            "model": self.model,
+            "max_size": self.max_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self.batches,
+            "requests": self.requests,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "queued": len(self._pending),
+            "batches_in_flight": len(self._dispatches),
+            "throughput_rps": sum(size for _, size in self._recent) / self.settings.throughput_window
+        }
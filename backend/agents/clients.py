@@ -0,0 +1,113 @@
+"""
+Shared LLM Clients - Application-scoped connection pools for both agents
+One keep-alive httpx pool is created at startup and reused by every request,
+so solves no longer pay for new TCP/TLS connections to the provider.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from openai import AsyncOpenAI
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from agents.resilience import ResilienceSettings, ResilientCaller
+from services.ratelimit import TokenBucket
+
+
+class ClientSettings(BaseSettings):
+    """Connection pool settings, overridable with LLM_* environment variables"""
+    model_config = SettingsConfigDict(env_prefix="LLM_")
+
+    pool_size: int = 100            # Max open connections across all hosts
+    max_keepalive: int = 20         # Idle connections kept warm for reuse
+    keepalive_expiry: float = 30.0  # Seconds an idle connection stays open
+    per_host_limit: int = 50        # Max in-flight requests to a single host
+    timeout: float = 60.0           # Read/write/pool timeout in seconds
+    connect_timeout: float = 10.0
+    # Requests per second allowed per provider host, e.g. '{"api.openai.com": 5}'
+    rate_limits: Dict[str, float] = {}
+
+
+class ClientRegistry:
+    """Holds the pooled HTTP client, the provider clients built on top of it and their resilient callers"""
+
+    def __init__(self, settings: Optional[ClientSettings] = None,
+                 resilience: Optional[ResilienceSettings] = None):
+        self.settings = settings or ClientSettings()
+        self.resilience = resilience or ResilienceSettings()
+        self.http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.settings.pool_size,
+                max_keepalive_connections=self.settings.max_keepalive,
+                keepalive_expiry=self.settings.keepalive_expiry
+            ),
+            timeout=httpx.Timeout(self.settings.timeout, connect=self.settings.connect_timeout)
+        )
+        self._openai_clients: Dict[str, AsyncOpenAI] = {}
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self._rate_limiters: Dict[str, TokenBucket] = {
+            host: TokenBucket(rate) for host, rate in self.settings.rate_limits.items()
+        }
+        self._callers: Dict[str, ResilientCaller] = {}
+
+    def openai(self, api_key: str) -> AsyncOpenAI:
+        """Get an OpenAI client for this key that shares the pooled connections"""
+        client = self._openai_clients.get(api_key)
+        if client is None:
+            client = AsyncOpenAI(
+                api_key=api_key,
+                http_client=self.http,
+                timeout=self.settings.timeout,
+                max_retries=0  # Retries are handled by the provider's ResilientCaller
+            )
+            self._openai_clients[api_key] = client
+        return client
+
+    def caller(self, provider: str) -> ResilientCaller:
+        """Get the retrying, circuit-breaking caller for a provider"""
+        caller = self._callers.get(provider)
+        if caller is None:
+            caller = ResilientCaller(provider, self.resilience)
+            self._callers[provider] = caller
+        return caller
+
+    @asynccontextmanager
+    async def host_slot(self, url: str):
+        """Cap in-flight requests (and the request rate, if limited) to the host serving this URL"""
+        host = urlsplit(url).netloc
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = asyncio.Semaphore(self.settings.per_host_limit)
+            self._host_slots[host] = slot
+        async with slot:
+            limiter = self._rate_limiters.get(urlsplit(url).hostname)
+            if limiter is not None:
+                await limiter.acquire()
+            yield
+
+    async def aclose(self):
+        """Close every pooled connection"""
+        self._openai_clients.clear()
+        await self.http.aclose()
+
+
+_registry: Optional[ClientRegistry] = None
+
+
+def get_client_registry() -> ClientRegistry:
+    """Get the application client registry, creating it on first use"""
+    global _registry
+    if _registry is None:
+        _registry = ClientRegistry()
+    return _registry
+
+
+async def close_client_registry():
+    """Close the application client registry (called at shutdown)"""
+    global _registry
+    if _registry is not None:
+        await _registry.aclose()
+        _registry = None
@@ -0,0 +1,245 @@
+"""
+Answer Extraction - Precompiled parsing of model responses for both agents
+Each response format has one compiled scanner that finds every marker the
+format uses ("FINAL ANSWER:", or the debate marker and "VERDICT:") in a single
+pass; the value after a marker is read with an anchored pattern at that
+position. Markers ending in ":" are found by searching for the colon and
+checking the text before it, which is far cheaper than a case-insensitive
+search for the whole marker. The fallbacks (answer phrases, verdict keywords,
+trailing numbers) only run when a response has no marker, and give the same
+results as the original chain of searches.
+
+Extractors can also be fed a response while it streams in: text is scanned
+once it can no longer change what matches, so a marker answer is available
+before the response ends and the final result costs no rescan.
+"""
+
+import re
+from functools import lru_cache
+from itertools import count
+from typing import Dict, List, Optional, Pattern, Tuple
+
+# A marker and its value never span more than this many whitespace-separated
+# tokens ("MY PROPOSED ANSWER: 56.10 dollars"), so text before the last few
+# tokens of a partial response is settled
+_PENDING_TOKENS = 6
+# Streamed text is scanned in steps of at least this many characters
+_SCAN_STEP = 32
+
+_names = count()
+
+
+def _scanner(phrases: List[Tuple[str, str]]) -> Pattern:
+    """
+    Compile case-insensitive markers into one scanner pattern.
+    Every alternative starts with a plain literal so re can skip straight to
+    candidate positions: the shared last character when all markers end with
+    the same uncased one (checking the marker with a lookbehind), otherwise
+    one alternative per case of the marker's first character. An empty group
+    at the end of each alternative names the kind of marker.
+    """
+    tail = phrases[0][1][-1]
+    if not tail.isalnum() and all(phrase[-1] == tail for _, phrase in phrases):
+        alternatives = [
+            f"(?<=(?i:{re.escape(phrase)}))(?P<{kind}_{next(_names)}>)" for kind, phrase in phrases
+        ]
+        return re.compile(f"{re.escape(tail)}(?:{'|'.join(alternatives)})")
+
+    alternatives = []
+    for kind, phrase in phrases:
+        for head in sorted({phrase[0].lower(), phrase[0].upper()}):
+            alternatives.append(f"{re.escape(head)}(?i:{re.escape(phrase[1:])})(?P<{kind}_{next(_names)}>)")
+    return re.compile("|".join(alternatives))
+
+
+@lru_cache(maxsize=16)
+def _structured_scanner(marker: Optional[str]) -> Pattern:
+    """Scanner for debate responses that end with a marker such as 'MY ANSWER:'"""
+    phrases = [("verdict", "VERDICT:")]
+    if marker:
+        phrases.append(("marked", marker))
+    return _scanner(phrases)
+
+
+_FINAL_SCANNER = _scanner([("final", "FINAL ANSWER:")])
+
+# What has to follow each kind of marker, read with .match() right after it
+_VALUES = {
+    "final": re.compile(r"\s*([0-9,.]+(?:\s+\w+)?)"),
+    "marked": re.compile(r"\s*([0-9,.]+(?:\s+[a-zA-Z]+)?)", re.IGNORECASE),
+    "verdict": re.compile(r"\s*(CORRECT|INCORRECT)", re.IGNORECASE),
+}
+
+# Single agent fallbacks, in priority order, searched in the lowercased response
+_ANSWER_PHRASES = [
+    re.compile(r"(?:the answer is|answer:|result:|total:)\s*([0-9,.]+)"),
+    re.compile(r"(?:therefore|thus|so),?\s+(?:the answer is|there (?:are|is))\s*([0-9,.]+)"),
+    re.compile(r"(?:=|equals)\s*([0-9,.]+)"),
+]
+_LAST_NUMBER = re.compile(r"\b([0-9,.]+)\b")
+
+# Debate fallbacks
+_LINE_NUMBER = re.compile(r"([0-9,.]+(?:\s+[a-zA-Z]+)?)")
+_AGREE = ("correct", "accurate", "right", "agree", "looks good")
+_DISAGREE = ("incorrect", "wrong", "error", "mistake")
+
+
+def _scan(scanner: Pattern, text: str, start: int, end: int, found: Dict[str, str]) -> int:
+    """Record the first value of each kind of marker found in [start, end); returns where to resume"""
+    pos = start
+    for hit in scanner.finditer(text, start):
+        if hit.start() >= end:
+            break
+        pos = hit.end()
+        kind = hit.lastgroup.rsplit("_", 1)[0]
+        if kind not in found:
+            value = _VALUES[kind].match(text, pos)
+            if value:
+                found[kind] = value.group(1)
+    return max(pos, end)
+
+
+def _final_answer(text: str, found: Dict[str, str]) -> str:
+    if not text:
+        return "No response"
+    if "final" in found:
+        return found["final"].strip()
+
+    # Fallback: other common answer phrases, then the last number mentioned
+    text_lower = text.lower()
+    for pattern in _ANSWER_PHRASES:
+        match = pattern.search(text_lower)
+        if match:
+            return match.group(1)
+    numbers = _LAST_NUMBER.findall(text)
+    if numbers:
+        return numbers[-1]
+    return "Unable to extract answer"
+
+
+def _structured_answer(text: str, found: Dict[str, str]) -> str:
+    if "marked" in found:
+        return found["marked"].strip()
+
+    # Fallback: first number (with unit) on one of the last five lines
+    for line in reversed(text.strip().rsplit("\n", 5)[-5:]):
+        match = _LINE_NUMBER.search(line)
+        if match:
+            return match.group(1).strip()
+    return "Unable to extract"
+
+
+def _verdict(text: str, found: Dict[str, str]) -> str:
+    if "verdict" in found:
+        return found["verdict"].upper()
+
+    # Fallback: consensus keywords
+    text_lower = text.lower()
+    if any(word in text_lower for word in _AGREE):
+        return "CORRECT"
+    if any(word in text_lower for word in _DISAGREE):
+        return "INCORRECT"
+    return "UNCLEAR"
+
+
+def _settled(text: str) -> int:
+    """Offset before which no further text can change a match"""
+    i = len(text)
+    for _ in range(_PENDING_TOKENS):
+        while i and text[i - 1].isspace():
+            i -= 1
+        while i and not text[i - 1].isspace():
+            i -= 1
+    return i
+
+
+class _Extractor:
+    """Runs a scanner over a response while it streams in"""
+
+    scanner: Pattern
+
+    def __init__(self):
+        self.text = ""
+        self._found: Dict[str, str] = {}
+        self._pos = 0
+        self._unscanned = 0
+
+    def feed(self, delta: str):
+        """Add the next chunk of the response"""
+        self.text += delta
+        self._unscanned += len(delta)
+        if self._unscanned >= _SCAN_STEP:
+            self._unscanned = 0
+            end = _settled(self.text)
+            if end > self._pos:
+                self._pos = _scan(self.scanner, self.text, self._pos, end, self._found)
+
+    def _finish(self) -> Dict[str, str]:
+        self._pos = _scan(self.scanner, self.text, self._pos, len(self.text) + 1, self._found)
+        return self._found
+
+
+class FinalAnswerExtractor(_Extractor):
+    """Incremental extraction for single-agent responses ending in 'FINAL ANSWER: n'"""
+
+    scanner = _FINAL_SCANNER
+
+    @property
+    def answer(self) -> Optional[str]:
+        """The FINAL ANSWER value, once it has streamed in"""
+        final = self._found.get("final")
+        return final.strip() if final is not None else None
+
+    def result(self) -> str:
+        """The extracted answer for everything fed so far"""
+        return _final_answer(self.text, self._finish())
+
+
+class StructuredExtractor(_Extractor):
+    """Incremental extraction for proposer and critic responses"""
+
+    def __init__(self, marker: Optional[str] = None):
+        super().__init__()
+        self.scanner = _structured_scanner(marker)
+
+    @property
+    def answer(self) -> Optional[str]:
+        """The marker answer, once it has streamed in"""
+        marked = self._found.get("marked")
+        return marked.strip() if marked is not None else None
+
+    def result(self) -> str:
+        """The extracted answer for everything fed so far"""
+        return _structured_answer(self.text, self._finish())
+
+    def verdict(self) -> str:
+        """The critic's verdict (CORRECT, INCORRECT or UNCLEAR) for everything fed so far"""
+        return _verdict(self.text, self._finish())
+
+
+def extract_final_answer(response: str) -> str:
+    """Extract the numerical answer from a single-agent response"""
+    found: Dict[str, str] = {}
+    _scan(_FINAL_SCANNER, response, 0, len(response) + 1, found)
+    return _final_answer(response, found)
+
+
+def extract_structured_answer(response: str, marker: str) -> str:
+    """Extract the answer following a marker from a debate response"""
+    found: Dict[str, str] = {}
+    _scan(_structured_scanner(marker), response, 0, len(response) + 1, found)
+    return _structured_answer(response, found)
+
+
+def extract_answer_and_verdict(response: str, marker: str) -> Tuple[str, str]:
+    """Extract the marker answer and the verdict from a critic response in one scan"""
+    found: Dict[str, str] = {}
+    _scan(_structured_scanner(marker), response, 0, len(response) + 1, found)
+    return _structured_answer(response, found), _verdict(response, found)
+
+
+def extract_verdict(response: str) -> str:
+    """Extract the verdict from a critic response"""
+    found: Dict[str, str] = {}
+    _scan(_structured_scanner(None), response, 0, len(response) + 1, found)
+    return _verdict(response, found)
@@ -5,222 +5,500 @@ Agent 1 (Proposer): Proposes solutions and reasoning
 Agent 2 (Critic): Critiques and suggests improvements
 """
 
-from openai import OpenAI
-from typing import List, Optional
-from models.schemas import ReasoningStep, AgentResponse
+from typing import Any, AsyncIterator, List, Optional, Tuple
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from models.schemas import AgentResponse, SolveStats
+from models.transcript import Step, Transcript
+from agents.prompts import CRITIC_SYSTEM, PROPOSER_SYSTEM, DebatePrompts, PromptSettings
+from agents.extraction import StructuredExtractor, extract_structured_answer, extract_verdict
+from agents.backends import ModelBackend, get_model_backend
+from agents.clients import ClientRegistry, get_client_registry
+from agents.resilience import classify
+from agents.verifier import verify_solution
+from services.cache import get_response_cache
+from services.memo import get_llm_memo, sampling_temperature
+from services.metrics import estimate_tokens, record_llm_call, record_solve
+from services.singleflight import SingleFlight, coalesce
+import asyncio
 import re
-import json
+import time
+
+
+class DebateSettings(BaseSettings):
+    """Debate topology, overridable with DEBATE_* environment variables"""
+    model_config = SettingsConfigDict(env_prefix="DEBATE_")
+
+    proposers: int = 1  # Proposals drafted in parallel in the first round
+    proposer_temperatures: List[float] = [0.7, 0.3, 1.0]  # Cycled across the proposers
+    proposer_models: List[str] = []  # Cycled across proposers 2..N; empty uses the debate model
+    quorum: float = 1.0  # Share of proposers that must agree to skip the critic (1.0: all of them)
 
 
 class DebateAgents:
     """Two agents that debate to reach the correct solution"""
 
-    def __init__(self, api_key: str, max_rounds: int = 3):
-        self.client = OpenAI(api_key=api_key)
+    def __init__(self, api_key: Optional[str], max_rounds: int = 3, clients: Optional[ClientRegistry] = None,
+                 adaptive: bool = True, latency_budget_ms: Optional[float] = None,
+                 token_budget: Optional[int] = None, local_verification: bool = True,
+                 backend: Optional[ModelBackend] = None, proposers: Optional[int] = None,
+                 proposer_temperatures: Optional[List[float]] = None,
+                 proposer_models: Optional[List[str]] = None, quorum: Optional[float] = None,
+                 prompt_settings: Optional[PromptSettings] = None):
+        self.clients = clients or get_client_registry()
+        self.backend = backend or get_model_backend("multi", api_key, self.clients)
+        self.caller = self.clients.caller(self.backend.name)
         self.max_rounds = max_rounds
-        self.reasoning_steps: List[ReasoningStep] = []
-        self.step_count = 0
-        self.model = "gpt-4o"
-
-    def add_step(self, agent: str, content: str):
-        """Add a reasoning step"""
-        self.step_count += 1
-        step = ReasoningStep(
-            agent=agent,
-            content=content,
-            step_number=self.step_count
-        )
-        self.reasoning_steps.append(step)
-
-    def get_agent_response(self, system_prompt: str, user_message: str) -> str:
-        """Get response from OpenAI"""
+        self.transcript = Transcript()
+        self.model = self.backend.model
+        self.temperature = sampling_temperature(0.7)
+
+        # Parallel proposers: the first round drafts several proposals at once and
+        # only calls the critic when their answers disagree
+        settings = DebateSettings()
+        self.proposers = max(1, proposers if proposers is not None else settings.proposers)
+        temperatures = proposer_temperatures or settings.proposer_temperatures
+        self.proposer_temperatures = [sampling_temperature(temperatures[i % len(temperatures)])
+                                      for i in range(self.proposers)]
+        models = proposer_models if proposer_models is not None else settings.proposer_models
+        self.proposer_backends = [self.backend] + [
+            get_model_backend("multi", api_key, self.clients, model=models[(i - 1) % len(models)])
+            if models else self.backend
+            for i in range(1, self.proposers)
+        ]
+        if get_llm_memo() is not None:
+            # At temperature 0, proposers on the same model send the same request and
+            # always agree, so deterministic mode keeps one proposer per model
+            distinct = {}
+            for backend in self.proposer_backends:
+                distinct.setdefault(backend.model, backend)
+            self.proposer_backends = list(distinct.values())
+            self.proposers = len(self.proposer_backends)
+            self.proposer_temperatures = self.proposer_temperatures[:self.proposers]
+        self.quorum = quorum if quorum is not None else settings.quorum
+
+        # Adaptive scheduling: skip critic calls and rounds that cannot change the outcome
+        self.adaptive = adaptive
+        self.latency_budget_ms = latency_budget_ms
+        self.token_budget = token_budget
+        self.stats = SolveStats()
+
+        # Stable prompt prefixes and capped carried-over context
+        self.prompt_settings = prompt_settings or PromptSettings()
+
+        # Check the proposer's arithmetic locally: skip the critic on a fully checked derivation,
+        # otherwise pass any errors to it
+        self.local_verification = local_verification
+
+    def add_step(self, agent: str, content: str) -> Step:
+        """Add a reasoning step (only kept in memory when collecting a transcript)"""
+        return self.transcript.add(agent, content)
+
+    async def get_agent_response(self, system_prompt: str, user_message: str, agent: str = "Agent",
+                                 temperature: Optional[float] = None,
+                                 backend: Optional[ModelBackend] = None) -> str:
+        """Get response from the model backend without blocking the event loop (raises LLMError once retries are exhausted)"""
+        backend = backend or self.backend
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message}
+        ]
+        params = {"temperature": self.temperature if temperature is None else temperature, "max_tokens": 800}
+
+        # Identical deterministic calls are replayed from the memo
+        memo = get_llm_memo()
+        if memo is not None:
+            reply = await memo.get_async(backend.model, messages, params)
+            if reply is not None:
+                return reply
+
+        async def attempt() -> str:
+            start = time.perf_counter()
+            try:
+                reply, prompt_tokens, completion_tokens = await self._complete(messages, params, backend)
+            except Exception as e:
+                error = classify(e, backend.name)
+                record_llm_call(self.stats, backend.name, backend.model, agent, time.perf_counter() - start,
+                                0, 0, error.kind)
+                raise error from e
+            record_llm_call(self.stats, backend.name, backend.model, agent, time.perf_counter() - start,
+                            prompt_tokens, completion_tokens)
+            return reply
+
+        reply = await self.clients.caller(backend.name).call(attempt)
+        if memo is not None:
+            await memo.set_async(backend.model, messages, params, reply)
+        return reply
+
+    async def _complete(self, messages: List[dict], params: dict,
+                        backend: Optional[ModelBackend] = None) -> Tuple[str, int, int]:
+        """Make one chat completion call, returning the reply and its prompt and completion tokens"""
+        completion = await (backend or self.backend).complete(messages, params)
+        if completion.prompt_tokens is not None:
+            return completion.text, completion.prompt_tokens, completion.completion_tokens or 0
+        return (completion.text, *estimate_tokens(messages, completion.text))
+
+    async def stream_agent_response(self, system_prompt: str, user_message: str,
+                                    agent: str = "Agent") -> AsyncIterator[str]:
+        """Stream token deltas from the model backend as they are generated"""
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message}
+        ]
+        params = {"temperature": self.temperature, "max_tokens": 800}
+
+        memo = get_llm_memo()
+        if memo is not None:
+            reply = await memo.get_async(self.model, messages, params)
+            if reply is not None:
+                yield reply
+                return
+
+        chunks = []
+        async for delta in self.caller.stream(lambda: self._stream(messages, params, agent)):
+            chunks.append(delta)
+            yield delta
+
+        if memo is not None:
+            await memo.set_async(self.model, messages, params, "".join(chunks))
+
+    async def _stream(self, messages: List[dict], params: dict, agent: str) -> AsyncIterator[str]:
+        """Make one streaming chat completion call"""
+        chunks = []
+        start = time.perf_counter()
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=0.7,
-                max_tokens=800
-            )
-            return response.choices[0].message.content
+            async for delta in self.backend.stream(messages, params):
+                chunks.append(delta)
+                yield delta
         except Exception as e:
-            return f"Error: {str(e)}"
-
-    def solve(self, problem: str) -> AgentResponse:
+            error = classify(e, self.backend.name)
+            record_llm_call(self.stats, self.backend.name, self.model, agent, time.perf_counter() - start,
+                            0, 0, error.kind)
+            raise error from e
+
+        # Streamed completions carry no usage block, so tokens are estimated
+        record_llm_call(self.stats, self.backend.name, self.model, agent, time.perf_counter() - start,
+                        *estimate_tokens(messages, "".join(chunks)))
+
+    async def _respond(self, agent: str, system_prompt: str, user_message: str,
+                       extractor: StructuredExtractor, stream_tokens: bool) -> AsyncIterator[Tuple[str, Any]]:
+        """Feed an agent's reply to an extractor, yielding delta events when streaming tokens"""
+        if not stream_tokens:
+            extractor.feed(await self.get_agent_response(system_prompt, user_message, agent))
+            return
+
+        async for delta in self.stream_agent_response(system_prompt, user_message, agent):
+            extractor.feed(delta)
+            yield "delta", {"agent": agent, "content": delta}
+
+    async def solve(self, problem: str) -> AgentResponse:
         """
         Solve problem through multi-agent debate with structured responses
         """
-        self.reasoning_steps = []
-        self.step_count = 0
-
-        try:
-            self.add_step("System", f"Starting multi-agent debate for problem: {problem}")
-
-            # Agent 1: Proposer with structured output requirement
-            proposer_system = """You are Agent 1 (Proposer). Your role is to:
-1. Carefully analyze math word problems step-by-step
-2. Show all your calculations clearly
-3. Propose a solution with detailed reasoning
-4. CRITICAL: End your response with exactly this format:
-
-   MY PROPOSED ANSWER: [number] [unit]
-
-   Example: MY PROPOSED ANSWER: 10 apples
-
-Be thorough, show your work, and ALWAYS end with "MY PROPOSED ANSWER:" followed by the exact numerical answer."""
-
-            # Agent 2: Critic with structured output requirement
-            critic_system = """You are Agent 2 (Critic). Your role is to:
-1. Carefully review Agent 1's step-by-step reasoning
-2. Verify each calculation
-3. Identify any logical errors or mistakes
-4. Check if all parts of the problem were addressed
-5. CRITICAL: End your response with exactly this format:
-
-   If correct:
-   VERDICT: CORRECT
-   MY ANSWER: [number] [unit]
+        async for event, payload in self.run(problem):
+            if event == "result":
+                return payload
 
-   If incorrect:
-   VERDICT: INCORRECT
-   MY ANSWER: [number] [unit]
-   REASON: [brief explanation of the error]
-
-Example if correct: 
-VERDICT: CORRECT
-MY ANSWER: 10 apples
+    async def run(self, problem: str, stream_tokens: bool = False,
+                  collect_steps: bool = True) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Run the debate as a stream of events:
+        ("step", Step) for every add_step, ("delta", {...}) for token
+        deltas when stream_tokens is set, and a final ("result", AgentResponse).
+        With collect_steps off the transcript is not kept in memory and the
+        result carries no reasoning_steps (they were already streamed).
+        """
+        self.transcript = Transcript(collect=collect_steps)
+        self.stats = SolveStats()
+        start = time.perf_counter()
 
-Example if incorrect:
-VERDICT: INCORRECT  
-MY ANSWER: 12 apples
-REASON: Agent 1 forgot to divide by 2 in the final step
+        try:
+            yield "step", self.add_step("System", f"Starting multi-agent debate for problem: {problem}")
 
-ALWAYS provide a verdict and your calculated answer."""
+            prompts = DebatePrompts(problem, self.prompt_settings)
 
             agent1_answer = None
+            agent2_response = None
             agent2_answer = None
             final_answer = None
 
+            previous_answers = None
+
             for round_num in range(self.max_rounds):
-                self.add_step("System", f"--- Round {round_num + 1} ---")
+                budget_hit = self._budget_exhausted(round_num, time.perf_counter() - start)
+                if budget_hit:
+                    self._skip_calls(2 * (self.max_rounds - round_num))
+                    self.stats.stop_reason = f"{budget_hit} budget"
+                    yield "step", self.add_step("System", f"{budget_hit.capitalize()} budget reached. Stopping debate.")
+                    break
+
+                self.stats.rounds = round_num + 1
+                yield "step", self.add_step("System", f"--- Round {round_num + 1} ---")
 
                 # Agent 1 proposes solution
                 if round_num == 0:
-                    proposer_prompt = f"""Solve this problem step by step:
-
-{problem}
-
-Remember to:
-1. Show all your calculations
-2. Explain each step clearly
-3. End with "MY PROPOSED ANSWER: [number] [unit]" """
+                    proposer_prompt, saved = prompts.proposer()
                 else:
-                    proposer_prompt = f"""Agent 2 found an issue with your previous answer.
-
-Agent 2's feedback: {agent2_response}
-
-Please recalculate and provide a corrected solution.
-
-Remember to end with "MY PROPOSED ANSWER: [number] [unit]" """
-
-                agent1_response = self.get_agent_response(proposer_system, proposer_prompt)
-                self.add_step("Agent 1 (Proposer)", agent1_response)
+                    proposer_prompt, saved = prompts.proposer(feedback=agent2_response, previous=agent1_answer)
+
+                votes = []
+                if round_num == 0 and self.proposers > 1:
+                    # Several proposers draft at once (replies arrive whole, not token by token)
+                    self.stats.prompt_tokens_saved += saved * self.proposers
+                    proposals = await self._propose_in_parallel(PROPOSER_SYSTEM, proposer_prompt)
+                    for agent, response, _ in proposals:
+                        yield "step", self.add_step(agent, response)
+                    votes = self._vote([answer for _, _, answer in proposals])
+                    self.stats.votes = dict(votes)
+
+                    # The majority answer goes forward, with the first proposal that gave it
+                    _, agent1_response, agent1_answer = next(
+                        (proposal for proposal in proposals if votes and self._same_answer(proposal[2], votes[0][0])),
+                        proposals[0]
+                    )
+                    if self._has_quorum(votes, len(proposals)):
+                        self._skip_calls(1)
+                        self.stats.stop_reason = "proposers agreed" if len(votes) == 1 else "majority vote"
+                        yield "step", self.add_step("System", f"✓ {votes[0][1]} of {len(proposals)} proposers "
+                                                              f"agree: {agent1_answer}")
+                        final_answer = agent1_answer
+                        break
+                    tally = ", ".join(f"{answer} ({count})" for answer, count in votes) or "no answers"
+                    yield "step", self.add_step("System", f"✗ Proposers disagree - {tally}. "
+                                                          f"Sending the majority answer to Agent 2.")
+                else:
+                    # Agent 1's answer is parsed while the reply arrives
+                    self.stats.prompt_tokens_saved += saved
+                    proposal = StructuredExtractor("MY PROPOSED ANSWER:")
+                    async for event in self._respond("Agent 1 (Proposer)", PROPOSER_SYSTEM, proposer_prompt,
+                                                     proposal, stream_tokens):
+                        yield event
+                    agent1_response = proposal.text
+                    yield "step", self.add_step("Agent 1 (Proposer)", agent1_response)
+                    agent1_answer = proposal.result()
+
+                # Agent 1 adopted Agent 2's last answer: the critic already derived it, no need to re-check
+                if self.adaptive and agent2_answer and self._same_answer(agent1_answer, agent2_answer):
+                    self._skip_calls(1)
+                    self.stats.stop_reason = "proposer adopted critic answer"
+                    yield "step", self.add_step("System", f"✓ Agents reached consensus! Agent 1 now agrees with Agent 2: {agent2_answer}")
+                    final_answer = agent2_answer
+                    break
 
-                # Extract Agent 1's answer
-                agent1_answer = self._extract_structured_answer(agent1_response, "MY PROPOSED ANSWER:")
+                # Local verifier checks the arithmetic before spending a critic call on it. Only a strict
+                # CORRECT (one checked derivation using every quantity) replaces the critic.
+                verification = None
+                if self.local_verification:
+                    verification = verify_solution(problem, agent1_response, agent1_answer)
+                    if verification.verdict == "CORRECT":
+                        self._skip_calls(1)
+                        self.stats.stop_reason = "verified locally"
+                        yield "step", self.add_step("Local Verifier",
+                                                    f"Checked {verification.checked} calculations: one derivation that uses "
+                                                    f"every quantity in the problem and ends at the proposed answer.\n"
+                                                    f"VERDICT: CORRECT\nMY ANSWER: {agent1_answer}")
+                        final_answer = agent1_answer
+                        break
+                    if verification.verdict == "INCORRECT":
+                        yield "step", self.add_step("Local Verifier",
+                                                    "Found arithmetic errors:\n" + "\n".join(verification.mismatches))
 
                 # Agent 2 critiques
-                critic_prompt = f"""Review Agent 1's solution for this problem:
-
-PROBLEM: {problem}
-
-AGENT 1'S SOLUTION:
-{agent1_response}
-
-Verify the solution step-by-step and provide your verdict.
-
-Remember to end with:
-VERDICT: [CORRECT or INCORRECT]
-MY ANSWER: [number] [unit]"""
-
-                agent2_response = self.get_agent_response(critic_system, critic_prompt)
-                self.add_step("Agent 2 (Critic)", agent2_response)
-
-                # Extract Agent 2's answer and verdict
-                agent2_answer = self._extract_structured_answer(agent2_response, "MY ANSWER:")
-                verdict = self._extract_verdict(agent2_response)
+                notes = []
+                if verification is not None and verification.verdict == "INCORRECT":
+                    notes.append("An automatic arithmetic check found these errors:\n" + "\n".join(verification.mismatches))
+                if len(votes) > 1:
+                    notes.append("Other proposers answered: " + ", ".join(answer for answer, _ in votes[1:])
+                                 + ". If one of them is right, give it as your answer.")
+                critic_prompt, saved = prompts.critic(agent1_response, notes)
+                self.stats.prompt_tokens_saved += saved
+
+                critique = StructuredExtractor("MY ANSWER:")
+                async for event in self._respond("Agent 2 (Critic)", CRITIC_SYSTEM, critic_prompt,
+                                                 critique, stream_tokens):
+                    yield event
+                agent2_response = critique.text
+                yield "step", self.add_step("Agent 2 (Critic)", agent2_response)
+
+                # Agent 2's answer and verdict come from the same scan
+                agent2_answer = critique.result()
+                verdict = critique.verdict()
 
                 # Check if agents agree
                 if verdict == "CORRECT":
-                    self.add_step("System", f"✓ Agents reached consensus! Both agree the answer is: {agent2_answer}")
+                    self.stats.stop_reason = "consensus"
+                    yield "step", self.add_step("System", f"✓ Agents reached consensus! Both agree the answer is: {agent2_answer}")
                     final_answer = agent2_answer
                     break
-                else:
-                    self.add_step("System",
-                                  f"✗ Disagreement - Agent 1: {agent1_answer}, Agent 2: {agent2_answer}. Continuing debate...")
+
+                # The critic derived another proposer's answer: two independent solutions agree
+                if any(self._same_answer(agent2_answer, answer) for answer, _ in votes[1:]):
+                    self.stats.stop_reason = "critic sided with a proposer"
+                    yield "step", self.add_step("System", f"✓ Agent 2 agrees with another proposer: {agent2_answer}")
+                    final_answer = agent2_answer
+                    break
+
+                # Both agents repeated last round's answers: more rounds will not change the outcome
+                if self.adaptive and previous_answers == (agent1_answer, agent2_answer):
+                    self._skip_calls(2 * (self.max_rounds - round_num - 1))
+                    self.stats.stop_reason = "answers converged"
+                    yield "step", self.add_step("System",
+                                                f"Answers unchanged since last round - Agent 1: {agent1_answer}, Agent 2: {agent2_answer}. Stopping debate.")
+                    break
+
+                previous_answers = (agent1_answer, agent2_answer)
+                yield "step", self.add_step("System",
+                                            f"✗ Disagreement - Agent 1: {agent1_answer}, Agent 2: {agent2_answer}. Continuing debate...")
 
             # If no consensus after max rounds, use Agent 2's last answer (critic is more reliable)
             if final_answer is None:
-                self.add_step("System", f"Max rounds reached. Using Agent 2's final answer: {agent2_answer}")
+                if self.stats.stop_reason is None:
+                    self.stats.stop_reason = "max rounds"
+                    yield "step", self.add_step("System", f"Max rounds reached. Using Agent 2's final answer: {agent2_answer}")
+                else:
+                    yield "step", self.add_step("System", f"No consensus. Using Agent 2's final answer: {agent2_answer}")
                 final_answer = agent2_answer or agent1_answer or "Unable to determine"
 
-            self.add_step("System", f"FINAL ANSWER: {final_answer}")
+            yield "step", self.add_step("System", f"FINAL ANSWER: {final_answer}")
 
-            return AgentResponse(
+            self.stats.wall_time_ms = (time.perf_counter() - start) * 1000
+            record_solve("multi", True, self.stats.wall_time_ms / 1000)
+            yield "result", AgentResponse(
                 success=True,
                 final_answer=final_answer,
-                reasoning_steps=self.reasoning_steps,
-                total_steps=self.step_count
+                reasoning_steps=self.transcript.to_dicts(),
+                total_steps=self.transcript.count,
+                stats=self.stats
             )
 
         except Exception as e:
-            self.add_step("System", f"ERROR: {str(e)}")
-            return AgentResponse(
+            yield "step", self.add_step("System", f"ERROR: {str(e)}")
+            self.stats.wall_time_ms = (time.perf_counter() - start) * 1000
+            record_solve("multi", False, self.stats.wall_time_ms / 1000)
+            yield "result", AgentResponse(
                 success=False,
                 final_answer="Error in multi-agent processing",
-                reasoning_steps=self.reasoning_steps,
-                total_steps=self.step_count,
-                error=str(e)
+                reasoning_steps=self.transcript.to_dicts(),
+                total_steps=self.transcript.count,
+                error=str(e),
+                stats=self.stats
             )
 
+    @property
+    def topology(self) -> str:
+        """The model, proposer setup and prompts the answer depends on (part of the cache key)"""
+        topology = self.model
+        if self.proposers > 1:
+            models = ",".join(backend.model for backend in self.proposer_backends)
+            temperatures = ",".join(f"{temperature:g}" for temperature in self.proposer_temperatures)
+            topology += f"|proposers={models}|temperatures={temperatures}|quorum={self.quorum:g}"
+        if self.prompt_settings.layout != "full":
+            topology += f"|prompts={self.prompt_settings.layout},{self.prompt_settings.context_chars}"
+        return topology
+
+    async def _propose_in_parallel(self, system_prompt: str, user_message: str) -> List[Tuple[str, str, str]]:
+        """Ask every proposer at once; returns (agent, response, answer) for each one that replied"""
+        agents = ["Agent 1 (Proposer)"] + [f"Agent 1 (Proposer {i + 1})" for i in range(1, self.proposers)]
+        replies = await asyncio.gather(*(
+            self.get_agent_response(system_prompt, user_message, agent, temperature, backend)
+            for agent, temperature, backend in zip(agents, self.proposer_temperatures, self.proposer_backends)
+        ), return_exceptions=True)
+        proposals = [(agent, reply, self._extract_structured_answer(reply, "MY PROPOSED ANSWER:"))
+                     for agent, reply in zip(agents, replies) if not isinstance(reply, BaseException)]
+        if not proposals:
+            raise replies[0]
+        return proposals
+
+    def _vote(self, answers: List[str]) -> List[Tuple[str, int]]:
+        """Group equal answers and count them, most votes first (ties in proposer order)"""
+        clusters: List[List[Any]] = []
+        for answer in answers:
+            if not re.search(r'[0-9]', answer):
+                continue  # A proposal without a number does not vote
+            for cluster in clusters:
+                if self._same_answer(cluster[0], answer):
+                    cluster[1] += 1
+                    break
+            else:
+                clusters.append([answer, 1])
+        return sorted(((answer, count) for answer, count in clusters), key=lambda cluster: -cluster[1])
+
+    def _has_quorum(self, votes: List[Tuple[str, int]], proposals: int) -> bool:
+        """Whether the leading answer is agreed on widely enough to skip the critic"""
+        if proposals < 2 or not votes or votes[0][1] < 2:
+            return False
+        clear_lead = len(votes) == 1 or votes[0][1] > votes[1][1]
+        return clear_lead and votes[0][1] >= self.quorum * proposals
+
+    def _budget_exhausted(self, round_num: int, elapsed: float) -> Optional[str]:
+        """Name the budget ("latency" or "token") that another round would exceed, if any"""
+        if round_num == 0:
+            return None
+        if self.latency_budget_ms is not None:
+            per_round_ms = elapsed * 1000 / round_num
+            if elapsed * 1000 + per_round_ms > self.latency_budget_ms:
+                return "latency"
+        if self.token_budget is not None:
+            per_round_tokens = self.stats.tokens_used / round_num
+            if self.stats.tokens_used + per_round_tokens > self.token_budget:
+                return "token"
+        return None
+
+    def _skip_calls(self, calls: int):
+        """Record LLM calls the fixed-round loop would have made but this solve avoided"""
+        per_call = self.stats.tokens_used / self.stats.llm_calls if self.stats.llm_calls else 0
+        self.stats.calls_saved += calls
+        self.stats.tokens_saved += int(per_call * calls)
+
+    @staticmethod
+    def _same_answer(a: Optional[str], b: Optional[str]) -> bool:
+        """Compare two extracted answers by their leading number, ignoring units and formatting"""
+        if not a or not b:
+            return False
+        number_a = re.search(r'[0-9][0-9,]*(?:\.[0-9]+)?', a)
+        number_b = re.search(r'[0-9][0-9,]*(?:\.[0-9]+)?', b)
+        if number_a and number_b:
+            return float(number_a.group().replace(",", "")) == float(number_b.group().replace(",", ""))
+        return a.strip().lower() == b.strip().lower()
+
     def _extract_structured_answer(self, response: str, marker: str) -> str:
         """Extract answer from structured response using marker"""
-        # Look for the marker pattern
-        pattern = rf'{re.escape(marker)}\s*([0-9,.]+(?:\s+[a-zA-Z]+)?)'
-        match = re.search(pattern, response, re.IGNORECASE)
-
-        if match:
-            return match.group(1).strip()
-
-        # Fallback: look for answer near end of response
-        lines = response.strip().split('\n')
-        for line in reversed(lines[-5:]):  # Check last 5 lines
-            # Look for number with optional unit
-            match = re.search(r'([0-9,.]+(?:\s+[a-zA-Z]+)?)', line)
-            if match:
-                return match.group(1).strip()
-
-        return "Unable to extract"
+        return extract_structured_answer(response, marker)
 
     def _extract_verdict(self, response: str) -> str:
         """Extract verdict from Agent 2's response"""
-        match = re.search(r'VERDICT:\s*(CORRECT|INCORRECT)', response, re.IGNORECASE)
-        if match:
-            return match.group(1).upper()
-
-        # Fallback: look for consensus keywords
-        response_lower = response.lower()
-        if any(word in response_lower for word in ['correct', 'accurate', 'right', 'agree', 'looks good']):
-            return "CORRECT"
-        elif any(word in response_lower for word in ['incorrect', 'wrong', 'error', 'mistake']):
-            return "INCORRECT"
-
-        return "UNCLEAR"
+        return extract_verdict(response)
 
 
-def solve_with_multi_agent(problem: str, api_key: str) -> AgentResponse:
+async def solve_with_multi_agent(problem: str, api_key: Optional[str], latency_budget_ms: Optional[float] = None,
+                                 token_budget: Optional[int] = None) -> AgentResponse:
     """Solve a problem using multi-agent debate system"""
-    agents = DebateAgents(api_key=api_key, max_rounds=3)
-    return agents.solve(problem)
\ No newline at end of file
+    agents = DebateAgents(api_key=api_key, max_rounds=3, latency_budget_ms=latency_budget_ms,
+                          token_budget=token_budget)
+
+    # Repeated problems are served from the response cache
+    cache = get_response_cache()
+    if cache is not None:
+        cached = await cache.get_async(problem, agents.topology, agents.temperature, agents.max_rounds)
+        if cached is not None:
+            return cached
+
+    async def solve() -> AgentResponse:
+        result = await agents.solve(problem)
+        # A debate cut short by a budget is not the answer an unbudgeted request should get
+        stopped_on_budget = (result.stats.stop_reason or "").endswith(" budget") if result.stats else False
+        if cache is not None and not stopped_on_budget:
+            await cache.set_async(problem, agents.topology, agents.temperature, agents.max_rounds, result)
+        return result
+
+    # Identical problems already being debated share that debate
+    key = SingleFlight.key_for("multi", problem, api_key, agents.topology, agents.temperature, agents.max_rounds,
+                               latency_budget_ms, token_budget)
+    return await coalesce(key, solve, "multi")
+
+
+def stream_with_multi_agent(problem: str, api_key: Optional[str], latency_budget_ms: Optional[float] = None,
+                            token_budget: Optional[int] = None) -> AsyncIterator[Tuple[str, Any]]:
+    """Stream the multi-agent debate as step, delta and result events"""
+    agents = DebateAgents(api_key=api_key, max_rounds=3, latency_budget_ms=latency_budget_ms,
+                          token_budget=token_budget)
+    return agents.run(problem, stream_tokens=True, collect_steps=False)
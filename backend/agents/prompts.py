@@ -0,0 +1,183 @@
+"""
+Debate Prompts - Prompt construction for the proposer and the critic
+The full layout (the default) sends the original prompts. PROMPT_LAYOUT=compact
+opts in to prompts that start with the same text for the whole solve: the
+agent's system prompt, then the problem. Only the round-specific part
+follows, so a provider's prompt (prefix) cache can reuse the start of every
+call after the first one. Context carried over from an earlier round, such
+as the critic's feedback, is cut to a set number of characters. The
+structured VERDICT / MY ANSWER / REASON lines are always kept.
+
+The compact layout also words the instructions differently, and a model may
+answer them differently, so it is opt-in and part of the response cache key.
+"""
+
+import re
+from typing import List, Literal, Optional, Tuple
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+PROPOSER_SYSTEM = """You are Agent 1 (Proposer). Your role is to:
+1. Carefully analyze math word problems step-by-step
+2. Show all your calculations clearly
+3. Propose a solution with detailed reasoning
+4. CRITICAL: End your response with exactly this format:
+
+   MY PROPOSED ANSWER: [number] [unit]
+
+   Example: MY PROPOSED ANSWER: 10 apples
+
+Be thorough, show your work, and ALWAYS end with "MY PROPOSED ANSWER:" followed by the exact numerical answer."""
+
+CRITIC_SYSTEM = """You are Agent 2 (Critic). Your role is to:
+1. Carefully review Agent 1's step-by-step reasoning
+2. Verify each calculation
+3. Identify any logical errors or mistakes
+4. Check if all parts of the problem were addressed
+5. CRITICAL: End your response with exactly this format:
+
+   If correct:
+   VERDICT: CORRECT
+   MY ANSWER: [number] [unit]
+
+   If incorrect:
+   VERDICT: INCORRECT
+   MY ANSWER: [number] [unit]
+   REASON: [brief explanation of the error]
+
+Example if correct: 
+VERDICT: CORRECT
+MY ANSWER: 10 apples
+
+Example if incorrect:
+VERDICT: INCORRECT  
+MY ANSWER: 12 apples
+REASON: Agent 1 forgot to divide by 2 in the final step
+
+ALWAYS provide a verdict and your calculated answer."""
+
+# Lines that carry an agent's conclusion, never trimmed from carried-over context
+STRUCTURED_LINES = ("MY PROPOSED ANSWER:", "VERDICT:", "MY ANSWER:", "REASON:")
+
+
+class PromptSettings(BaseSettings):
+    """Prompt construction settings, overridable with PROMPT_* environment variables"""
+    model_config = SettingsConfigDict(env_prefix="PROMPT_")
+
+    layout: Literal["full", "compact"] = "full"  # "compact" opts in to stable prefixes and capped context
+    context_chars: int = 600  # Most characters of earlier-round reasoning carried into a prompt
+
+
+def tidy(text: str) -> str:
+    """Text without trailing spaces or runs of blank lines"""
+    text = "\n".join(line.rstrip() for line in text.strip().splitlines())
+    return re.sub(r"\n{3,}", "\n\n", text)
+
+
+def condense(text: str, limit: int) -> str:
+    """
+    Reasoning cut to about limit characters. The structured answer lines are
+    always kept, and the reasoning closest to them (the conclusion) goes first.
+    """
+    lines = [line for line in tidy(text).splitlines() if line.strip()]
+    if sum(len(line) + 1 for line in lines) <= limit:
+        return "\n".join(lines)
+
+    structured = {i for i, line in enumerate(lines) if line.lstrip().upper().startswith(STRUCTURED_LINES)}
+    budget = limit - sum(len(lines[i]) + 1 for i in structured)
+    kept = set(structured)
+    for i in reversed(range(len(lines))):
+        if i in structured:
+            continue
+        if len(lines[i]) + 1 > budget:
+            break
+        kept.add(i)
+        budget -= len(lines[i]) + 1
+
+    trimmed = sum(len(line) + 1 for i, line in enumerate(lines) if i not in kept)
+    condensed = [f"[{trimmed} characters of earlier reasoning trimmed]"]
+    condensed.extend(line for i, line in enumerate(lines) if i in kept)
+    return "\n".join(condensed)
+
+
+def _tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), as estimate_tokens uses"""
+    return len(text) // 4
+
+
+class DebatePrompts:
+    """
+    Builds one solve's user prompts. Each method returns the prompt and the
+    prompt tokens it saves compared with the full layout (0 in the full layout).
+    A compact revision prompt repeats the problem and the previous answer,
+    which the full one leaves out, so it can be the longer one; it counts as
+    saving 0 rather than a negative amount.
+    """
+
+    def __init__(self, problem: str, settings: Optional[PromptSettings] = None):
+        self.problem = problem
+        self.settings = settings or PromptSettings()
+        self.compact = self.settings.layout == "compact"
+
+    def _saving(self, full: str, compact: str) -> Tuple[str, int]:
+        if not self.compact:
+            return full, 0
+        return compact, max(0, _tokens(full) - _tokens(compact))
+
+    def proposer(self, feedback: Optional[str] = None, previous: Optional[str] = None) -> Tuple[str, int]:
+        """The first-round prompt, or a revision prompt with the critic's feedback on the previous answer"""
+        if feedback is None:
+            full = f"""Solve this problem step by step:
+
+{self.problem}
+
+Remember to:
+1. Show all your calculations
+2. Explain each step clearly
+3. End with "MY PROPOSED ANSWER: [number] [unit]" """
+            compact = f"""PROBLEM: {self.problem}
+
+Solve this problem step by step, showing all your calculations.
+End with "MY PROPOSED ANSWER: [number] [unit]" """
+            return self._saving(full, compact)
+
+        full = f"""Agent 2 found an issue with your previous answer.
+
+Agent 2's feedback: {feedback}
+
+Please recalculate and provide a corrected solution.
+
+Remember to end with "MY PROPOSED ANSWER: [number] [unit]" """
+        compact = f"PROBLEM: {self.problem}\n\n"
+        if previous:
+            compact += f"Your previous answer: {previous}\n"
+        compact += f"""Agent 2's feedback:
+{condense(feedback, self.settings.context_chars)}
+
+Recalculate and give a corrected solution.
+End with "MY PROPOSED ANSWER: [number] [unit]" """
+        return self._saving(full, compact)
+
+    def critic(self, solution: str, notes: List[str]) -> Tuple[str, int]:
+        """The review prompt for the current proposal, with any notes (verifier errors, other answers) after it"""
+        instructions = """Verify the solution step-by-step and provide your verdict.
+
+Remember to end with:
+VERDICT: [CORRECT or INCORRECT]
+MY ANSWER: [number] [unit]"""
+        full = f"""Review Agent 1's solution for this problem:
+
+PROBLEM: {self.problem}
+
+AGENT 1'S SOLUTION:
+{solution}
+
+{instructions}""" + "".join(f"\n\n{note}" for note in notes)
+        compact = f"""PROBLEM: {self.problem}
+
+Review Agent 1's solution for this problem.
+
+AGENT 1'S SOLUTION:
+{tidy(solution)}
+""" + "".join(f"\n{note}\n" for note in notes) + f"\n{instructions}"
+        return self._saving(full, compact)
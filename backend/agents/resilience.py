@@ -0,0 +1,330 @@
+"""
+Resilient Calls - Classified errors, retries, circuit breaking and hedging
+Every provider call from both agents goes through a ResilientCaller (one per
+provider, held by the ClientRegistry). Failures are classified into LLMError
+subclasses instead of being turned into "Error: ..." text. Transient ones
+(5xx, timeouts, connection errors, 429) are retried with jittered
+exponential backoff that honors Retry-After. Permanent ones (auth, bad
+request) fail at once. A circuit breaker stops calling a provider that keeps
+failing, so solves fail fast instead of waiting out timeouts. Optional
+hedging sends a second copy of a call that is slower than the recent p95
+latency and takes whichever answers first. Retries alone raise the success
+rate but lengthen the tail, since a retried call waits out a failure and a
+backoff first; hedging takes the slowest calls out of the tail again. It is
+off by default because every hedge is a second paid call, so operators turn
+it on (LLM_HEDGE=true) where tail latency is worth that.
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+import httpx
+import openai
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from services.metrics import LLM_CIRCUIT_OPENS, LLM_HEDGES, LLM_RETRIES
+
+T = TypeVar("T")
+
+
+class ResilienceSettings(BaseSettings):
+    """Retry, circuit breaker and hedging settings, overridable with LLM_* environment variables"""
+    model_config = SettingsConfigDict(env_prefix="LLM_")
+
+    max_attempts: int = 3            # Attempts per call, including the first
+    backoff_base: float = 0.5        # Seconds; the retry delay cap doubles from here
+    backoff_max: float = 8.0
+    max_retry_after: float = 30.0    # Fail instead of waiting longer than this for Retry-After
+    attempt_timeout: float = 30.0    # Per attempt (time to first token when streaming)
+    breaker_threshold: int = 5       # Consecutive failures that open the circuit
+    breaker_reset: float = 30.0      # Seconds the circuit stays open before a trial call
+    hedge: bool = False              # Send a second request when the first is slower than usual (cuts the
+                                     # tail retries add, for a few percent more paid calls)
+    hedge_quantile: float = 0.95
+    hedge_min_samples: int = 20      # Successful calls observed before hedging starts
+
+
+class LLMError(Exception):
+    """A provider call that failed; `kind` labels it in metrics"""
+    kind = "error"
+    retryable = False
+
+    def __init__(self, message: str, provider: Optional[str] = None, status: Optional[int] = None,
+                 retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.provider = provider
+        self.status = status
+        self.retry_after = retry_after
+
+
+class RateLimited(LLMError):
+    """429 from the provider"""
+    kind = "rate_limited"
+    retryable = True
+
+
+class ProviderUnavailable(LLMError):
+    """5xx, dropped connection or similar: the provider may recover"""
+    kind = "unavailable"
+    retryable = True
+
+
+class ProviderTimeout(ProviderUnavailable):
+    """No response (or no first token) within the attempt timeout"""
+    kind = "timeout"
+
+
+class RequestRejected(LLMError):
+    """4xx other than 429 (bad key, bad request): retrying will not help"""
+    kind = "rejected"
+
+
+class CircuitOpen(LLMError):
+    """The provider's circuit breaker is open, so the call was not made"""
+    kind = "circuit_open"
+
+
+def _retry_after(headers) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    value = headers.get("retry-after") if headers is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify(error: Exception, provider: Optional[str] = None) -> LLMError:
+    """Turn an exception from an HTTP or OpenAI client call into an LLMError"""
+    if isinstance(error, LLMError):
+        return error
+
+    if isinstance(error, httpx.HTTPStatusError):
+        status, headers = error.response.status_code, error.response.headers
+        message = f"API Error: {status} - {error.response.text}"
+    elif isinstance(error, openai.APIStatusError):
+        status, headers = error.status_code, error.response.headers
+        message = error.message
+    elif isinstance(error, (httpx.TimeoutException, openai.APITimeoutError, asyncio.TimeoutError)):
+        return ProviderTimeout("Request timed out", provider)
+    elif isinstance(error, (httpx.TransportError, openai.APIConnectionError)):
+        return ProviderUnavailable(f"Connection error: {error}", provider)
+    else:
+        return LLMError(f"Error querying model: {error}", provider)
+
+    if status == 429:
+        return RateLimited(message, provider, status, _retry_after(headers))
+    if status == 408 or status >= 500:
+        return ProviderUnavailable(message, provider, status, _retry_after(headers))
+    return RequestRejected(message, provider, status)
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and rejects calls for `reset`
+    seconds, then lets one trial call through: success closes the circuit,
+    failure opens it again.
+    """
+
+    def __init__(self, threshold: int = 5, reset: float = 30.0):
+        self.threshold = threshold
+        self.reset = reset
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "open" if time.monotonic() - self.opened_at < self.reset else "half_open"
+
+    def check(self, provider: str) -> bool:
+        """Raise CircuitOpen unless a call may go ahead; returns True when the call is the trial"""
+        if self.opened_at is None:
+            return False
+        now = time.monotonic()
+        remaining = self.reset - (now - self.opened_at)
+        # One trial call at a time once the reset time has passed (a lost trial frees up after `reset`)
+        if remaining > 0 or (self._trial_at is not None and now - self._trial_at < self.reset):
+            raise CircuitOpen(f"Circuit open for {provider}: too many recent failures", provider,
+                              retry_after=max(remaining, 0.0))
+        self._trial_at = now
+        return True
+
+    def end_trial(self):
+        """
+        Let the next call be the trial. For a trial that ended without a success
+        or a counted failure (a 429, another 4xx, a cancelled call), which would
+        otherwise keep every call out for another `reset` seconds.
+        """
+        self._trial_at = None
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_at = None
+
+    def failure(self) -> bool:
+        """Count a failure; returns True when this opens the circuit"""
+        self.failures += 1
+        was_closed = self.opened_at is None
+        if not was_closed or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+            self._trial_at = None
+            return was_closed
+        return False
+
+
+class LatencyWindow:
+    """Latencies of the most recent successful calls"""
+
+    def __init__(self, size: int = 200):
+        self.samples = deque(maxlen=size)
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+
+    def quantile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        if len(self.samples) < max(1, min_samples):
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ResilientCaller:
+    """Retries, circuit breaking and hedging for one provider"""
+
+    def __init__(self, provider: str, settings: Optional[ResilienceSettings] = None):
+        self.provider = provider
+        self.settings = settings or ResilienceSettings()
+        self.breaker = CircuitBreaker(self.settings.breaker_threshold, self.settings.breaker_reset)
+        self.latencies = LatencyWindow()
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter exponential delay before retry number `attempt`, at least Retry-After"""
+        cap = min(self.settings.backoff_max, self.settings.backoff_base * 2 ** (attempt - 1))
+        delay = random.uniform(0, cap)
+        return max(delay, retry_after) if retry_after is not None else delay
+
+    async def call(self, attempt: Callable[[], Awaitable[T]]) -> T:
+        """Run `attempt` (one provider request) until it succeeds or the failure is final"""
+        for number in range(1, self.settings.max_attempts + 1):
+            trial = self.breaker.check(self.provider)
+            try:
+                if self.settings.hedge:
+                    result = await self._hedged(attempt)
+                else:
+                    result = await self._attempt(attempt)
+            except LLMError as error:
+                await self._failed(error, number)
+                continue
+            finally:
+                if trial:
+                    self.breaker.end_trial()
+            self.breaker.success()
+            return result
+
+    async def stream(self, attempt: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """
+        Stream deltas from `attempt`, retrying until the first delta arrives.
+        Once output has been passed on, a failure is raised rather than retried
+        so no text is duplicated.
+        """
+        for number in range(1, self.settings.max_attempts + 1):
+            trial = self.breaker.check(self.provider)
+            try:
+                deltas = attempt()
+                start = time.perf_counter()
+                try:
+                    first = await asyncio.wait_for(deltas.__anext__(), self.settings.attempt_timeout)
+                except StopAsyncIteration:
+                    self.breaker.success()
+                    return
+                except Exception as error:
+                    await deltas.aclose()
+                    await self._failed(classify(error, self.provider), number)
+                    continue
+                self.latencies.observe(time.perf_counter() - start)
+
+                try:
+                    yield first
+                    async for delta in deltas:
+                        yield delta
+                except LLMError as error:
+                    if isinstance(error, ProviderUnavailable):
+                        self._count_failure()
+                    raise
+                self.breaker.success()
+                return
+            finally:
+                if trial:
+                    self.breaker.end_trial()
+
+    async def _attempt(self, attempt: Callable[[], Awaitable[T]]) -> T:
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(attempt(), self.settings.attempt_timeout)
+        except Exception as error:
+            raise classify(error, self.provider) from error
+        self.latencies.observe(time.perf_counter() - start)
+        return result
+
+    async def _hedged(self, attempt: Callable[[], Awaitable[T]]) -> T:
+        """Send a second request if the first outlives the recent latency quantile; first success wins"""
+        threshold = self.latencies.quantile(self.settings.hedge_quantile, self.settings.hedge_min_samples)
+        if threshold is None or self.breaker.state != "closed":
+            return await self._attempt(attempt)
+
+        pending = {self._start(attempt)}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=threshold)
+            if done:
+                return done.pop().result()
+
+            LLM_HEDGES.inc(self.provider, "sent")
+            hedge = self._start(attempt)
+            pending.add(hedge)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            LLM_HEDGES.inc(self.provider, "won")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _start(self, attempt: Callable[[], Awaitable[T]]) -> asyncio.Task:
+        task = asyncio.ensure_future(self._attempt(attempt))
+        # The losing request's error (if any) is expected, so it is retrieved to keep asyncio quiet
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        return task
+
+    async def _failed(self, error: LLMError, number: int):
+        """Count a failed attempt, then wait before the next one or raise if there is none"""
+        if isinstance(error, ProviderUnavailable):
+            self._count_failure()
+        retry_after = error.retry_after
+        if (not error.retryable or number >= self.settings.max_attempts
+                or (retry_after is not None and retry_after > self.settings.max_retry_after)):
+            raise error
+        LLM_RETRIES.inc(self.provider, error.kind)
+        await asyncio.sleep(self.backoff(number, retry_after))
+
+    def _count_failure(self):
+        if self.breaker.failure():
+            LLM_CIRCUIT_OPENS.inc(self.provider)
@@ -3,83 +3,139 @@ Single Agent - Using Small Model from Hugging Face Router
 This uses a small parameter model that will struggle with complex reasoning
 """
 
-import requests
-import os
-from typing import List
-from models.schemas import ReasoningStep, AgentResponse
+import time
+from typing import Any, AsyncIterator, List, Optional, Tuple
+from models.schemas import AgentResponse, SolveStats
+from models.transcript import Step, Transcript
+from agents.extraction import FinalAnswerExtractor, extract_final_answer
+from agents.backends import ModelBackend, get_model_backend
+from agents.clients import ClientRegistry, get_client_registry
+from agents.resilience import classify
+from services.cache import get_response_cache
+from services.memo import get_llm_memo, sampling_temperature
+from services.metrics import estimate_tokens, record_llm_call, record_solve
+from services.singleflight import SingleFlight, coalesce
 
 
 class SmallModelAgent:
     """A single agent powered by a small model from Hugging Face Router"""
 
-    def __init__(self, api_key: str):
-        """Initialize the small model agent with Hugging Face API key"""
-        if not api_key or api_key == "your_huggingface_api_key_here":
-            raise ValueError("Please set a valid HUGGINGFACE_API_KEY in your .env file")
-
-        self.api_key = api_key
-        self.api_url = "https://router.huggingface.co/v1/chat/completions"
-        self.headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-
-        # Use a small model that will struggle with complex reasoning
-        # You can change this to other small models
-        self.model = "katanemo/Arch-Router-1.5B:hf-inference"
-        # Alternative small models to try:
-        # self.model = "google/gemma-2b-it"
-        # self.model = "microsoft/phi-2"
-
-        self.reasoning_steps: List[ReasoningStep] = []
-        self.step_count = 0
-
-    def add_step(self, agent: str, content: str):
-        """Add a reasoning step"""
-        self.step_count += 1
-        step = ReasoningStep(
-            agent=agent,
-            content=content,
-            step_number=self.step_count
-        )
-        self.reasoning_steps.append(step)
-
-    def query_model(self, messages: List[dict]) -> dict:
-        """Query Hugging Face Router API"""
-        payload = {
-            "model": self.model,
-            "messages": messages,
-            "max_tokens": 500,
-            "temperature": 0.7
-        }
-
+    def __init__(self, api_key: Optional[str], clients: Optional[ClientRegistry] = None,
+                 backend: Optional[ModelBackend] = None):
+        """Initialize the small model agent on the configured backend (the Hugging Face router by default)"""
+        self.clients = clients or get_client_registry()
+        self.backend = backend or get_model_backend("single", api_key, self.clients)
+        self.caller = self.clients.caller(self.backend.name)
+        self.model = self.backend.model
+        self.temperature = sampling_temperature(0.7)
+
+        self.transcript = Transcript()
+        self.stats = SolveStats()
+
+    def add_step(self, agent: str, content: str) -> Step:
+        """Add a reasoning step (only kept in memory when collecting a transcript)"""
+        return self.transcript.add(agent, content)
+
+    async def query_model(self, messages: List[dict]) -> dict:
+        """Query the model backend without blocking the event loop (raises LLMError once retries are exhausted)"""
+        params = {"max_tokens": 500, "temperature": self.temperature}
+
+        # Identical deterministic calls are replayed from the memo
+        memo = get_llm_memo()
+        if memo is not None:
+            reply = await memo.get_async(self.model, messages, params)
+            if reply is not None:
+                return {"choices": [{"message": {"role": "assistant", "content": reply}}]}
+
+        result = await self.caller.call(lambda: self._complete(messages, params))
+        if memo is not None and result.get("choices"):
+            await memo.set_async(self.model, messages, params, result["choices"][0]["message"]["content"])
+        return result
+
+    async def _complete(self, messages: List[dict], params: dict) -> dict:
+        """Make one request to the backend, returned in chat completions form"""
+        start = time.perf_counter()
         try:
-            response = requests.post(
-                self.api_url,
-                headers=self.headers,
-                json=payload,
-                timeout=60
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.HTTPError as e:
-            raise Exception(f"API Error: {e.response.status_code} - {e.response.text}")
-        except requests.exceptions.Timeout:
-            raise Exception("Request timed out")
+            completion = await self.backend.complete(messages, params)
+        except Exception as e:
+            error = classify(e, self.backend.name)
+            self._record_call(start, messages, None, error.kind)
+            raise error from e
+
+        usage = None
+        if completion.prompt_tokens is not None:
+            usage = {"prompt_tokens": completion.prompt_tokens, "completion_tokens": completion.completion_tokens}
+        self._record_call(start, messages, completion.text, usage=usage)
+        return {"choices": [{"message": {"role": "assistant", "content": completion.text}}], "usage": usage}
+
+    def _record_call(self, start: float, messages: List[dict], reply: Optional[str],
+                     status: str = "ok", usage: Optional[dict] = None):
+        """Record a provider call, using reported usage when the backend returns it"""
+        if usage and "prompt_tokens" in usage:
+            tokens = usage["prompt_tokens"], usage.get("completion_tokens") or 0
+        else:
+            tokens = estimate_tokens(messages, reply or "")
+        record_llm_call(self.stats, self.backend.name, self.model, "Small Model Agent",
+                        time.perf_counter() - start, *tokens, status)
+
+    async def stream_model(self, messages: List[dict]) -> AsyncIterator[str]:
+        """Stream token deltas from the model backend"""
+        params = {"max_tokens": 500, "temperature": self.temperature}
+
+        memo = get_llm_memo()
+        if memo is not None:
+            reply = await memo.get_async(self.model, messages, params)
+            if reply is not None:
+                yield reply
+                return
+
+        chunks = []
+        async for delta in self.caller.stream(lambda: self._stream(messages, params)):
+            chunks.append(delta)
+            yield delta
+
+        if memo is not None:
+            await memo.set_async(self.model, messages, params, "".join(chunks))
+
+    async def _stream(self, messages: List[dict], params: dict) -> AsyncIterator[str]:
+        """Make one streaming request to the backend"""
+        chunks = []
+        start = time.perf_counter()
+        try:
+            async for delta in self.backend.stream(messages, params):
+                chunks.append(delta)
+                yield delta
         except Exception as e:
-            raise Exception(f"Error querying model: {str(e)}")
+            error = classify(e, self.backend.name)
+            self._record_call(start, messages, None, error.kind)
+            raise error from e
 
-    def solve(self, problem: str) -> AgentResponse:
+        # Streamed completions carry no usage block, so tokens are estimated
+        self._record_call(start, messages, "".join(chunks))
+
+    async def solve(self, problem: str) -> AgentResponse:
         """
         Solve the problem using a small model.
         This is a very small model that will struggle
         with complex multi-step reasoning problems.
         """
-        self.reasoning_steps = []
-        self.step_count = 0
+        async for event, payload in self.run(problem):
+            if event == "result":
+                return payload
+
+    async def run(self, problem: str, stream_tokens: bool = False,
+                  collect_steps: bool = True) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Run the small model as a stream of events:
+        ("step", Step) for every add_step, ("delta", {...}) for token
+        deltas when stream_tokens is set, and a final ("result", AgentResponse).
+        """
+        self.transcript = Transcript(collect=collect_steps)
+        self.stats = SolveStats(rounds=1)
+        start = time.perf_counter()
 
         try:
-            self.add_step("Small Model Agent", f"Received problem: {problem}")
+            yield "step", self.add_step("Small Model Agent", f"Received problem: {problem}")
 
             # Create messages for the chat API
             messages = [
@@ -93,83 +149,91 @@ class SmallModelAgent:
                 }
             ]
 
-            self.add_step("Small Model Agent", f"Sending problem to {self.model}...")
-
-            # Call Hugging Face Router API
-            response = self.query_model(messages)
-
-            # Extract response text
-            if "choices" in response and len(response["choices"]) > 0:
-                response_text = response["choices"][0]["message"]["content"]
+            yield "step", self.add_step("Small Model Agent", f"Sending problem to {self.model}...")
+
+            # Call the model backend
+            extractor = None
+            if stream_tokens:
+                # The answer is parsed while tokens arrive, so no rescan is needed at the end
+                extractor = FinalAnswerExtractor()
+                async for delta in self.stream_model(messages):
+                    extractor.feed(delta)
+                    yield "delta", {"agent": "Small Model Agent", "content": delta}
+                response_text = extractor.text
             else:
-                raise Exception(f"Unexpected response format: {response}")
+                response = await self.query_model(messages)
 
-            self.add_step("Small Model Agent", "Received response from model")
+                # Extract response text
+                if "choices" in response and len(response["choices"]) > 0:
+                    response_text = response["choices"][0]["message"]["content"]
+                else:
+                    raise Exception(f"Unexpected response format: {response}")
+
+            yield "step", self.add_step("Small Model Agent", "Received response from model")
 
             # Add the model's reasoning as steps
             if response_text:
                 lines = response_text.strip().split('\n')
                 for line in lines:
                     if line.strip():
-                        self.add_step("Small Model Agent", line.strip())
+                        yield "step", self.add_step("Small Model Agent", line.strip())
 
             # Extract the final answer
-            final_answer = self._extract_answer(response_text)
+            final_answer = extractor.result() if extractor else self._extract_answer(response_text)
 
-            self.add_step("Small Model Agent", f"Extracted Answer: {final_answer}")
+            yield "step", self.add_step("Small Model Agent", f"Extracted Answer: {final_answer}")
 
-            return AgentResponse(
+            self.stats.wall_time_ms = (time.perf_counter() - start) * 1000
+            record_solve("single", True, self.stats.wall_time_ms / 1000)
+            yield "result", AgentResponse(
                 success=True,
                 final_answer=final_answer,
-                reasoning_steps=self.reasoning_steps,
-                total_steps=self.step_count
+                reasoning_steps=self.transcript.to_dicts(),
+                total_steps=self.transcript.count,
+                stats=self.stats
             )
 
         except Exception as e:
-            self.add_step("Small Model Agent", f"ERROR: {str(e)}")
-            return AgentResponse(
+            yield "step", self.add_step("Small Model Agent", f"ERROR: {str(e)}")
+            self.stats.wall_time_ms = (time.perf_counter() - start) * 1000
+            record_solve("single", False, self.stats.wall_time_ms / 1000)
+            yield "result", AgentResponse(
                 success=False,
                 final_answer="Error occurred",
-                reasoning_steps=self.reasoning_steps,
-                total_steps=self.step_count,
-                error=str(e)
+                reasoning_steps=self.transcript.to_dicts(),
+                total_steps=self.transcript.count,
+                error=str(e),
+                stats=self.stats
             )
 
     def _extract_answer(self, response: str) -> str:
         """Extract the numerical answer from model's response"""
-        import re
-
-        if not response:
-            return "No response"
+        return extract_final_answer(response)
 
-        # Look for "FINAL ANSWER:" pattern first (most reliable)
-        match = re.search(r'FINAL ANSWER:\s*([0-9,.]+(?:\s+\w+)?)', response, re.IGNORECASE)
-        if match:
-            return match.group(1).strip()
 
-        # Look for other common answer patterns
-        patterns = [
-            r'(?:the answer is|answer:|result:|total:)\s*([0-9,.]+)',
-            r'(?:therefore|thus|so),?\s+(?:the answer is|there (?:are|is))\s*([0-9,.]+)',
-            r'(?:=|equals)\s*([0-9,.]+)\s*(?:apples|marbles|meters|miles|dollars|$)?',
-        ]
+async def solve_with_single_agent(problem: str, api_key: Optional[str]) -> AgentResponse:
+    """Solve a problem using the small model single agent"""
+    agent = SmallModelAgent(api_key)
 
-        response_lower = response.lower()
-        for pattern in patterns:
-            match = re.search(pattern, response_lower)
-            if match:
-                return match.group(1)
+    # Repeated problems are served from the response cache
+    cache = get_response_cache()
+    if cache is not None:
+        cached = await cache.get_async(problem, agent.model, agent.temperature, 1)
+        if cached is not None:
+            return cached
 
-        # Fallback: find the last number mentioned in the response
-        numbers = re.findall(r'\b([0-9,.]+)\b', response)
-        if numbers:
-            # Return the last number (likely the final answer)
-            return numbers[-1]
+    async def solve() -> AgentResponse:
+        result = await agent.solve(problem)
+        if cache is not None:
+            await cache.set_async(problem, agent.model, agent.temperature, 1, result)
+        return result
 
-        return "Unable to extract answer"
+    # Identical problems already being solved share that solve
+    key = SingleFlight.key_for("single", problem, api_key, agent.model, agent.temperature)
+    return await coalesce(key, solve, "single")
 
 
-def solve_with_single_agent(problem: str, api_key: str) -> AgentResponse:
-    """Solve a problem using the small model single agent"""
+def stream_with_single_agent(problem: str, api_key: Optional[str]) -> AsyncIterator[Tuple[str, Any]]:
+    """Stream the small model's solve as step, delta and result events"""
     agent = SmallModelAgent(api_key)
-    return agent.solve(problem)
\ No newline at end of file
+    return agent.run(problem, stream_tokens=True, collect_steps=False)
@@ -0,0 +1,194 @@
+"""
+Local Verifier - Deterministic arithmetic check of a proposer's solution
+Pulls "expression = result" calculations out of the response, evaluates each
+expression with a safe AST evaluator and compares it with the stated result.
+Verdicts use the critic's vocabulary (CORRECT / INCORRECT / UNCLEAR) so the
+debate loop can treat them the same way as _extract_verdict.
+
+A CORRECT verdict needs the work to be one fully checked derivation: every
+calculation checks out, the final answer is the result of the last one,
+every earlier result feeds into a later calculation, and every quantity in
+the problem is used, including ones written as words ("twice", "half",
+"three times"). Anything weaker is UNCLEAR. "Total = 8 + 5 = 13" is a
+correct sum, but for a problem where Tom has twice as many marbles it never
+uses the 2, so it is not CORRECT. The debate ends without a critic call on
+CORRECT and passes INCORRECT mismatches to the critic.
+
+Percentages are read only where their meaning is unambiguous: "20% of 50",
+or a percentage multiplied or divided ("50 * 20%"). "50 + 20% = 60" could
+mean 50 + 20% of 50, so a calculation like that is left unchecked rather
+than flagged as wrong.
+"""
+
+import ast
+import operator
+import re
+from typing import List, Optional, Tuple
+
+_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+_UNARY = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+_THOUSANDS = re.compile(r"(?<=\d),(?=\d{3}\b)")
+_TIMES = re.compile(r"(?<=[\d)])\s*[xX×·]\s*(?=[\d(])")
+_PERCENT_OF = re.compile(r"(\d+(?:\.\d+)?)\s*%\s+of\s+", re.IGNORECASE)
+_PERCENT_FACTOR_AFTER = re.compile(r"([*/]\s*)(\d+(?:\.\d+)?)\s*%")
+_PERCENT_FACTOR_BEFORE = re.compile(r"(\d+(?:\.\d+)?)\s*%(?=\s*[*/])")
+_STATED_PERCENT = re.compile(r"^\s*%")
+_TRAILING_EXPRESSION = re.compile(r"[\d.\s+\-*/^()]+$")
+_LEADING_NUMBER = re.compile(r"^\s*-?\d+(?:\.\d+)?")
+_HAS_OPERATOR = re.compile(r"\d\s*(?:[+\-/^]|\*\*?)\s*[\d(]")
+
+# Quantities problems write as words ("one" is left out: "one train" is rarely a factor)
+_NUMBER_WORDS = {
+    "twice": 2, "double": 2, "doubled": 2, "half": 2, "halved": 2, "two": 2,
+    "triple": 3, "tripled": 3, "thrice": 3, "three": 3, "quarter": 4, "four": 4,
+    "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+    "eleven": 11, "twelve": 12, "dozen": 12, "twenty": 20, "hundred": 100,
+}
+_NUMBER_WORD = re.compile(r"\b(" + "|".join(_NUMBER_WORDS) + r")\b", re.IGNORECASE)
+
+
+def safe_eval(expression: str) -> Optional[float]:
+    """Evaluate a plain arithmetic expression, or return None if it is not one"""
+    if len(expression) > 200:
+        return None
+    try:
+        tree = ast.parse(expression.replace("^", "**"), mode="eval")
+        return float(_eval_node(tree.body))
+    except (SyntaxError, ValueError, TypeError, ZeroDivisionError, OverflowError):
+        return None
+
+
+def _eval_node(node):
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+        left, right = _eval_node(node.left), _eval_node(node.right)
+        if isinstance(node.op, ast.Pow) and (abs(right) > 100 or abs(left) > 1e6):
+            raise ValueError("exponent too large")
+        return _OPERATORS[type(node.op)](left, right)
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY:
+        return _UNARY[type(node.op)](_eval_node(node.operand))
+    raise ValueError(f"unsupported expression: {ast.dump(node)}")
+
+
+def _normalize(text: str) -> str:
+    """Rewrite the usual ways models write arithmetic into Python syntax"""
+    text = _THOUSANDS.sub("", text)
+    text = re.sub(r"[$€£]", "", text)
+    text = text.replace("−", "-").replace("÷", "/")
+    text = _TIMES.sub(" * ", text)
+    text = _PERCENT_OF.sub(r"(\1 / 100) * ", text)
+    # Any other percentage (e.g. "50 + 20%") keeps its % sign, which no expression is read across
+    text = _PERCENT_FACTOR_AFTER.sub(r"\1(\2 / 100)", text)
+    return _PERCENT_FACTOR_BEFORE.sub(r"(\1 / 100)", text)
+
+
+def _close(computed: float, stated: str) -> bool:
+    """Compare allowing for the rounding implied by the stated number of decimals"""
+    decimals = len(stated.split(".")[1]) if "." in stated else 0
+    tolerance = 0.5 * 10 ** -decimals + 1e-9 * abs(computed)
+    return abs(computed - float(stated)) <= tolerance
+
+
+def extract_calculations(response: str) -> List[Tuple[str, float, str]]:
+    """Find (expression, computed value, stated result) triples in a response"""
+    calculations = []
+    for line in _normalize(response).splitlines():
+        segments = line.split("=")
+        for left, right in zip(segments, segments[1:]):
+            expression = _TRAILING_EXPRESSION.search(left)
+            stated = _LEADING_NUMBER.match(right)
+            if not expression or not stated:
+                continue
+            if left[:expression.start()].rstrip().endswith("%"):
+                continue  # The expression is the tail of one with an unreadable percentage in it
+            expression_text = expression.group().strip()
+            # Drop unbalanced leading parentheses left over from surrounding prose
+            while expression_text.count("(") > expression_text.count(")") and expression_text.startswith("("):
+                expression_text = expression_text[1:].strip()
+            if not _HAS_OPERATOR.search(expression_text):
+                continue
+            computed = safe_eval(expression_text)
+            if computed is None:
+                continue
+            stated_text = stated.group().strip()
+            # "10 / 50 = 20%" states the result as a percentage
+            if _STATED_PERCENT.match(right[stated.end():]) and _close(computed * 100, stated_text):
+                computed *= 100
+            calculations.append((expression_text, computed, stated_text))
+    return calculations
+
+
+class Verification:
+    """Outcome of a local check: a verdict plus what was checked"""
+
+    def __init__(self, verdict: str, checked: int, mismatches: List[str], reason: str):
+        self.verdict = verdict
+        self.checked = checked
+        self.mismatches = mismatches
+        self.reason = reason
+
+
+def _used_numbers(calculations: List[Tuple[str, float, str]]) -> List[float]:
+    return [float(n) for expression, _, _ in calculations for n in _NUMBER.findall(expression)]
+
+
+def _covers(problem: str, calculations: List[Tuple[str, float, str]]) -> bool:
+    """True if every number in the problem, in digits or words, is used by the calculations"""
+    used = _used_numbers(calculations)
+    for raw in _NUMBER.findall(_THOUSANDS.sub("", problem)):
+        value = float(raw)
+        # Percentages are often applied as factors, e.g. +20% as 1.2
+        forms = {value, value / 100, round(1 + value / 100, 10), round(1 - value / 100, 10)}
+        if not any(abs(form - u) < 1e-9 for form in forms for u in used):
+            return False
+    for word in _NUMBER_WORD.findall(problem):
+        value = _NUMBER_WORDS[word.lower()]
+        # "half" is as likely to be written "* 0.5" as "/ 2"
+        if not any(abs(form - u) < 1e-9 for form in (value, 1 / value) for u in used):
+            return False
+    return True
+
+
+def _connected(calculations: List[Tuple[str, float, str]]) -> bool:
+    """True if every result but the last is used by a later calculation, so the work is one derivation"""
+    for i, (_, _, stated) in enumerate(calculations[:-1]):
+        later = _used_numbers(calculations[i + 1:])
+        if not any(_close(u, stated) for u in later):
+            return False
+    return True
+
+
+def verify_solution(problem: str, response: str, answer: str) -> Verification:
+    """Check a proposer's arithmetic and whether it leads to the proposed answer (not whether it solves the problem)"""
+    calculations = extract_calculations(response)
+    if not calculations:
+        return Verification("UNCLEAR", 0, [], "no calculations found")
+
+    mismatches = [
+        f"{expression} = {stated} (actually {computed:g})"
+        for expression, computed, stated in calculations
+        if not _close(computed, stated)
+    ]
+    if mismatches:
+        return Verification("INCORRECT", len(calculations), mismatches, "arithmetic error")
+
+    answer_number = _NUMBER.search(_THOUSANDS.sub("", answer or ""))
+    if not answer_number or not _close(calculations[-1][1], answer_number.group()):
+        return Verification("UNCLEAR", len(calculations), [], "answer is not the result of the last calculation")
+    if not _connected(calculations):
+        return Verification("UNCLEAR", len(calculations), [], "a result is not used on the way to the answer")
+    if not _covers(problem, calculations):
+        return Verification("UNCLEAR", len(calculations), [], "not every quantity in the problem was used")
+
+    return Verification("CORRECT", len(calculations), [], "one checked derivation from every quantity to the answer")
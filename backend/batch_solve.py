@@ -0,0 +1,96 @@
+"""
+Batch Solve CLI - Push a file of problems through the single or multi pipeline
+Input is a JSONL file of ProblemRequest objects (an optional "id" field keeps
+results traceable) or a JSON list of them. Results are appended to the output
+JSONL file as each problem finishes; re-running the same command skips every
+problem that already has a result, so interrupted runs resume where they left off.
+
+Usage (from the backend directory):
+    python batch_solve.py problems.jsonl --mode multi --concurrency 8 --output results.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from typing import List, Set
+
+from dotenv import load_dotenv
+
+from agents.backends import api_key_variable
+from agents.clients import close_client_registry
+from agents.multi_agent import solve_with_multi_agent
+from agents.single_agent import solve_with_single_agent
+from models.schemas import BatchItem
+from services.batch import run_batch
+
+load_dotenv()
+
+
+def load_items(path: str) -> List[BatchItem]:
+    """Read problems from a JSONL file or a JSON list"""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        return [BatchItem(**item) for item in json.loads(text)]
+    return [BatchItem(**json.loads(line)) for line in text.splitlines() if line.strip()]
+
+
+def load_done_ids(path: str, retry_failed: bool) -> Set[str]:
+    """Ids that already have a result in the output file"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Partially written last line of an interrupted run
+            if retry_failed and not record["result"]["success"]:
+                continue
+            done.add(record["id"])
+    return done
+
+
+async def main(args):
+    variable = api_key_variable(args.mode)
+    api_key = os.getenv(variable) if variable else None
+    if args.mode == "single":
+        solve = lambda item: solve_with_single_agent(item.problem, api_key)
+    else:
+        solve = lambda item: solve_with_multi_agent(item.problem, api_key, item.latency_budget_ms,
+                                                    item.token_budget)
+
+    items = load_items(args.input)
+    done = load_done_ids(args.output, args.retry_failed)
+    remaining = len(items) - len(done)
+    print(f"{len(items)} problems, {len(done)} already done, {max(0, remaining)} to solve", file=sys.stderr)
+
+    solved = failed = 0
+    try:
+        with open(args.output, "a", encoding="utf-8") as out:
+            async for record in run_batch(items, solve, args.concurrency, done):
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+                solved += 1
+                failed += not record["result"]["success"]
+                print(f"[{solved}/{remaining}] {record['id']}: {record['result']['final_answer']} "
+                      f"({record['time_ms']:.0f} ms)", file=sys.stderr)
+    finally:
+        await close_client_registry()
+
+    print(f"Done: {solved} solved, {failed} failed", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve a batch of problems")
+    parser.add_argument("input", help="JSONL file (or JSON list) of problems")
+    parser.add_argument("--mode", choices=["single", "multi"], default="multi")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--output", default="results.jsonl")
+    parser.add_argument("--retry-failed", action="store_true", help="Re-run problems whose earlier result failed")
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
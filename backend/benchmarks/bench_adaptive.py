@@ -0,0 +1,79 @@
+"""
+Adaptive scheduling benchmark - fixed rounds vs adaptive early exit
+Runs every sample problem through DebateAgents as the original fixed loop,
+with adaptive scheduling, and with adaptive scheduling plus the local
+arithmetic verifier, using the scripted in-process LLM, and reports LLM
+calls, tokens, latency and whether the final answer is correct. The verifier
+ends a solve without the critic when the proposer's work is one fully
+checked derivation. AgentResponse.stats counts that as one saved call, the
+critic's; the rounds a stalemate would still have played are not counted.
+
+Run from the backend directory:
+    python -m benchmarks.bench_adaptive --latency-ms 200
+"""
+
+import argparse
+import asyncio
+import time
+
+from agents.multi_agent import DebateAgents
+from benchmarks.scripted_llm import SCRIPTS, ScriptedDebateAgents
+from main import get_sample_problems
+
+
+def is_correct(answer: str, expected: str) -> bool:
+    return DebateAgents._same_answer(answer, expected.replace("$", ""))
+
+
+MODES = {
+    "fixed rounds": {"adaptive": False, "local_verification": False},
+    "adaptive": {"adaptive": True, "local_verification": False},
+    "+ verifier": {"adaptive": True, "local_verification": True},
+}
+
+
+async def run_mode(problems: list, options: dict, latency_ms: float) -> dict:
+    totals = {"calls": 0, "tokens": 0, "saved": 0, "latency": 0.0, "correct": 0}
+    for sample in problems:
+        agents = ScriptedDebateAgents(SCRIPTS[sample["id"]], latency_ms, **options)
+        start = time.perf_counter()
+        result = await agents.solve(sample["problem"])
+        elapsed = time.perf_counter() - start
+
+        correct = is_correct(result.final_answer, sample["correct_answer"])
+        totals["calls"] += result.stats.llm_calls
+        totals["tokens"] += result.stats.tokens_used
+        totals["saved"] += result.stats.calls_saved
+        totals["latency"] += elapsed
+        totals["correct"] += correct
+        print(f"  #{sample['id']}  calls {result.stats.llm_calls}  tokens {result.stats.tokens_used:5d}  "
+              f"{elapsed * 1000:7.0f} ms  {result.stats.stop_reason:<31} "
+              f"{result.final_answer:<18} {'✓' if correct else '✗'}")
+    return totals
+
+
+async def main(latency_ms: float):
+    problems = (await get_sample_problems())["problems"]
+    results = {}
+    for label, options in MODES.items():
+        print(f"{label}:")
+        results[label] = await run_mode(problems, options, latency_ms)
+
+    print(f"\n{'mode':<14}{'calls':>7}{'tokens':>9}{'latency':>11}{'correct':>10}")
+    for label, totals in results.items():
+        print(f"{label:<14}{totals['calls']:>7}{totals['tokens']:>9}{totals['latency']:>10.2f}s"
+              f"{totals['correct']:>7}/{len(problems)}")
+    fixed = results["fixed rounds"]
+    for label in ("adaptive", "+ verifier"):
+        totals = results[label]
+        print(f"{label} saved {fixed['calls'] - totals['calls']} calls "
+              f"({totals['saved']} reported by AgentResponse.stats), "
+              f"{fixed['tokens'] - totals['tokens']} tokens")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fixed vs adaptive debate scheduling")
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.latency_ms))
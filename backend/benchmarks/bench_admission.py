@@ -0,0 +1,85 @@
+"""
+Admission control benchmark - a burst of multi-agent solves with and without limits
+Several clients (distinct API keys) each fire a burst of /api/solve/multi
+requests at the app at once, with the mock LLM server standing in for
+OpenAI. Every request asks a different problem, so none are coalesced or
+served from a cache and each one costs provider calls. Without admission control every request goes straight through to
+the provider. With it, the in-flight caps bound the provider calls at once,
+each client's burst is limited by its token bucket, and what cannot be
+served within the queue-time SLO is answered with a fast 429/503. Reports
+response codes, latency by code and the peak provider requests in flight.
+
+Run from the backend directory:
+    python -m benchmarks.bench_admission --clients 4 --burst 60 --latency-ms 200
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.bench_async import PROBLEM
+from benchmarks.bench_clients import percentile
+from benchmarks.mock_llm import MockLLMServer
+from services import admission
+from services.admission import AdmissionController, AdmissionSettings
+
+CONFIGS = {
+    "no admission control": AdmissionSettings(enabled=False),
+    "admission control": AdmissionSettings(),
+}
+
+
+async def burst(app, clients: int, per_client: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    latencies = defaultdict(list)
+
+    async def request(client: httpx.AsyncClient, key: str, problem: str):
+        start = time.perf_counter()
+        response = await client.post("/api/solve/multi", json={"problem": problem}, headers={"X-API-Key": key})
+        latencies[response.status_code].append(time.perf_counter() - start)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=120) as client:
+        await asyncio.gather(*(request(client, f"client-{c}", f"{PROBLEM} (client {c}, request {i})")
+                               for c in range(clients) for i in range(per_client)))
+    return latencies
+
+
+async def main(clients: int, per_client: int, latency_ms: float, port: int):
+    with MockLLMServer(port=port, latency_ms=latency_ms) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "mock")
+        os.environ.setdefault("RESPONSE_CACHE_ENABLED", "false")
+
+        # Imported after the env vars are set so the agents pick up the mock URL
+        import main as api
+
+        print(f"{clients} clients x {per_client} concurrent /api/solve/multi requests, "
+              f"mock latency {latency_ms:.0f} ms\n")
+        keys = [f"client-{c}" for c in range(clients)]
+        for label, settings in CONFIGS.items():
+            admission._controller = AdmissionController(settings.model_copy(update={"api_keys": keys}))
+            server.app.state.peak_in_flight = 0
+            start = time.perf_counter()
+            latencies = await burst(api.app, clients, per_client)
+            elapsed = time.perf_counter() - start
+
+            print(f"{label}: {elapsed:.2f}s, peak provider requests in flight {server.peak_in_flight}")
+            for status, samples in sorted(latencies.items()):
+                print(f"  {status}  x{len(samples):<5} p50 {percentile(samples, 50) * 1000:8.1f} ms   "
+                      f"p99 {percentile(samples, 99) * 1000:8.1f} ms")
+            print(f"  status: {admission.get_admission_controller().status()['rejected']}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Burst load with and without admission control")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--burst", type=int, default=60, help="Concurrent requests per client")
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.clients, args.burst, args.latency_ms, args.port))
@@ -0,0 +1,78 @@
+"""
+Concurrency benchmark - blocking vs async agent calls
+Fires N concurrent solves at a local mock LLM server from a single event loop.
+The "blocking" run reproduces the old behaviour (synchronous requests/OpenAI
+clients called from inside coroutines), the "async" run uses the agents as-is.
+
+Run from the backend directory:
+    python -m benchmarks.bench_async --concurrency 50 --latency-ms 200
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import requests
+from openai import OpenAI
+
+from benchmarks.mock_llm import MockLLMServer
+
+PROBLEM = ("A train travels from City A to City B at 60 mph. The return journey from City B "
+           "to City A takes 3 hours at 80 mph. What is the total distance of the round trip?")
+
+
+async def blocking_single(base_url: str):
+    """Old single-agent path: requests.post inside a coroutine"""
+    requests.post(
+        f"{base_url}/chat/completions",
+        headers={"Authorization": "Bearer mock"},
+        json={"model": "mock", "messages": [{"role": "user", "content": PROBLEM}]},
+        timeout=60
+    ).raise_for_status()
+
+
+async def blocking_multi(base_url: str):
+    """Old multi-agent path: one round of proposer + critic on the sync client"""
+    client = OpenAI(api_key="mock", base_url=base_url)
+    for system in ("You are Agent 1 (Proposer).", "You are Agent 2 (Critic)."):
+        client.chat.completions.create(
+            model="gpt-4o",
+            messages=[{"role": "system", "content": system}, {"role": "user", "content": PROBLEM}]
+        )
+
+
+async def run(label: str, make_call, concurrency: int) -> float:
+    start = time.perf_counter()
+    results = await asyncio.gather(*(make_call() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    failed = sum(1 for result in results if getattr(result, "success", True) is False)
+    print(f"{label:<28} {concurrency:>5} solves in {elapsed:7.2f}s  ->  "
+          f"{concurrency / elapsed:8.1f} solves/s  ({failed} failed)")
+    return elapsed
+
+
+async def main(concurrency: int, latency_ms: float, port: int):
+    with MockLLMServer(port=port, latency_ms=latency_ms) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ["HF_ROUTER_URL"] = f"{server.base_url}/chat/completions"
+
+        # Imported after the env vars are set so the agents pick up the mock URLs
+        from agents.single_agent import solve_with_single_agent
+        from agents.multi_agent import solve_with_multi_agent
+
+        print(f"Mock LLM latency: {latency_ms:.0f} ms per call\n")
+        await run("single / blocking (before)", lambda: blocking_single(server.base_url), concurrency)
+        await run("single / async (after)", lambda: solve_with_single_agent(PROBLEM, "mock"), concurrency)
+        await run("multi / blocking (before)", lambda: blocking_multi(server.base_url), concurrency)
+        await run("multi / async (after)", lambda: solve_with_multi_agent(PROBLEM, "mock"), concurrency)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Blocking vs async concurrency benchmark")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.concurrency, args.latency_ms, args.port))
@@ -0,0 +1,96 @@
+"""
+Model backend benchmark - single-agent solves over the network vs in-process
+First, sequential solves with no model time at all, on the Hugging Face
+router backend (pointed at the mock LLM server) and on the in-process
+stand-in backend. This is the overhead each path adds to every solve.
+Then a burst of concurrent solves on one in-process engine whose simulated
+cost is a fixed time per batch plus a smaller time per request in it, at
+several batch sizes, so the effect of batched generation shows directly.
+Reports throughput, p50/p99 latency, and the batches run with their mean size.
+
+With --local the real local backend is measured too (needs torch and
+transformers, and downloads the model on first use).
+
+Run from the backend directory:
+    python -m benchmarks.bench_backends --solves 64 --latency-ms 200 --item-ms 10
+    python -m benchmarks.bench_backends --solves 16 --local HuggingFaceTB/SmolLM2-135M-Instruct
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.bench_async import PROBLEM
+from benchmarks.bench_clients import percentile
+from benchmarks.mock_llm import MockLLMServer
+
+
+async def burst(backend_factory, solves: int, concurrent: bool = True) -> tuple:
+    from agents.single_agent import SmallModelAgent
+
+    async def solve(i: int) -> float:
+        start = time.perf_counter()
+        # Distinct problems, so nothing is coalesced or cached
+        result = await SmallModelAgent(None, backend=backend_factory()).solve(f"{PROBLEM} (#{i})")
+        assert result.success, result.error
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    if concurrent:
+        latencies = await asyncio.gather(*(solve(i) for i in range(solves)))
+    else:
+        latencies = [await solve(i) for i in range(solves)]
+    return latencies, time.perf_counter() - start
+
+
+def report(label: str, latencies: list, elapsed: float, backend=None):
+    batches = ""
+    if hasattr(backend, "stats"):
+        stats = backend.stats()
+        batches = f"  {stats['batches']:>4} batches, mean size {stats['mean_batch_size']:.1f}"
+    print(f"{label:<34} {len(latencies) / elapsed:8.1f} solves/s   p50 {percentile(latencies, 50) * 1000:7.1f} ms"
+          f"   p99 {percentile(latencies, 99) * 1000:7.1f} ms{batches}")
+
+
+async def main(solves: int, latency_ms: float, item_ms: float, port: int, local: str):
+    from agents.backends import LocalBackend, RouterBackend, StandInBackend
+    from agents.batching import MicroBatcher, MicroBatchSettings
+    from agents.clients import get_client_registry
+
+    router = lambda: RouterBackend("katanemo/Arch-Router-1.5B:hf-inference", "mock", get_client_registry())
+    print(f"Per-solve overhead: {solves} sequential solves, no model time\n")
+    with MockLLMServer(port=port, latency_ms=0) as server:
+        os.environ["HF_ROUTER_URL"] = f"{server.base_url}/chat/completions"
+        await burst(router, 5, concurrent=False)  # Warm up the pooled connection
+        latencies, elapsed = await burst(router, solves, concurrent=False)
+        report("huggingface (mock router, HTTP)", latencies, elapsed)
+    backend = MicroBatcher(StandInBackend(), MicroBatchSettings(max_wait_ms=0))
+    latencies, elapsed = await burst(lambda: backend, solves, concurrent=False)
+    report("standin (in-process)", latencies, elapsed, backend)
+
+    print(f"\nOne in-process engine: {solves} concurrent solves, {latency_ms:.0f} ms per batch "
+          f"+ {item_ms:.0f} ms per request in it\n")
+    for max_batch in (1, 4, 8, 16):
+        backend = MicroBatcher(StandInBackend(latency_ms, item_ms), MicroBatchSettings(max_size=max_batch))
+        latencies, elapsed = await burst(lambda: backend, solves)
+        report(f"standin, max batch {max_batch}", latencies, elapsed, backend)
+
+    if local:
+        print(f"\nLocal model {local}: {solves} concurrent solves\n")
+        for max_batch in (1, 8):
+            backend = MicroBatcher(LocalBackend(local), MicroBatchSettings(max_size=max_batch))
+            latencies, elapsed = await burst(lambda: backend, solves)
+            report(f"local, max batch {max_batch}", latencies, elapsed, backend)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Single-agent solves on the remote, stand-in and local backends")
+    parser.add_argument("--solves", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--item-ms", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--local", default="", help="Also run the local backend with this model")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.solves, args.latency_ms, args.item_ms, args.port, args.local))
@@ -0,0 +1,78 @@
+"""
+Connection pooling benchmark - fresh client per request vs the shared registry
+Sends sequential chat-completion requests to the local mock LLM server and
+reports p50/p99 latency for both strategies. The difference between them is
+the per-request connection setup cost (plain TCP here; TLS to a real provider
+adds one or two more round trips on top).
+
+Run from the backend directory:
+    python -m benchmarks.bench_clients --requests 200 --latency-ms 5
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from agents.clients import ClientRegistry
+from benchmarks.mock_llm import MockLLMServer
+
+PAYLOAD = {"model": "mock", "messages": [{"role": "user", "content": "What is 2 + 2?"}]}
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def fresh_client(url: str) -> float:
+    """Old behaviour: a new client (and connection) for every request"""
+    start = time.perf_counter()
+    async with httpx.AsyncClient(timeout=60) as client:
+        (await client.post(url, json=PAYLOAD)).raise_for_status()
+    return time.perf_counter() - start
+
+
+async def pooled_client(registry: ClientRegistry, url: str) -> float:
+    """New behaviour: reuse a keep-alive connection from the registry"""
+    start = time.perf_counter()
+    async with registry.host_slot(url):
+        (await registry.http.post(url, json=PAYLOAD)).raise_for_status()
+    return time.perf_counter() - start
+
+
+def report(label: str, samples: list):
+    print(f"{label:<20} p50 {percentile(samples, 50) * 1000:7.2f} ms   "
+          f"p99 {percentile(samples, 99) * 1000:7.2f} ms   "
+          f"mean {statistics.mean(samples) * 1000:7.2f} ms")
+
+
+async def main(num_requests: int, latency_ms: float, port: int):
+    with MockLLMServer(port=port, latency_ms=latency_ms) as server:
+        url = f"{server.base_url}/chat/completions"
+
+        fresh = [await fresh_client(url) for _ in range(num_requests)]
+
+        registry = ClientRegistry()
+        await pooled_client(registry, url)  # Open the first connection outside the timed loop
+        pooled = [await pooled_client(registry, url) for _ in range(num_requests)]
+        await registry.aclose()
+
+        print(f"{num_requests} sequential requests, mock latency {latency_ms:.0f} ms\n")
+        report("fresh client", fresh)
+        report("pooled registry", pooled)
+        setup_cost = statistics.median(fresh) - statistics.median(pooled)
+        print(f"\nPer-request connection setup cost: {setup_cost * 1000:.2f} ms (median)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fresh vs pooled client latency benchmark")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.requests, args.latency_ms, args.port))
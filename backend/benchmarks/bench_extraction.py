@@ -0,0 +1,154 @@
+"""
+Answer extraction micro-benchmark - legacy regex chains vs agents.extraction
+Runs every recorded model output in model_outputs.jsonl through the original
+per-call extraction code and through agents.extraction, checks that both give
+the same answers and verdicts, and reports the time per response for whole
+responses and for responses fed in token-sized chunks while they stream
+(where the legacy code has to rescan the joined text after every chunk).
+
+Run from the backend directory:
+    python -m benchmarks.bench_extraction --repeat 2000
+"""
+
+import argparse
+import json
+import re
+import time
+from pathlib import Path
+
+from agents.extraction import (
+    FinalAnswerExtractor,
+    StructuredExtractor,
+    extract_answer_and_verdict,
+    extract_final_answer,
+    extract_structured_answer,
+)
+
+CORPUS = Path(__file__).with_name("model_outputs.jsonl")
+
+
+# The extraction code as it was before agents.extraction, kept as the reference
+def legacy_final_answer(response: str) -> str:
+    if not response:
+        return "No response"
+    match = re.search(r'FINAL ANSWER:\s*([0-9,.]+(?:\s+\w+)?)', response, re.IGNORECASE)
+    if match:
+        return match.group(1).strip()
+    patterns = [
+        r'(?:the answer is|answer:|result:|total:)\s*([0-9,.]+)',
+        r'(?:therefore|thus|so),?\s+(?:the answer is|there (?:are|is))\s*([0-9,.]+)',
+        r'(?:=|equals)\s*([0-9,.]+)\s*(?:apples|marbles|meters|miles|dollars|$)?',
+    ]
+    response_lower = response.lower()
+    for pattern in patterns:
+        match = re.search(pattern, response_lower)
+        if match:
+            return match.group(1)
+    numbers = re.findall(r'\b([0-9,.]+)\b', response)
+    if numbers:
+        return numbers[-1]
+    return "Unable to extract answer"
+
+
+def legacy_structured_answer(response: str, marker: str) -> str:
+    pattern = rf'{re.escape(marker)}\s*([0-9,.]+(?:\s+[a-zA-Z]+)?)'
+    match = re.search(pattern, response, re.IGNORECASE)
+    if match:
+        return match.group(1).strip()
+    lines = response.strip().split('\n')
+    for line in reversed(lines[-5:]):
+        match = re.search(r'([0-9,.]+(?:\s+[a-zA-Z]+)?)', line)
+        if match:
+            return match.group(1).strip()
+    return "Unable to extract"
+
+
+def legacy_verdict(response: str) -> str:
+    match = re.search(r'VERDICT:\s*(CORRECT|INCORRECT)', response, re.IGNORECASE)
+    if match:
+        return match.group(1).upper()
+    response_lower = response.lower()
+    if any(word in response_lower for word in ['correct', 'accurate', 'right', 'agree', 'looks good']):
+        return "CORRECT"
+    elif any(word in response_lower for word in ['incorrect', 'wrong', 'error', 'mistake']):
+        return "INCORRECT"
+    return "UNCLEAR"
+
+
+def legacy(item: dict) -> tuple:
+    if item["kind"] == "final":
+        return (legacy_final_answer(item["text"]),)
+    answer = legacy_structured_answer(item["text"], item["marker"])
+    if item["kind"] == "critic":
+        return answer, legacy_verdict(item["text"])
+    return (answer,)
+
+
+def single_pass(item: dict) -> tuple:
+    if item["kind"] == "final":
+        return (extract_final_answer(item["text"]),)
+    if item["kind"] == "critic":
+        return extract_answer_and_verdict(item["text"], item["marker"])
+    return (extract_structured_answer(item["text"], item["marker"]),)
+
+
+def legacy_streaming(item: dict, chunks: list) -> tuple:
+    text = ""
+    for chunk in chunks:
+        text += chunk
+        result = legacy({**item, "text": text})
+    return result
+
+
+def incremental(item: dict, chunks: list) -> tuple:
+    if item["kind"] == "final":
+        extractor = FinalAnswerExtractor()
+    else:
+        extractor = StructuredExtractor(item["marker"])
+    for chunk in chunks:
+        extractor.feed(chunk)
+    if item["kind"] == "critic":
+        return extractor.result(), extractor.verdict()
+    return (extractor.result(),)
+
+
+def per_response_us(run, corpus: list, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for args in corpus:
+            run(*args)
+    return (time.perf_counter() - start) / (repeat * len(corpus)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000, help="Passes over the corpus per measurement")
+    args = parser.parse_args()
+
+    corpus = [json.loads(line) for line in CORPUS.read_text(encoding="utf-8").splitlines() if line.strip()]
+    # Stream in roughly token-sized pieces, the way the SSE endpoints deliver them
+    chunked = [(item, re.findall(r"\S+\s*|\s+", item["text"])) for item in corpus]
+
+    mismatches = [item["text"][:60] for item in corpus if legacy(item) != single_pass(item)]
+    mismatches += [item["text"][:60] for item, chunks in chunked if legacy(item) != incremental(item, chunks)]
+    chars = sum(len(item["text"]) for item in corpus) / len(corpus)
+    print(f"{len(corpus)} recorded outputs, {chars:.0f} characters on average, "
+          f"{len(mismatches)} mismatches against the legacy extraction")
+    for text in mismatches:
+        print(f"  mismatch: {text!r}")
+
+    whole = [(item,) for item in corpus]
+    streaming_repeat = max(1, args.repeat // 20)
+    rows = [
+        ("whole response", per_response_us(legacy, whole, args.repeat),
+         per_response_us(single_pass, whole, args.repeat)),
+        ("streamed chunks", per_response_us(legacy_streaming, chunked, streaming_repeat),
+         per_response_us(incremental, chunked, streaming_repeat)),
+    ]
+    print(f"\n{'':<17}{'legacy':>10}{'extraction':>14}{'speedup':>10}")
+    for label, before, after in rows:
+        print(f"{label:<17}{before:>8.1f}us{after:>12.1f}us{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+"""
+Load test - throughput, latency, LLM calls and memory per endpoint, saved for regression checks
+Starts the mock LLM server and the API (through serve.py) as separate
+processes, with both agents pointed at the mock. The mock answers the sample
+problems from their debate scripts after a seeded latency draw, so every run
+makes the same model calls. Each endpoint then gets a fixed number of
+requests from a set number of concurrent clients. Solve requests cycle
+through the sample problems in a fixed order. Each one is made distinct, so
+the response cache and request coalescing don't answer it; they are off
+unless --env turns them on. Reports per endpoint:
+
+- throughput, and p50/p95/p99 latency
+- errors, and the share of final answers that are correct
+- LLM calls per request, from the mock's /stats (retries included)
+- resident and peak memory of the API processes after the endpoint ran
+
+The whole test runs --runs times, each with fresh processes, and every
+metric is reported as its median over the runs, so one slow run does not
+decide the result. --save writes the run (settings, environment, the medians
+and each run's results) as JSON. --compare checks the medians against a
+saved run and exits with status 1 when a metric is worse than the tolerance
+allows and its runs all fall outside the baseline's, so it can gate a change
+in CI. Throughput and tail latencies swing more from run to run than the
+median latency, so they are allowed twice the tolerance. Timings vary with
+the host; LLM calls and correctness do not.
+
+Run from the backend directory:
+    python -m benchmarks.bench_load --requests 200 --concurrency 16 --save benchmarks/results/baseline.json
+    python -m benchmarks.bench_load --requests 200 --concurrency 16 --compare benchmarks/results/baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+import httpx
+
+from benchmarks.bench_adaptive import is_correct
+from benchmarks.bench_clients import percentile
+
+# name -> (method, path)
+ENDPOINTS = {
+    "single": ("POST", "/api/solve/single"),
+    "multi": ("POST", "/api/solve/multi"),
+    "multi-stream": ("POST", "/api/solve/multi/stream"),
+    "samples": ("GET", "/api/sample-problems"),
+}
+
+# metric -> True when higher is better; compared against a saved run
+METRICS = {
+    "throughput": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "error_rate": False,
+    "correct": True,
+    "llm_calls_per_request": False,
+    "rss_mb": False,
+    "peak_rss_mb": False,
+}
+
+# Metrics that vary more between runs of the same tree get this multiple of --tolerance
+TOLERANCE_SCALE = {"throughput": 2.0, "p95_ms": 2.0, "p99_ms": 2.0}
+
+# Differences below these are noise whatever the tolerance says (a 0.2 ms p50 on a 1 ms endpoint)
+ABSOLUTE_SLACK = {"throughput": 1.0, "p50_ms": 5.0, "p95_ms": 20.0, "p99_ms": 40.0, "error_rate": 0.0,
+                  "correct": 0.0, "llm_calls_per_request": 0.01, "rss_mb": 5.0, "peak_rss_mb": 5.0}
+
+
+def start_mock(args) -> subprocess.Popen:
+    command = [sys.executable, "-m", "benchmarks.mock_llm", "--port", str(args.mock_port), "--scripted",
+               "--latency-ms", str(args.latency_ms), "--latency-dist", args.latency_dist,
+               "--jitter-ms", str(args.jitter_ms), "--seed", str(args.seed),
+               "--token-delay-ms", str(args.token_delay_ms), "--error-rate", str(args.error_rate)]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_for(f"http://127.0.0.1:{args.mock_port}/stats", process)
+    return process
+
+
+def start_api(args, state_dir: str) -> subprocess.Popen:
+    mock = f"http://127.0.0.1:{args.mock_port}/v1"
+    env = dict(os.environ,
+               MODEL_SINGLE_BACKEND="huggingface", MODEL_MULTI_BACKEND="openai",
+               HUGGINGFACE_API_KEY="mock", HF_ROUTER_URL=f"{mock}/chat/completions",
+               OPENAI_API_KEY="mock", OPENAI_BASE_URL=mock,
+               RESPONSE_CACHE_ENABLED="false", SINGLE_FLIGHT_ENABLED="false",
+               ADMISSION_RATE_LIMIT="0", ADMISSION_MAX_IN_FLIGHT="1000", ADMISSION_ENDPOINT_LIMITS="{}",
+               STATE_PATH=os.path.join(state_dir, "state.db"), JOBS_PATH=os.path.join(state_dir, "jobs.db"))
+    env.update(args.env)
+    process = subprocess.Popen([sys.executable, "serve.py", "--workers", str(args.workers), "--port", str(args.port),
+                                "--log-level", "warning"], env=env, stdout=subprocess.DEVNULL)
+    wait_for(f"http://127.0.0.1:{args.port}/api/ready", process)
+    return process
+
+
+def wait_for(url: str, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline and process.poll() is None:
+        try:
+            if httpx.get(url).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.05)
+    process.terminate()
+    raise TimeoutError(f"{url} did not answer 200")
+
+
+def stop(process: subprocess.Popen):
+    process.terminate()
+    process.wait()
+
+
+def memory_mb(pid: int) -> tuple:
+    """Resident and peak resident memory of a process and its children, from /proc (Linux only)"""
+    rss = peak = 0
+    pids = [pid]
+    while pids:
+        current = pids.pop()
+        try:
+            with open(f"/proc/{current}/status") as status:
+                fields = dict(line.split(":", 1) for line in status if ":" in line)
+            with open(f"/proc/{current}/task/{current}/children") as children:
+                pids.extend(int(child) for child in children.read().split())
+        except OSError:
+            continue
+        rss += int(fields["VmRSS"].split()[0])
+        peak += int(fields["VmHWM"].split()[0])
+    return rss / 1024, peak / 1024
+
+
+def final_answer(response: httpx.Response, streamed: bool) -> Optional[str]:
+    """The solve's final answer, or None when it failed"""
+    if streamed:
+        results = re.findall(r"^event: result\ndata: (.*)$", response.text, re.MULTILINE)
+        data = json.loads(results[-1]) if results else {}
+    else:
+        data = response.json()
+    return data.get("final_answer") if data.get("success") else None
+
+
+async def drive(http: httpx.AsyncClient, name: str, problems: list, count: int, concurrency: int) -> tuple:
+    """Send count requests from concurrency clients; returns latencies, errors, correct answers and elapsed time"""
+    method, path = ENDPOINTS[name]
+    latencies, errors, correct = [], 0, 0
+    next_request = iter(range(count))
+
+    async def client():
+        nonlocal errors, correct
+        for i in next_request:
+            sample = problems[i % len(problems)]
+            body = {"problem": f"{sample['problem']} (request {i})"} if method == "POST" else None
+            start = time.perf_counter()
+            try:
+                response = await http.request(method, path, json=body)
+                response.raise_for_status()
+                answer = final_answer(response, name.endswith("stream")) if body else ""
+            except httpx.HTTPError:
+                answer = None
+            latencies.append(time.perf_counter() - start)
+            if answer is None:
+                errors += 1
+            elif body and is_correct(answer, sample["correct_answer"]):
+                correct += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies, errors, correct, time.perf_counter() - start
+
+
+async def run(args, api_pid: int) -> dict:
+    results = {}
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=120) as http, \
+            httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.mock_port}") as mock:
+        problems = (await http.get("/api/sample-problems")).json()["problems"]
+        for name in args.endpoints:
+            await drive(http, name, problems, args.warmup, min(args.warmup, args.concurrency) or 1)
+            calls = (await mock.get("/stats")).json()["calls"]
+            latencies, errors, correct, elapsed = await drive(http, name, problems, args.requests, args.concurrency)
+            calls = (await mock.get("/stats")).json()["calls"] - calls
+            rss, peak = memory_mb(api_pid)
+            solves = args.requests if ENDPOINTS[name][0] == "POST" else 0
+            results[name] = {
+                "requests": args.requests,
+                "throughput": args.requests / elapsed,
+                "p50_ms": percentile(latencies, 50) * 1000,
+                "p95_ms": percentile(latencies, 95) * 1000,
+                "p99_ms": percentile(latencies, 99) * 1000,
+                "error_rate": errors / args.requests,
+                "correct": correct / solves if solves else None,
+                "llm_calls_per_request": calls / args.requests,
+                "rss_mb": rss,
+                "peak_rss_mb": peak,
+            }
+    return results
+
+
+def median_results(runs: list) -> dict:
+    """Each endpoint's metrics as the median over the runs"""
+    return {
+        name: {metric: (None if any(run[name][metric] is None for run in runs)
+                        else statistics.median(run[name][metric] for run in runs))
+               for metric in result}
+        for name, result in runs[0].items()
+    }
+
+
+def report(results: dict):
+    print(f"{'endpoint':<13} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>7} {'correct':>8} "
+          f"{'calls/req':>10} {'rss':>8} {'peak rss':>9}")
+    for name, result in results.items():
+        correct = "-" if result["correct"] is None else f"{result['correct']:.0%}"
+        print(f"{name:<13} {result['throughput']:>8.1f} {result['p50_ms']:>7.1f}ms {result['p95_ms']:>7.1f}ms "
+              f"{result['p99_ms']:>7.1f}ms {result['error_rate']:>7.1%} {correct:>8} "
+              f"{result['llm_calls_per_request']:>10.2f} {result['rss_mb']:>6.0f}MB {result['peak_rss_mb']:>7.0f}MB")
+
+
+def overlaps(before: list, after: list, higher_is_better: bool) -> bool:
+    """Whether the best of the new runs is no worse than the worst of the baseline runs"""
+    if not before or not after:
+        return False
+    return max(after) >= min(before) if higher_is_better else min(after) <= max(before)
+
+
+def run_values(runs: list, name: str, metric: str) -> list:
+    return [run[name][metric] for run in runs if run.get(name, {}).get(metric) is not None]
+
+
+def compare(results: dict, runs: list, settings: dict, baseline: dict, tolerance: float) -> list:
+    """Print each metric against the baseline run; returns the regressions
+
+    A metric regresses when its median is worse than the tolerance allows and,
+    when both sides kept their runs, the runs no longer overlap the baseline's:
+    every new run is worse than every baseline run.
+    """
+    changed = {key: (value, settings.get(key)) for key, value in baseline["settings"].items()
+               if settings.get(key) != value}
+    if changed:
+        print("Settings differ from the baseline, so the comparison may not be like for like:")
+        for key, (before, after) in changed.items():
+            print(f"  {key}: {before} -> {after}")
+        print()
+
+    regressions = []
+    print(f"{'endpoint':<13} {'metric':<22} {'baseline':>10} {'now':>10} {'change':>8}")
+    for name, result in results.items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = before.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            worse = (old - new) if higher_is_better else (new - old)
+            allowed = abs(old) * tolerance * TOLERANCE_SCALE.get(metric, 1.0)
+            regressed = (worse > allowed and worse > ABSOLUTE_SLACK.get(metric, 0.0)
+                         and not overlaps(run_values(baseline.get("runs", []), name, metric),
+                                          run_values(runs, name, metric), higher_is_better))
+            change = f"{(new - old) / old:+.0%}" if old else "-"
+            print(f"{name:<13} {metric:<22} {old:>10.2f} {new:>10.2f} {change:>8}"
+                  f"{'  REGRESSION' if regressed else ''}")
+            if regressed:
+                regressions.append(f"{name} {metric}")
+    return regressions
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(args) -> int:
+    settings = {key: getattr(args, key) for key in ("endpoints", "requests", "concurrency", "warmup", "workers",
+                                                    "latency_ms", "latency_dist", "jitter_ms", "seed",
+                                                    "token_delay_ms", "error_rate", "env", "runs")}
+    print(f"{args.requests} requests per endpoint from {args.concurrency} clients, {args.workers} worker(s), "
+          f"mock LLM at {args.latency_ms:.0f} ms ({args.latency_dist}"
+          f"{f', jitter {args.jitter_ms:.0f} ms' if args.latency_dist != 'fixed' else ''}), "
+          f"median of {args.runs} run(s)\n")
+    runs = []
+    for _ in range(args.runs):
+        # Fresh processes every run, so the mock replays the same latency draws
+        mock = start_mock(args)
+        state_dir = tempfile.mkdtemp()
+        try:
+            api = start_api(args, state_dir)
+            try:
+                runs.append(asyncio.run(run(args, api.pid)))
+            finally:
+                stop(api)
+        finally:
+            stop(mock)
+    results = median_results(runs)
+    report(results)
+
+    run_record = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "host": {"python": platform.python_version(), "cpu_count": os.cpu_count(), "platform": platform.platform()},
+        "settings": settings,
+        "results": results,
+        "runs": runs,
+    }
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as output:
+            json.dump(run_record, output, indent=2)
+        print(f"\nSaved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as saved:
+            baseline = json.load(saved)
+        print(f"\nAgainst {args.compare} (commit {baseline.get('commit') or 'unknown'}, "
+              f"tolerance {args.tolerance:.0%}, {args.tolerance * TOLERANCE_SCALE['p99_ms']:.0%} "
+              f"for throughput and tail latency)\n")
+        regressions = compare(results, runs, settings, baseline, args.tolerance)
+        print(f"\n{len(regressions)} regression(s){': ' + ', '.join(regressions) if regressions else ''}")
+        return 1 if regressions else 0
+    return 0
+
+
+def env_override(value: str) -> tuple:
+    key, separator, setting = value.partition("=")
+    if not separator:
+        raise argparse.ArgumentTypeError(f"expected KEY=VALUE, got {value!r}")
+    return key, setting
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the API against the mock LLM and compare with saved runs")
+    parser.add_argument("--endpoints", nargs="+", choices=list(ENDPOINTS), default=["single", "multi", "samples"])
+    parser.add_argument("--requests", type=int, default=100, help="Measured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests per endpoint first")
+    parser.add_argument("--runs", type=int, default=3, help="Runs to take the median of")
+    parser.add_argument("--workers", type=int, default=1, help="API worker processes (see serve.py)")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--latency-dist", choices=("fixed", "uniform", "normal", "lognormal"), default="lognormal")
+    parser.add_argument("--jitter-ms", type=float, default=25.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--token-delay-ms", type=float, default=0.0, help="Delay between streamed tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of LLM calls answered with 503")
+    parser.add_argument("--env", type=env_override, action="append", default=[],
+                        help="API setting as KEY=VALUE, e.g. RESPONSE_CACHE_ENABLED=true (repeatable)")
+    parser.add_argument("--save", help="Write the run to this JSON file")
+    parser.add_argument("--compare", help="Compare the run with one saved by --save")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Relative change allowed before a regression")
+    parser.add_argument("--port", type=int, default=9400)
+    parser.add_argument("--mock-port", type=int, default=9100)
+    args = parser.parse_args()
+    args.env = dict(args.env)
+
+    sys.exit(main(args))
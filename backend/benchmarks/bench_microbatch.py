@@ -0,0 +1,79 @@
+"""
+Micro-batching benchmark - added wait vs batch size under steady arrivals
+Single-agent solves arrive at a fixed rate (Poisson, seeded) at one
+in-process stand-in engine whose cost is a fixed time per batch plus a
+smaller time per call in it. Each run uses a different maximum added wait
+for the MicroBatcher in front of it. Longer windows form fuller batches, so
+the engine keeps up with more load, at the price of the wait itself when
+load is light. A run with batches of one shows the engine without batching.
+Reports throughput, p50/p99 solve latency, mean batch size and the mean
+time calls waited for their batch.
+
+Run from the backend directory:
+    python -m benchmarks.bench_microbatch --rate 60 --seconds 5 --latency-ms 50 --item-ms 5
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.bench_async import PROBLEM
+from benchmarks.bench_clients import percentile
+from agents.backends import StandInBackend
+from agents.batching import MicroBatcher, MicroBatchSettings
+from agents.single_agent import SmallModelAgent
+from services.metrics import MODEL_BATCH_WAIT
+
+WAITS_MS = (0.0, 5.0, 20.0, 50.0)
+
+
+async def steady_load(backend: MicroBatcher, rate: float, seconds: float, seed: int) -> tuple:
+    rng = random.Random(seed)
+    latencies = []
+
+    async def solve(i: int):
+        start = time.perf_counter()
+        result = await SmallModelAgent(None, backend=backend).solve(f"{PROBLEM} (#{i})")
+        assert result.success, result.error
+        latencies.append(time.perf_counter() - start)
+
+    tasks = []
+    start = time.perf_counter()
+    i = 0
+    while time.perf_counter() - start < seconds:
+        tasks.append(asyncio.ensure_future(solve(i)))
+        i += 1
+        await asyncio.sleep(rng.expovariate(rate))
+    await asyncio.gather(*tasks)
+    return latencies, time.perf_counter() - start
+
+
+async def main(rate: float, seconds: float, latency_ms: float, item_ms: float, max_size: int, seed: int):
+    print(f"~{rate:.0f} solves/s for {seconds:.0f}s on one stand-in engine, {latency_ms:.0f} ms per batch "
+          f"+ {item_ms:.0f} ms per call, max batch {max_size}\n")
+    print(f"{'':<12} {'max wait':>9} {'solves/s':>9} {'p50':>9} {'p99':>9} {'batch':>6} {'wait':>8}")
+    runs = [("no batching", 1, 0.0)] + [("micro-batch", max_size, wait_ms) for wait_ms in WAITS_MS]
+    for label, size, wait_ms in runs:
+        backend = MicroBatcher(StandInBackend(latency_ms, item_ms),
+                               MicroBatchSettings(max_size=size, max_wait_ms=wait_ms))
+        MODEL_BATCH_WAIT.values.clear()
+        latencies, elapsed = await steady_load(backend, rate, seconds, seed)
+        stats = backend.stats()
+        _, wait_total, wait_count = MODEL_BATCH_WAIT.values[(backend.name,)]
+        print(f"{label:<12} {wait_ms:>7.0f}ms {len(latencies) / elapsed:>9.1f} "
+              f"{percentile(latencies, 50) * 1000:>7.1f}ms {percentile(latencies, 99) * 1000:>7.1f}ms {stats['mean_batch_size']:>6.1f} "
+              f"{wait_total / wait_count * 1000:>6.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-batching window sweep on the stand-in engine")
+    parser.add_argument("--rate", type=float, default=60.0, help="Solves arriving per second")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--item-ms", type=float, default=5.0)
+    parser.add_argument("--max-size", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.rate, args.seconds, args.latency_ms, args.item_ms, args.max_size, args.seed))
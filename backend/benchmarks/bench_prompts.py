@@ -0,0 +1,105 @@
+"""
+Prompt layout benchmark - full vs compact debate prompts on the sample problems
+Runs every sample problem through the fixed three-round debate on the
+scripted in-process LLM, once with the original (full) prompts and once with
+the compact layout at several context caps. Each scripted reply is padded
+with lines of verbose reasoning, as real model replies have. Reports the
+prompt tokens sent, the tokens stats.prompt_tokens_saved reported, and how
+many prompt tokens a provider prefix cache could reuse: the longest start
+each prompt shares with an earlier one. Time to first token is modeled as
+prefill time for the prompt tokens not reused. Final answers, stop reasons
+and call counts are compared to the full layout, and must not change. The
+scripted model answers the same whatever the wording; a real model may not,
+which is why the compact layout is opt-in.
+
+Run from the backend directory:
+    python -m benchmarks.bench_prompts --reasoning-lines 20 --prefill-ms 50
+"""
+
+import argparse
+import asyncio
+from typing import List, Tuple
+
+from agents.prompts import PromptSettings
+from benchmarks.scripted_llm import SCRIPTS, ScriptedDebateAgents
+from main import get_sample_problems
+
+LAYOUTS = (("full", PromptSettings(layout="full")),
+           ("compact, 300 chars", PromptSettings(layout="compact", context_chars=300)),
+           ("compact, 600 chars", PromptSettings(layout="compact", context_chars=600)),
+           ("compact, 2000 chars", PromptSettings(layout="compact", context_chars=2000)))
+
+REASONING = "Reply {}, step {}: restating what the problem gives and what it asks before the next calculation."
+
+
+class VerboseDebateAgents(ScriptedDebateAgents):
+    """Scripted agents whose replies carry verbose reasoning and whose prompts are recorded"""
+
+    def __init__(self, script: dict, reasoning_lines: int, prompts: List[str], **kwargs):
+        super().__init__(script, latency_ms=0, **kwargs)
+        self.reasoning_lines = reasoning_lines
+        self.prompts = prompts
+
+    async def _complete(self, messages: List[dict], params: dict, backend=None) -> Tuple[str, int, int]:
+        self.prompts.append("\n".join(message["content"] for message in messages))
+        reply, _, _ = await super()._complete(messages, params, backend)
+        # Numbered by reply, so the reasoning differs between rounds as a model's would
+        reasoning = "\n".join(REASONING.format(len(self.prompts), i + 1) for i in range(self.reasoning_lines))
+        reply = f"{reasoning}\n{reply}"
+        return reply, len(self.prompts[-1]) // 4, len(reply) // 4
+
+
+def shared_prefix(prompt: str, earlier: List[str]) -> int:
+    """Characters at the start of prompt that some earlier prompt starts with too"""
+    best = 0
+    for other in earlier:
+        n = 0
+        for a, b in zip(prompt, other):
+            if a != b:
+                break
+            n += 1
+        best = max(best, n)
+    return best
+
+
+async def run_layout(problems: list, settings: PromptSettings, reasoning_lines: int) -> dict:
+    prompts: List[str] = []
+    totals = {"calls": 0, "prompt": 0, "saved": 0, "reused": 0, "outcomes": []}
+    for sample in problems:
+        agents = VerboseDebateAgents(SCRIPTS[sample["id"]], reasoning_lines, prompts, adaptive=False,
+                                     local_verification=False, prompt_settings=settings)
+        result = await agents.solve(sample["problem"])
+        totals["calls"] += result.stats.llm_calls
+        totals["prompt"] += result.stats.prompt_tokens
+        totals["saved"] += result.stats.prompt_tokens_saved
+        totals["outcomes"].append((result.final_answer, result.stats.stop_reason, result.stats.llm_calls))
+    # A provider cache is shared across solves, so the system prompts are reused between problems too
+    totals["reused"] = sum(shared_prefix(prompt, prompts[:i]) for i, prompt in enumerate(prompts)) // 4
+    return totals
+
+
+async def main(reasoning_lines: int, prefill_ms: float):
+    problems = (await get_sample_problems())["problems"]
+    print(f"{len(problems)} sample problems, fixed three-round debate, {reasoning_lines} lines of reasoning "
+          f"per reply, prefill modeled at {prefill_ms:.0f} ms per 1,000 prompt tokens not reused\n")
+    print(f"{'layout':<20} {'calls':>6} {'prompt tok':>11} {'reported saved':>15} {'reusable':>9} "
+          f"{'prefill/call':>13} {'outputs':>8}")
+    baseline = None
+    for label, settings in LAYOUTS:
+        totals = await run_layout(problems, settings, reasoning_lines)
+        baseline = baseline or totals
+        prefill = (totals["prompt"] - totals["reused"]) / 1000 * prefill_ms / totals["calls"]
+        same = "same" if totals["outcomes"] == baseline["outcomes"] else "CHANGED"
+        print(f"{label:<20} {totals['calls']:>6} {totals['prompt']:>11} {totals['saved']:>15} "
+              f"{totals['reused'] / totals['prompt']:>9.0%} {prefill:>11.1f}ms {same:>8}")
+    print("\nprompt tokens are estimated at ~4 characters per token; reusable is the share of them a prefix cache "
+          "could serve")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Full vs compact debate prompt layouts")
+    parser.add_argument("--reasoning-lines", type=int, default=20, help="Verbose reasoning lines per reply")
+    parser.add_argument("--prefill-ms", type=float, default=50.0, help="Modeled prefill ms per 1,000 tokens")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.reasoning_lines, args.prefill_ms))
@@ -0,0 +1,123 @@
+"""
+Parallel proposer benchmark - debate topology vs rounds, calls, latency and accuracy
+Runs every sample problem through DebateAgents with 1 proposer (the
+sequential debate), then 3 and 5 proposers drafting in parallel, many times
+over, on a sampled in-process LLM. The parallel topologies run twice: once
+calling the critic unless all proposers agree, once accepting a majority.
+Each proposer call is right with a fixed probability and otherwise gives one
+of a few plausible wrong answers, so wrong proposers sometimes agree. The
+critic catches a wrong answer, or confirms a right one, with its own fixed
+probability. Draws are seeded, so runs are reproducible. The local verifier
+is off, so only the topology differs.
+
+Run from the backend directory:
+    python -m benchmarks.bench_proposers --trials 40 --proposer-accuracy 0.6 --critic-accuracy 0.9
+"""
+
+import argparse
+import asyncio
+import random
+import re
+import time
+from typing import List, Tuple
+
+from agents.multi_agent import DebateAgents
+from benchmarks.bench_adaptive import is_correct
+from benchmarks.scripted_llm import SCRIPTS
+from main import get_sample_problems
+from services.metrics import estimate_tokens
+
+# (proposers, quorum): quorum 1.0 sends every disagreement to the critic, 0.5 accepts a majority
+TOPOLOGIES = ((1, 1.0), (3, 1.0), (3, 0.5), (5, 1.0), (5, 0.5))
+
+
+def wrong_answers(sample: dict) -> List[str]:
+    """The scripted wrong proposals for this problem plus an off-by-a-step variant"""
+    correct = sample["correct_answer"].replace("$", "")
+    scripted = [turn[1] for turn in SCRIPTS[sample["id"]]["proposer"]]
+    wrong = [answer for answer in scripted if not is_correct(answer, correct)]
+    number = float(re.search(r"[0-9.]+", correct).group())
+    return wrong + [f"{number * 1.5:g}", f"{number / 2:g}"][:3 - len(wrong)]
+
+
+class SampledDebateAgents(DebateAgents):
+    """DebateAgents whose model calls are answered by seeded draws"""
+
+    def __init__(self, sample: dict, rng: random.Random, proposer_accuracy: float, critic_accuracy: float,
+                 latency_ms: float, **kwargs):
+        super().__init__(api_key="mock", adaptive=True, local_verification=False, **kwargs)
+        self.correct = sample["correct_answer"].replace("$", "")
+        self.wrong = wrong_answers(sample)
+        self.rng = rng
+        self.proposer_accuracy = proposer_accuracy
+        self.critic_accuracy = critic_accuracy
+        self.latency_ms = latency_ms
+
+    def _draw(self, accuracy: float) -> str:
+        return self.correct if self.rng.random() < accuracy else self.rng.choice(self.wrong)
+
+    async def _complete(self, messages: List[dict], params: dict, backend=None) -> Tuple[str, int, int]:
+        system, prompt = messages[0]["content"], messages[1]["content"]
+        if "Agent 2 (Critic)" in system:
+            proposed = re.search(r"MY PROPOSED ANSWER: (.+)", prompt).group(1).strip()
+            right = is_correct(proposed, self.correct)
+            if self.rng.random() < self.critic_accuracy:
+                verdict, answer = ("CORRECT", proposed) if right else ("INCORRECT", self.correct)
+            else:
+                verdict, answer = ("INCORRECT", self.rng.choice(self.wrong)) if right else ("CORRECT", proposed)
+            reply = f"Reviewed each step.\nVERDICT: {verdict}\nMY ANSWER: {answer}"
+        else:
+            feedback = re.search(r"MY ANSWER: (.+)", prompt)
+            # A proposer shown the critic's answer usually adopts it
+            if feedback and self.rng.random() < self.critic_accuracy:
+                answer = feedback.group(1).strip()
+            else:
+                answer = self._draw(self.proposer_accuracy)
+            reply = f"Working through the problem step by step.\nMY PROPOSED ANSWER: {answer}"
+
+        await asyncio.sleep(self.latency_ms / 1000)
+        return (reply, *estimate_tokens(messages, reply))
+
+
+async def run_topology(problems: list, proposers: int, quorum: float, args) -> dict:
+    totals = {"solves": 0, "calls": 0, "rounds": 0, "critic": 0, "latency": 0.0, "correct": 0}
+    for trial in range(args.trials):
+        for sample in problems:
+            rng = random.Random(f"{args.seed}-{trial}-{sample['id']}")
+            agents = SampledDebateAgents(sample, rng, args.proposer_accuracy, args.critic_accuracy,
+                                         args.latency_ms, proposers=proposers, quorum=quorum)
+            start = time.perf_counter()
+            result = await agents.solve(sample["problem"])
+            totals["latency"] += time.perf_counter() - start
+            totals["solves"] += 1
+            totals["calls"] += result.stats.llm_calls
+            totals["rounds"] += result.stats.rounds
+            totals["critic"] += sum(call.agent == "Agent 2 (Critic)" for call in result.stats.calls)
+            totals["correct"] += is_correct(result.final_answer, sample["correct_answer"].replace("$", ""))
+    return totals
+
+
+async def main(args):
+    problems = (await get_sample_problems())["problems"]
+    print(f"{len(problems)} sample problems x {args.trials} trials, proposer accuracy {args.proposer_accuracy:.0%}, "
+          f"critic accuracy {args.critic_accuracy:.0%}, {args.latency_ms:.0f} ms per call\n")
+    print(f"{'proposers':>9} {'quorum':>7} {'rounds':>7} {'calls':>6} {'critic':>7} {'latency':>9} {'accuracy':>9}")
+    for proposers, quorum in TOPOLOGIES:
+        totals = await run_topology(problems, proposers, quorum, args)
+        solves = totals["solves"]
+        print(f"{proposers:>9} {quorum:>7.1f} {totals['rounds'] / solves:>7.2f} {totals['calls'] / solves:>6.2f} "
+              f"{totals['critic'] / solves:>7.2f} {totals['latency'] / solves * 1000:>7.0f}ms "
+              f"{totals['correct'] / solves:>9.1%}")
+    print("\nrounds, calls, critic calls and latency are means per solve")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sequential vs parallel-proposer debate")
+    parser.add_argument("--trials", type=int, default=40)
+    parser.add_argument("--proposer-accuracy", type=float, default=0.6)
+    parser.add_argument("--critic-accuracy", type=float, default=0.9)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
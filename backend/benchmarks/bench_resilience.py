@@ -0,0 +1,113 @@
+"""
+Resilience benchmark - retries, hedging and circuit breaking under injected faults
+Runs multi-agent solves against the local mock LLM server while it injects
+faults, once per call-layer configuration:
+
+  flaky provider: some 503s, some 429s with Retry-After and a few very slow
+  responses. Compares no retries, retries with backoff (the default), and
+  retries plus hedged requests (LLM_HEDGE=true) on success rate, p50/p95/p99
+  solve latency and upstream calls per solve. Each configuration runs
+  several times with differently seeded faults, and the medians are shown.
+
+  outage: every request fails. Compares retrying without a circuit breaker
+  against the default breaker on time per failed solve and upstream calls.
+
+Backoff delays are scaled down to match the mock's latency. Slow responses
+take --slow-ms whatever the latency.
+
+Run from the backend directory:
+    python -m benchmarks.bench_resilience --solves 200 --concurrency 20 --latency-ms 20 --slow-ms 2000 --runs 3
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from agents.clients import ClientRegistry
+from agents.resilience import ResilienceSettings
+from benchmarks.bench_async import PROBLEM
+from benchmarks.bench_clients import percentile
+from benchmarks.mock_llm import Faults, MockLLMServer
+from services.metrics import LLM_HEDGES
+
+FAST_BACKOFF = {"backoff_base": 0.05, "backoff_max": 0.5}
+
+FLAKY = {
+    "no retries": ResilienceSettings(max_attempts=1, hedge=False),
+    "retry, no hedging": ResilienceSettings(hedge=False, **FAST_BACKOFF),
+    "retry + hedging": ResilienceSettings(hedge=True, **FAST_BACKOFF),
+}
+OUTAGE = {
+    "retry, no breaker": ResilienceSettings(breaker_threshold=10 ** 9, **FAST_BACKOFF),
+    "retry + breaker": ResilienceSettings(**FAST_BACKOFF),
+}
+
+
+async def run(server: MockLLMServer, settings: ResilienceSettings, solves: int, concurrency: int) -> dict:
+    from agents.multi_agent import DebateAgents
+
+    registry = ClientRegistry(resilience=settings)
+    slots = asyncio.Semaphore(concurrency)
+
+    async def solve() -> tuple:
+        async with slots:
+            agents = DebateAgents(api_key="mock", clients=registry, local_verification=False)
+            start = time.perf_counter()
+            result = await agents.solve(PROBLEM)
+            return time.perf_counter() - start, result.success
+
+    calls_before = server.calls
+    hedges_before = LLM_HEDGES.values.get(("openai", "sent"), 0)
+    results = await asyncio.gather(*(solve() for _ in range(solves)))
+    await registry.aclose()
+
+    latencies = [elapsed for elapsed, _ in results]
+    return {
+        "success": sum(1 for _, success in results if success) / solves,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "mean": statistics.mean(latencies),
+        "calls": (server.calls - calls_before) / solves,
+        "hedges": LLM_HEDGES.values.get(("openai", "sent"), 0) - hedges_before,
+    }
+
+
+async def main(solves: int, concurrency: int, latency_ms: float, slow_ms: float, port: int, runs: int):
+    faults = Faults(error_rate=0.08, rate_limit_rate=0.04, retry_after=0.05, slow_rate=0.02, slow_ms=slow_ms)
+    with MockLLMServer(port=port, latency_ms=latency_ms, faults=faults) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+
+        print(f"Flaky provider: {latency_ms:.0f} ms latency, 8% 503, 4% 429 (Retry-After 0.05 s), "
+              f"2% delayed by {faults.slow_ms / 1000:.1f} s, median of {runs} runs\n")
+        print(f"{'':<18}{'success':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'calls/solve':>13}{'hedges':>8}")
+        for label, settings in FLAKY.items():
+            rows = []
+            for seed in range(runs):
+                faults.random.seed(seed)
+                rows.append(await run(server, settings, solves, concurrency))
+            row = {key: statistics.median(r[key] for r in rows) for key in rows[0]}
+            print(f"{label:<18}{row['success']:>8.0%}{row['p50'] * 1000:>7.0f}ms{row['p95'] * 1000:>7.0f}ms"
+                  f"{row['p99'] * 1000:>7.0f}ms{row['calls']:>13.2f}{row['hedges']:>8.0f}")
+
+        faults.error_rate, faults.rate_limit_rate, faults.slow_rate = 1.0, 0.0, 0.0
+        print("\nOutage: every request fails\n")
+        print(f"{'':<18}{'success':>9}{'mean':>9}{'calls/solve':>13}")
+        for label, settings in OUTAGE.items():
+            row = await run(server, settings, solves, concurrency)
+            print(f"{label:<18}{row['success']:>8.0%}{row['mean'] * 1000:>7.0f}ms{row['calls']:>13.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Call-layer resilience under injected faults")
+    parser.add_argument("--solves", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--slow-ms", type=float, default=2000.0, help="Latency of the 2% slow responses")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--runs", type=int, default=3, help="Runs per flaky-provider configuration (medians shown)")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.solves, args.concurrency, args.latency_ms, args.slow_ms, args.port, args.runs))
@@ -0,0 +1,68 @@
+"""
+Request coalescing benchmark - bursts of identical solves with and without single-flight
+Fires N concurrent solves of the same problem (as when a sample problem is
+demoed to a room) at the solve layer, with the mock LLM server standing in
+for OpenAI and the Hugging Face router. The response cache is disabled so
+only coalescing is measured. Without coalescing the provider calls grow
+with N; with it they stay at one solve's worth however many duplicates
+arrive. Reports provider calls, peak provider requests in flight and wall
+time for each burst size.
+
+Run from the backend directory:
+    python -m benchmarks.bench_singleflight --duplicates 1 10 50 200 --latency-ms 200
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.bench_async import PROBLEM
+from benchmarks.mock_llm import MockLLMServer
+from services import singleflight
+from services.singleflight import SingleFlight
+
+
+async def burst(solve, duplicates: int) -> list:
+    # Clients type the problem slightly differently; normalization still matches them
+    variants = [PROBLEM, PROBLEM.upper(), f"  {PROBLEM}\n"]
+    return await asyncio.gather(*(solve(variants[i % len(variants)], "mock") for i in range(duplicates)))
+
+
+async def main(duplicates: list, latency_ms: float, port: int):
+    with MockLLMServer(port=port, latency_ms=latency_ms) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ["HF_ROUTER_URL"] = f"{server.base_url}/chat/completions"
+        os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+
+        # Imported after the env vars are set so the agents pick up the mock URLs
+        from agents.multi_agent import solve_with_multi_agent
+        from agents.single_agent import solve_with_single_agent
+
+        print(f"Concurrent identical solves, mock latency {latency_ms:.0f} ms, response cache off\n")
+        for mode, solve in (("multi", solve_with_multi_agent), ("single", solve_with_single_agent)):
+            print(f"/{mode}")
+            print(f"  {'duplicates':>10}  {'coalescing':<10} {'calls':>7} {'peak':>6} {'time':>9}  answers")
+            for count in duplicates:
+                for label, flights in (("off", None), ("on", SingleFlight())):
+                    singleflight._single_flight, singleflight._single_flight_configured = flights, True
+                    calls = server.calls
+                    server.app.state.peak_in_flight = 0
+                    start = time.perf_counter()
+                    results = await burst(solve, count)
+                    elapsed = time.perf_counter() - start
+                    answers = {result.final_answer for result in results}
+                    print(f"  {count:>10}  {label:<10} {server.calls - calls:>7} {server.peak_in_flight:>6} "
+                          f"{elapsed:>8.2f}s  {len(answers)} distinct, "
+                          f"{sum(result.success for result in results)}/{count} ok")
+            print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Identical concurrent solves with and without coalescing")
+    parser.add_argument("--duplicates", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.duplicates, args.latency_ms, args.port))
@@ -0,0 +1,159 @@
+"""
+Startup benchmark - cold start to the first successful solve
+Starts the API as a fresh `uvicorn main:app` process, the way the host
+starts it after a spin-down, with both agents pointed at the mock LLM
+server. The mock is reached through a proxy that holds every new
+connection for --connect-ms before passing it on, standing in for the TCP
+and TLS handshakes to a remote provider. Each boot path runs several times:
+
+- no warm-up: the default; the first solve opens the provider connections
+- warm-up: /api/ready turns 200 once the provider connections are open
+
+Each boot is measured twice over: once sending a multi-agent solve as soon
+as the port accepts connections (the request that woke the process), once
+sending it when /api/ready answers 200 (a load balancer that waits for
+readiness). Reports how long importing main takes, when the port opened,
+when the process was ready, and when the first solve succeeded, all from
+process start, plus the first solve's own latency.
+
+Run from the backend directory:
+    python -m benchmarks.bench_startup --runs 5 --latency-ms 50 --connect-ms 150
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import httpx
+
+from benchmarks.bench_async import PROBLEM
+from benchmarks.mock_llm import MockLLMServer
+
+BOOT_PATHS = (
+    ("no warm-up", {"STARTUP_WARM_UP": "false"}),
+    ("warm-up", {"STARTUP_WARM_UP": "true"}),
+)
+
+SERVE = "import uvicorn\nuvicorn.run('main:app', host='127.0.0.1', port={port}, log_level='warning')\n"
+
+
+class SlowConnectProxy:
+    """Forwards TCP connections to a local port, holding each new one for connect_ms first"""
+
+    def __init__(self, port: int, target_port: int, connect_ms: float):
+        self.port = port
+        self.target_port = target_port
+        self.connect_ms = connect_ms
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    async def _pipe(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while data := await reader.read(65536):
+                writer.write(data)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _handle(self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter):
+        await asyncio.sleep(self.connect_ms / 1000)
+        upstream_reader, upstream_writer = await asyncio.open_connection("127.0.0.1", self.target_port)
+        await asyncio.gather(self._pipe(client_reader, upstream_writer), self._pipe(upstream_reader, client_writer))
+
+    def __enter__(self):
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(asyncio.start_server(self._handle, "127.0.0.1", self.port),
+                                         self.loop).result()
+        return self
+
+    def __exit__(self, *exc):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+def import_time() -> float:
+    """Seconds a fresh interpreter takes to import main"""
+    code = "import time\nstart = time.perf_counter()\nimport main\nprint(time.perf_counter() - start)"
+    return float(subprocess.check_output([sys.executable, "-c", code], text=True).strip())
+
+
+def wait_for(client: httpx.Client, path: str, deadline: float) -> float:
+    """Poll until path answers 200; returns the time it did"""
+    while time.perf_counter() < deadline:
+        try:
+            if client.get(path).status_code == 200:
+                return time.perf_counter()
+        except httpx.TransportError:
+            pass
+        time.sleep(0.005)
+    raise TimeoutError(f"{path} did not answer 200 in time")
+
+
+def solve(client: httpx.Client) -> float:
+    start = time.perf_counter()
+    response = client.post("/api/solve/multi", json={"problem": PROBLEM})
+    response.raise_for_status()
+    assert response.json()["success"], response.json()["error"]
+    return time.perf_counter() - start
+
+
+def boot(env: dict, port: int, wait_ready: bool) -> dict:
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-c", SERVE.format(port=port)], env=env)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+            up = wait_for(client, "/", start + 60)
+            ready = wait_for(client, "/api/ready", start + 60) if wait_ready else None
+            first = solve(client)
+            solved = time.perf_counter()
+            if not wait_ready:
+                ready = wait_for(client, "/api/ready", start + 60)
+        return {"up": up - start, "ready": ready - start, "solved": solved - start, "first_solve": first}
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main(runs: int, latency_ms: float, connect_ms: float, port: int, mock_port: int, proxy_port: int):
+    with MockLLMServer(port=mock_port, latency_ms=latency_ms), \
+            SlowConnectProxy(proxy_port, mock_port, connect_ms):
+        base_url = f"http://127.0.0.1:{proxy_port}/v1"
+        env = dict(os.environ,
+                   MODEL_SINGLE_BACKEND="huggingface", MODEL_MULTI_BACKEND="openai",
+                   OPENAI_API_KEY="mock", OPENAI_BASE_URL=base_url,
+                   HUGGINGFACE_API_KEY="mock", HF_ROUTER_URL=f"{base_url}/chat/completions",
+                   RESPONSE_CACHE_ENABLED="false", SINGLE_FLIGHT_ENABLED="false")
+
+        print(f"{runs} cold starts per boot path and request timing, mock LLM at {latency_ms:.0f} ms per call, "
+              f"{connect_ms:.0f} ms per new connection (medians)\n")
+        print(f"{'boot path':<24} {'first request':<14} {'import main':>12} {'port open':>10} {'ready':>8} "
+              f"{'solved at':>10} {'1st solve':>10}")
+        imports = statistics.median(import_time() for _ in range(runs)) * 1000
+        for label, overrides in BOOT_PATHS:
+            for timing, wait_ready in (("at port open", False), ("at ready", True)):
+                boots = [boot(dict(env, **overrides), port, wait_ready) for _ in range(runs)]
+                median = lambda key: statistics.median(run[key] for run in boots) * 1000
+                print(f"{label:<24} {timing:<14} {imports:>10.0f}ms {median('up'):>8.0f}ms {median('ready'):>6.0f}ms "
+                      f"{median('solved'):>8.0f}ms {median('first_solve'):>8.0f}ms")
+        print("\ntimes are from process start, except the first solve's own latency")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold start to the first successful solve")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--connect-ms", type=float, default=150.0,
+                        help="Delay before each new provider connection is passed on (handshakes)")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--mock-port", type=int, default=9100)
+    parser.add_argument("--proxy-port", type=int, default=9101)
+    args = parser.parse_args()
+
+    main(args.runs, args.latency_ms, args.connect_ms, args.port, args.mock_port, args.proxy_port)
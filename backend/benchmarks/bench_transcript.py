@@ -0,0 +1,114 @@
+"""
+Transcript micro-benchmark - per-step pydantic models vs models.transcript
+Builds the reasoning transcript of one solve and turns it into the HTTP
+response body, the way the solve endpoints did before (a validated
+ReasoningStep per step, then FastAPI's response_model validation and
+serialization into a JSONResponse) and the way they do now (slotted Step
+records, one AgentResponse validation at the end, then one encode in the full
+or compact format). Reports the time per response, the memory the transcript
+holds during a solve, and the peak memory up to the encoded body.
+
+Run from the backend directory:
+    python -m benchmarks.bench_transcript --steps 300 --repeat 200
+"""
+
+import argparse
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from fastapi.responses import JSONResponse
+from fastapi.utils import create_response_field
+
+from models.schemas import AgentResponse, ReasoningStep, SolveStats
+from models.transcript import Transcript
+from services.encoding import encode
+
+AGENTS = ("System", "Agent 1 (Proposer)", "Agent 2 (Critic)")
+RESPONSE_FIELD = create_response_field(name="Response_solve", type_=AgentResponse)
+
+
+def lines(steps: int) -> list:
+    # Runs of proposer/critic lines between system notes, like a multi-round debate
+    return [(AGENTS[0] if i % 12 == 0 else AGENTS[1 + (i // 6) % 2], f"Step {i}: 12 * 4 = {i * 48} apples")
+            for i in range(steps)]
+
+
+def legacy_transcript(steps: list) -> list:
+    transcript = []
+    last = time.perf_counter()
+    for number, (agent, content) in enumerate(steps, 1):
+        now = time.perf_counter()
+        transcript.append(ReasoningStep(
+            agent=agent,
+            content=content,
+            step_number=number,
+            timestamp=datetime.now(timezone.utc).isoformat(),
+            duration_ms=(now - last) * 1000
+        ))
+        last = now
+    return transcript
+
+
+def legacy(steps: list) -> bytes:
+    transcript = legacy_transcript(steps)
+    result = AgentResponse(success=True, final_answer="48", reasoning_steps=transcript,
+                           total_steps=len(transcript), stats=SolveStats())
+    # What FastAPI's serialize_response does with response_model=AgentResponse
+    value, _ = RESPONSE_FIELD.validate(result, {}, loc=("response",))
+    return JSONResponse(RESPONSE_FIELD.serialize(value, mode="json")).body
+
+
+def current_transcript(steps: list) -> Transcript:
+    transcript = Transcript()
+    for agent, content in steps:
+        transcript.add(agent, content)
+    return transcript
+
+
+def current(steps: list, response_format: str) -> bytes:
+    transcript = current_transcript(steps)
+    result = AgentResponse(success=True, final_answer="48", reasoning_steps=transcript.to_dicts(),
+                           total_steps=transcript.count, stats=SolveStats())
+    return encode(result, response_format).body
+
+
+def measure(build, run, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        body = run()
+    per_response_ms = (time.perf_counter() - start) / repeat * 1000
+
+    # Memory the transcript holds while the solve runs, then the peak up to the encoded body
+    tracemalloc.start()
+    transcript = build()
+    held, _ = tracemalloc.get_traced_memory()
+    del transcript
+    tracemalloc.reset_peak()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return per_response_ms, held / 1024, peak / 1024, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=300, help="Reasoning steps per response")
+    parser.add_argument("--repeat", type=int, default=200, help="Responses per timing")
+    args = parser.parse_args()
+
+    steps = lines(args.steps)
+    rows = [
+        ("legacy", lambda: legacy_transcript(steps), lambda: legacy(steps)),
+        ("transcript full", lambda: current_transcript(steps), lambda: current(steps, "full")),
+        ("transcript compact", lambda: current_transcript(steps), lambda: current(steps, "compact")),
+    ]
+    print(f"{args.steps} steps per response\n")
+    print(f"{'':<20}{'time':>10}{'transcript':>13}{'peak mem':>12}{'body':>11}")
+    for label, build, run in rows:
+        per_response_ms, held_kib, peak_kib, size = measure(build, run, args.repeat)
+        print(f"{label:<20}{per_response_ms:>8.2f}ms{held_kib:>10.0f}KiB{peak_kib:>9.0f}KiB{size / 1024:>8.1f}KiB")
+
+
+if __name__ == "__main__":
+    main()
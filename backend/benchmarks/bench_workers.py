@@ -0,0 +1,147 @@
+"""
+Multi-worker benchmark - throughput by worker processes, and shared state across them
+Starts the API with serve.py at several worker counts, with the single agent
+pointed at the mock LLM server, which runs as a separate process. Then:
+
+- throughput: concurrent clients send distinct single-agent solves for a
+  fixed time (cache off). Reports solves/s, p50/p99 latency and the speedup
+  over one worker. Serving work is CPU-bound once provider latency is
+  overlapped, so the speedup is bounded by the CPU cores the host has.
+- shared state: at the highest worker count, with shared state on and then
+  off. One problem is solved 20 times, on a new connection each time so the
+  requests spread over the workers, and the cached replies are counted. One
+  client sends 60 requests against a burst of 20, and the admitted ones are
+  counted. A job is submitted and polled 20 times, and the 404s are counted.
+
+Run from the backend directory:
+    python -m benchmarks.bench_workers --workers 1 2 4 --clients 64 --seconds 10 --latency-ms 50
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.bench_async import PROBLEM
+from benchmarks.bench_clients import percentile
+
+
+def start_server(workers: int, port: int, mock_port: int, state_path: str, **env) -> subprocess.Popen:
+    env = dict(os.environ,
+               MODEL_SINGLE_BACKEND="huggingface", HUGGINGFACE_API_KEY="mock",
+               HF_ROUTER_URL=f"http://127.0.0.1:{mock_port}/v1/chat/completions",
+               STATE_PATH=state_path, JOBS_PATH=state_path + ".jobs", **env)
+    process = subprocess.Popen([sys.executable, "serve.py", "--workers", str(workers), "--port", str(port),
+                                "--log-level", "warning"], env=env, stdout=subprocess.DEVNULL)
+    deadline = time.perf_counter() + 60
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/ready").status_code == 200:
+                time.sleep(0.5 * workers)  # The other workers come up around the same time
+                return process
+        except httpx.TransportError:
+            pass
+        time.sleep(0.05)
+    process.terminate()
+    raise TimeoutError("The API did not become ready")
+
+
+def stop_server(process: subprocess.Popen):
+    process.terminate()
+    process.wait()
+
+
+async def throughput(port: int, clients: int, seconds: float) -> tuple:
+    latencies = []
+    limits = httpx.Limits(max_connections=clients)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as http:
+        deadline = time.perf_counter() + seconds
+
+        async def client(n: int):
+            i = 0
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await http.post("/api/solve/single", json={"problem": f"{PROBLEM} (#{n}-{i})"})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+                i += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client(n) for n in range(clients)))
+        return latencies, time.perf_counter() - start
+
+
+def fresh(port: int) -> httpx.Client:
+    # No keep-alive: every request opens a connection, which any worker may accept
+    return httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=60,
+                        limits=httpx.Limits(max_keepalive_connections=0))
+
+
+def shared_state_checks(port: int) -> dict:
+    with fresh(port) as http:
+        cached = sum(http.post("/api/solve/single", json={"problem": PROBLEM}).json()["cached"] for _ in range(20))
+        statuses = [http.post("/api/solve/single", json={"problem": f"{PROBLEM} (rate {i})"},
+                              headers={"X-API-Key": "one-client"}).status_code for i in range(60)]
+        job = http.post("/api/jobs", json={"problem": f"{PROBLEM} (job)", "mode": "single"},
+                        headers={"X-API-Key": "job-client"}).json()
+        missing = sum(http.get(job["poll"]).status_code == 404 for _ in range(20))
+    return {"cached": cached, "admitted": statuses.count(200), "missing": missing}
+
+
+def main(worker_counts: list, clients: int, seconds: float, latency_ms: float, port: int, mock_port: int):
+    mock = subprocess.Popen([sys.executable, "-m", "benchmarks.mock_llm", "--port", str(mock_port),
+                             "--latency-ms", str(latency_ms)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    state_dir = tempfile.mkdtemp()
+    try:
+        time.sleep(2)
+        print(f"{os.cpu_count()} CPU cores, {clients} concurrent clients for {seconds:.0f}s, "
+              f"mock LLM at {latency_ms:.0f} ms per call\n")
+        print(f"{'workers':>7} {'solves/s':>9} {'p50':>9} {'p99':>9} {'speedup':>8}")
+        base = None
+        for workers in worker_counts:
+            server = start_server(workers, port, mock_port, os.path.join(state_dir, f"load-{workers}.db"),
+                                  RESPONSE_CACHE_ENABLED="false", ADMISSION_RATE_LIMIT="0",
+                                  ADMISSION_MAX_IN_FLIGHT="1000", ADMISSION_ENDPOINT_LIMITS="{}")
+            try:
+                latencies, elapsed = asyncio.run(throughput(port, clients, seconds))
+            finally:
+                stop_server(server)
+            rate = len(latencies) / elapsed
+            base = base or rate
+            print(f"{workers:>7} {rate:>9.1f} {percentile(latencies, 50) * 1000:>7.1f}ms "
+                  f"{percentile(latencies, 99) * 1000:>7.1f}ms {rate / base:>7.2f}x")
+
+        workers = max(worker_counts)
+        print(f"\nShared state with {workers} workers\n")
+        print(f"{'shared state':<13} {'cached (of 20)':>15} {'admitted (burst 20)':>20} {'job 404s (of 20)':>17}")
+        for shared in ("true", "false"):
+            server = start_server(workers, port, mock_port, os.path.join(state_dir, f"state-{shared}.db"),
+                                  STATE_SHARED=shared, ADMISSION_RATE_LIMIT="0.01", ADMISSION_BURST="20",
+                                  ADMISSION_API_KEYS='["one-client", "job-client"]')
+            try:
+                checks = shared_state_checks(port)
+            finally:
+                stop_server(server)
+            print(f"{'on' if shared == 'true' else 'off':<13} {checks['cached']:>15} {checks['admitted']:>20} "
+                  f"{checks['missing']:>17}")
+    finally:
+        mock.terminate()
+        mock.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput by worker processes, and shared state across them")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--port", type=int, default=9300)
+    parser.add_argument("--mock-port", type=int, default=9100)
+    args = parser.parse_args()
+
+    main(args.workers, args.clients, args.seconds, args.latency_ms, args.port, args.mock_port)
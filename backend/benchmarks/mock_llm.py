@@ -0,0 +1,315 @@
+"""
+Mock LLM Server - Local stand-in for the OpenAI and Hugging Face Router APIs
+Serves an OpenAI-compatible /v1/chat/completions endpoint (including
+stream=True), which is also the shape the Hugging Face Router speaks, with
+scripted proposer/critic/single-agent answers and an artificial latency, so
+benchmarks can run without network access or API spend. The latency is
+fixed, or drawn from a seeded uniform, normal or lognormal distribution.
+Faults can be injected at fixed rates: 503s, 429s with Retry-After, and slow
+responses, to exercise the retry, circuit breaker and hedging paths.
+
+By default every prompt gets the same canned answer. With scripted
+replies, a prompt for one of the sample problems is answered from that
+problem's debate script (benchmarks/scripted_llm.py), so the debate takes
+the rounds the script describes. GET /stats reports the calls served, by
+role, and the faults injected.
+
+Run standalone:
+    python -m benchmarks.mock_llm --port 9100 --latency-ms 200
+    python -m benchmarks.mock_llm --latency-dist lognormal --jitter-ms 100 --scripted
+    python -m benchmarks.mock_llm --error-rate 0.1 --rate-limit-rate 0.05 --slow-rate 0.02
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from starlette.requests import ClientDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from agents.backends import scripted_reply
+from agents.extraction import extract_structured_answer
+
+
+async def stream_reply(content: str, model: str, token_delay_ms: float):
+    """Emit a reply as OpenAI-style chat.completion.chunk server-sent events"""
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    for token in re.findall(r"\S+\s*|\s+", content):
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+        if token_delay_ms:
+            await asyncio.sleep(token_delay_ms / 1000)
+    yield "data: [DONE]\n\n"
+
+
+class Faults:
+    """Fault injection rates (0-1) for the mock server; can be changed while it runs"""
+
+    def __init__(self, error_rate: float = 0.0, rate_limit_rate: float = 0.0, retry_after: float = 1.0,
+                 slow_rate: float = 0.0, slow_ms: float = 5000.0, seed: int = 0):
+        self.error_rate = error_rate            # 503 Service Unavailable
+        self.rate_limit_rate = rate_limit_rate  # 429 Too Many Requests with Retry-After
+        self.retry_after = retry_after
+        self.slow_rate = slow_rate              # Responses delayed by slow_ms on top of the latency
+        self.slow_ms = slow_ms
+        self.random = random.Random(seed)
+        self.injected = {"error": 0, "rate_limit": 0, "slow": 0}
+
+    def pick(self) -> str:
+        """Which fault (or "ok") the next request gets"""
+        roll = self.random.random()
+        for fault, rate in (("error", self.error_rate), ("rate_limit", self.rate_limit_rate),
+                            ("slow", self.slow_rate)):
+            if roll < rate:
+                self.injected[fault] += 1
+                return fault
+            roll -= rate
+        return "ok"
+
+
+class Latency:
+    """Per-call latency: fixed, or drawn from a seeded distribution around mean_ms"""
+    DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+
+    def __init__(self, mean_ms: float = 200.0, distribution: str = "fixed", jitter_ms: float = 0.0, seed: int = 0):
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution {distribution!r}; expected one of {self.DISTRIBUTIONS}")
+        self.mean_ms = mean_ms
+        self.distribution = distribution
+        self.jitter_ms = jitter_ms  # Half-width for uniform, standard deviation for normal and lognormal
+        self.random = random.Random(seed)
+
+    def sample(self) -> float:
+        """Milliseconds the next call waits"""
+        if self.distribution == "fixed" or not self.jitter_ms or not self.mean_ms:
+            return self.mean_ms
+        if self.distribution == "uniform":
+            return max(0.0, self.random.uniform(self.mean_ms - self.jitter_ms, self.mean_ms + self.jitter_ms))
+        if self.distribution == "normal":
+            return max(0.0, self.random.gauss(self.mean_ms, self.jitter_ms))
+        # Lognormal with the given mean and standard deviation: a long right tail, like real providers
+        sigma2 = math.log(1 + (self.jitter_ms / self.mean_ms) ** 2)
+        return self.random.lognormvariate(math.log(self.mean_ms) - sigma2 / 2, math.sqrt(sigma2))
+
+
+def prompt_role(messages: List[dict]) -> str:
+    system_prompt = messages[0]["content"] if messages else ""
+    if "Agent 2 (Critic)" in system_prompt:
+        return "critic"
+    if "Agent 1 (Proposer)" in system_prompt:
+        return "proposer"
+    return "single"
+
+
+class ScriptedReplies:
+    """
+    Answers prompts for known problems from their debate scripts. The mock
+    keeps no conversation state, so the turn is read from the prompt: a
+    critic reviewing the proposer's n-th answer gives its n-th reply, and a
+    proposer told its previous answer was the n-th gives its (n+1)-th. The
+    single agent answers like the proposer's first turn.
+    """
+
+    def __init__(self, scripts: Dict[str, dict]):
+        from benchmarks.scripted_llm import render_critic, render_proposer
+
+        self.scripts = {}
+        for problem, script in scripts.items():
+            proposals = [render_proposer(turn) for turn in script["proposer"]]
+            self.scripts[problem] = {
+                "proposer": proposals,
+                "answers": [extract_structured_answer(reply, "MY PROPOSED ANSWER") for reply in proposals],
+                "critic": [render_critic(turn) for turn in script["critic"]],
+                "single": proposals[0].replace("MY PROPOSED ANSWER:", "FINAL ANSWER:"),
+            }
+
+    @classmethod
+    def for_samples(cls) -> "ScriptedReplies":
+        """Scripts for the API's sample problems"""
+        from benchmarks.scripted_llm import SCRIPTS
+        from main import get_sample_problems
+
+        problems = asyncio.run(get_sample_problems())["problems"]
+        return cls({sample["problem"]: SCRIPTS[sample["id"]] for sample in problems if sample["id"] in SCRIPTS})
+
+    def reply(self, messages: List[dict]) -> Optional[str]:
+        """The scripted reply, or None when the prompt is not about a known problem"""
+        prompt = messages[-1]["content"] if messages else ""
+        # The full-layout revision prompt quotes the critic instead of restating the problem
+        script = next((script for problem, script in self.scripts.items()
+                       if problem in prompt or any(reply in prompt for reply in script["critic"])), None)
+        if script is None:
+            return None
+
+        role = prompt_role(messages)
+        if role == "single":
+            return script["single"]
+        if role == "critic":
+            reviewed = [i for i, answer in enumerate(script["answers"]) if f"MY PROPOSED ANSWER: {answer}" in prompt]
+            turn = reviewed[-1] if reviewed else 0
+            return script["critic"][min(turn, len(script["critic"]) - 1)]
+        if "feedback" not in prompt:
+            return script["proposer"][0]
+        previous = re.search(r"Your previous answer: (.+)", prompt)
+        turn = len(script["proposer"]) - 1  # Without the previous answer in the prompt, assume the last turn
+        if previous and previous.group(1).strip() in script["answers"]:
+            turn = min(script["answers"].index(previous.group(1).strip()) + 1, turn)
+        return script["proposer"][turn]
+
+
+def create_app(latency_ms: float = 200.0, token_delay_ms: float = 0.0, faults: Faults = None,
+               latency: Latency = None, scripted: ScriptedReplies = None) -> FastAPI:
+    """Create the mock server app"""
+    app = FastAPI(title="Mock LLM Server")
+    app.state.latency = latency or Latency(latency_ms)
+    app.state.token_delay_ms = token_delay_ms
+    app.state.faults = faults or Faults()
+    app.state.scripted = scripted
+    app.state.calls = 0
+    app.state.calls_by_role = {"proposer": 0, "critic": 0, "single": 0}
+    app.state.in_flight = 0
+    app.state.peak_in_flight = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        try:
+            body = await request.json()
+        except ClientDisconnect:  # A hedged request that lost the race
+            return JSONResponse({}, status_code=499)
+        app.state.calls += 1
+        app.state.calls_by_role[prompt_role(body.get("messages", []))] += 1
+        app.state.in_flight += 1
+        app.state.peak_in_flight = max(app.state.peak_in_flight, app.state.in_flight)
+        try:
+            return await respond(body)
+        finally:
+            app.state.in_flight -= 1
+
+    @app.get("/stats")
+    async def stats():
+        return {
+            "calls": app.state.calls,
+            "calls_by_role": app.state.calls_by_role,
+            "in_flight": app.state.in_flight,
+            "peak_in_flight": app.state.peak_in_flight,
+            "faults_injected": app.state.faults.injected
+        }
+
+    async def respond(body: dict):
+        fault = app.state.faults.pick()
+        if fault == "error":
+            return JSONResponse({"error": {"message": "Service unavailable", "type": "server_error"}},
+                                status_code=503)
+        if fault == "rate_limit":
+            return JSONResponse({"error": {"message": "Rate limit exceeded", "type": "rate_limit"}},
+                                status_code=429, headers={"Retry-After": f"{app.state.faults.retry_after:g}"})
+        if fault == "slow":
+            await asyncio.sleep(app.state.faults.slow_ms / 1000)
+
+        await asyncio.sleep(app.state.latency.sample() / 1000)
+
+        messages = body.get("messages", [])
+        content = (app.state.scripted and app.state.scripted.reply(messages)) or scripted_reply(messages)
+        if body.get("stream"):
+            return StreamingResponse(
+                stream_reply(content, body.get("model", "mock"), app.state.token_delay_ms),
+                media_type="text/event-stream"
+            )
+
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": sum(len(m["content"].split()) for m in body.get("messages", [])),
+                "completion_tokens": len(content.split()),
+                "total_tokens": 0
+            }
+        }
+
+    return app
+
+
+class MockLLMServer:
+    """Runs the mock server in a background thread for the duration of a benchmark"""
+
+    def __init__(self, port: int = 9100, latency_ms: float = 200.0, token_delay_ms: float = 0.0,
+                 faults: Faults = None, latency: Latency = None, scripted: ScriptedReplies = None):
+        self.port = port
+        self.app = create_app(latency_ms, token_delay_ms, faults, latency, scripted)
+        config = uvicorn.Config(self.app, host="127.0.0.1", port=port, log_level="warning")
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    @property
+    def calls(self) -> int:
+        return self.app.state.calls
+
+    @property
+    def peak_in_flight(self) -> int:
+        """Most requests the server was handling at once"""
+        return self.app.state.peak_in_flight
+
+    @property
+    def faults(self) -> Faults:
+        return self.app.state.faults
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the mock LLM server")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--latency-dist", choices=Latency.DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--jitter-ms", type=float, default=0.0,
+                        help="Half-width (uniform) or standard deviation (normal, lognormal) of the latency")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the latency and fault draws")
+    parser.add_argument("--token-delay-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction delayed by --slow-ms")
+    parser.add_argument("--slow-ms", type=float, default=5000.0)
+    parser.add_argument("--scripted", action="store_true",
+                        help="Answer the sample problems from their debate scripts")
+    args = parser.parse_args()
+
+    faults = Faults(args.error_rate, args.rate_limit_rate, args.retry_after, args.slow_rate, args.slow_ms, args.seed)
+    latency = Latency(args.latency_ms, args.latency_dist, args.jitter_ms, args.seed)
+    scripted = ScriptedReplies.for_samples() if args.scripted else None
+    uvicorn.run(create_app(args.latency_ms, args.token_delay_ms, faults, latency, scripted),
+                host="127.0.0.1", port=args.port)
@@ -0,0 +1,84 @@
+"""
+Scripted LLM - In-process stand-in for the proposer and critic
+Each sample problem gets a script of what Agent 1 proposes and what Agent 2
+answers in every round, covering the common debate shapes: right first time,
+a wrong proposal the critic corrects, and a stalemate. ScriptedDebateAgents
+replays those scripts instead of calling OpenAI, with a simulated latency, so
+scheduling strategies can be compared call-for-call without network noise.
+"""
+
+import asyncio
+from typing import Dict, List, Tuple
+
+from agents.multi_agent import DebateAgents
+from services.metrics import estimate_tokens
+
+# problem id -> proposer turns, critic turns; each turn is (work lines, answer[, verdict])
+SCRIPTS: Dict[int, dict] = {
+    # Wrong proposal, critic corrects it, proposer adopts the correction
+    1: {
+        "proposer": [
+            (["100 - 3 = 97", "97 + 3 = 100"], "100 euros"),
+            (["You spent 97 - 97 + 3 + 2 + 5 = 10"], "10 euros"),
+        ],
+        "critic": [
+            (["The question asks for the confusing total, not the bill"], "10 euros", "INCORRECT"),
+            (["Checked"], "10 euros", "CORRECT"),
+        ],
+    },
+    # Right first time
+    2: {
+        "proposer": [(["80 * 3 = 240", "240 * 2 = 480"], "480 miles")],
+        "critic": [(["80 * 3 = 240", "240 + 240 = 480"], "480 miles", "CORRECT")],
+    },
+    3: {
+        "proposer": [(["8 + 5 = 13", "13 * 2 = 26", "26 + 13 + 8 = 47"], "47 marbles")],
+        "critic": [(["26 + 13 + 8 = 47"], "47 marbles", "CORRECT")],
+    },
+    # Arithmetic slip, critic corrects it, proposer adopts the correction
+    4: {
+        "proposer": [
+            (["96 / 8 = 12", "12 * 3 = 36", "36 * 12 = 384"], "384 square meters"),
+            (["96 / 8 = 12", "12 * 3 = 36", "36 * 12 = 432"], "432 square meters"),
+        ],
+        "critic": [
+            (["36 * 12 = 432, not 384"], "432 square meters", "INCORRECT"),
+            (["36 * 12 = 432"], "432 square meters", "CORRECT"),
+        ],
+    },
+    # Stalemate: both agents keep their (different) answers every round
+    5: {
+        "proposer": [(["50 * 1.2 = 60", "60 * 0.85 = 51", "51 * 1.1 = 56.1"], "56.10 dollars")] * 3,
+        "critic": [(["I get a different result for Wednesday"], "55.00 dollars", "INCORRECT")] * 3,
+    },
+}
+
+
+def render_proposer(turn: Tuple) -> str:
+    work, answer = turn[0], turn[1]
+    return "\n".join(work + [f"MY PROPOSED ANSWER: {answer}"])
+
+
+def render_critic(turn: Tuple) -> str:
+    work, answer, verdict = turn
+    return "\n".join(work + [f"VERDICT: {verdict}", f"MY ANSWER: {answer}"])
+
+
+class ScriptedDebateAgents(DebateAgents):
+    """DebateAgents whose model calls are answered from a script"""
+
+    def __init__(self, script: dict, latency_ms: float = 500.0, **kwargs):
+        super().__init__(api_key="mock", **kwargs)
+        self.script = script
+        self.latency_ms = latency_ms
+        self.turns = {"proposer": 0, "critic": 0}
+
+    async def _complete(self, messages: List[dict], params: dict, backend=None) -> Tuple[str, int, int]:
+        role = "critic" if "Agent 2 (Critic)" in messages[0]["content"] else "proposer"
+        turns = self.script[role]
+        turn = turns[min(self.turns[role], len(turns) - 1)]
+        self.turns[role] += 1
+
+        await asyncio.sleep(self.latency_ms / 1000)
+        reply = render_critic(turn) if role == "critic" else render_proposer(turn)
+        return (reply, *estimate_tokens(messages, reply))
@@ -4,17 +4,60 @@ Exposes endpoints for single-agent and multi-agent problem solving
 All API keys are read from .env file
 """
 
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from models.schemas import ProblemRequest, AgentResponse
-from agents.single_agent import solve_with_single_agent
-from agents.multi_agent import solve_with_multi_agent
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel
+from models.schemas import ProblemRequest, AgentResponse, CompareResponse, BatchRequest, Job, JobRequest
+from models.transcript import Step
+from agents.backends import api_key_variable, get_batchers
+from agents.clients import get_client_registry, close_client_registry
+from agents.single_agent import solve_with_single_agent, stream_with_single_agent
+from agents.multi_agent import solve_with_multi_agent, stream_with_multi_agent
+from services.admission import AdmissionMiddleware, get_admission_controller
+from services.batch import run_batch
+from services.cache import get_response_cache
+from services.encoding import ResponseFormat, encode
+from services.jobs import JobQueueFull, JobSettings, get_job_queue
+from services.memo import get_llm_memo
+from services.metrics import render as render_metrics
+from services.singleflight import get_single_flight
+from services.startup import get_warm_up
+import asyncio
+import json
 import os
+import time
+from typing import Optional
 from dotenv import load_dotenv
+from worker import solve_job
 
 load_dotenv()
 
-app = FastAPI(title="Multi-Agent Demo API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Create the shared LLM connection pools and job workers at startup and start
+    the background warm-up (GET /api/ready reports when it is done); stop them at shutdown
+    """
+    get_client_registry()
+    workers = get_job_queue().start_workers(solve_job, JobSettings().workers)
+    warm_up = get_warm_up()
+    warm_up.start()
+    yield
+    await warm_up.stop()
+    for task in workers:
+        task.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    await close_client_registry()
+
+
+app = FastAPI(title="Multi-Agent Demo API", lifespan=lifespan)
+
+# Admission control: in-flight caps, a bounded wait queue and per-client rate limits for solve routes
+# (added before CORS so rejections still carry CORS headers)
+app.add_middleware(AdmissionMiddleware)
 
 # CORS middleware to allow frontend requests
 app.add_middleware(
@@ -33,52 +76,300 @@ def read_root():
         "message": "Multi-Agent Demo API",
         "endpoints": {
             "single_agent": "/api/solve/single",
-            "multi_agent": "/api/solve/multi"
+            "multi_agent": "/api/solve/multi",
+            "single_agent_stream": "/api/solve/single/stream",
+            "multi_agent_stream": "/api/solve/multi/stream",
+            "compare": "/api/solve/compare",
+            "compare_stream": "/api/solve/compare/stream",
+            "batch": "/api/solve/batch",
+            "jobs": "/api/jobs",
+            "admission_status": "/api/admission/status",
+            "batching_stats": "/api/batching/stats",
+            "metrics": "/metrics",
+            "ready": "/api/ready"
         }
     }
 
-@app.post("/api/solve/single", response_model=AgentResponse)
-async def solve_single_agent(request: ProblemRequest):
+@app.get("/api/ready")
+async def get_readiness():
     """
-    Solve a problem using a small model (Qwen2.5-0.5B from Hugging Face)
-    The API key is read from the .env file on the backend
+    Readiness check: 503 until the startup warm-up has finished, then 200.
+    Both report how long each warm-up step took and whether it worked
     """
-    # Get Hugging Face API key from environment
-    hf_api_key = os.getenv("HUGGINGFACE_API_KEY")
+    warm_up = get_warm_up()
+    return JSONResponse(warm_up.status(), status_code=200 if warm_up.ready else 503)
 
-    if not hf_api_key or hf_api_key == "your_huggingface_api_key_here":
+def get_api_key(mode: str) -> Optional[str]:
+    """Get the API key for a mode's model backend from the environment (None for in-process backends)"""
+    variable = api_key_variable(mode)
+    if variable is None:
+        return None
+    api_key = os.getenv(variable)
+
+    if not api_key or api_key == f"your_{variable.lower()}_here":
         raise HTTPException(
             status_code=500,
-            detail="HUGGINGFACE_API_KEY not configured. Please set it in the .env file on the server."
+            detail=f"{variable} not configured. Please set it in the .env file on the server."
         )
+    return api_key
+
+async def sse_stream(events):
+    """Encode agent events as server-sent events"""
+    try:
+        async for event, payload in events:
+            if isinstance(payload, Step):
+                data = payload.to_dict()
+            elif isinstance(payload, BaseModel):
+                data = payload.model_dump()
+            else:
+                data = payload
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    except Exception as e:
+        yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+    finally:
+        # Closing the response (e.g. on disconnect) closes the events, so their cleanup runs now
+        await events.aclose()
+
+@app.post("/api/solve/single", response_model=AgentResponse)
+async def solve_single_agent(request: ProblemRequest, response_format: ResponseFormat = Query("full", alias="format")):
+    """
+    Solve a problem using a small model (Qwen2.5-0.5B from Hugging Face)
+    The API key is read from the .env file on the backend
+    Pass ?format=compact to get the reasoning steps grouped by agent
+    """
+    single_api_key = get_api_key("single")
 
     try:
-        result = solve_with_single_agent(request.problem, hf_api_key)
-        return result
+        result = await solve_with_single_agent(request.problem, single_api_key)
+        return encode(result, response_format)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/solve/multi", response_model=AgentResponse)
-async def solve_multi_agent(request: ProblemRequest):
+async def solve_multi_agent(request: ProblemRequest, response_format: ResponseFormat = Query("full", alias="format")):
     """
     Solve a problem using multi-agent debate system
     The API key is read from the .env file on the backend
+    Pass ?format=compact to get the reasoning steps grouped by agent
     """
-    # Get OpenAI API key from environment
-    openai_api_key = os.getenv("OPENAI_API_KEY")
-
-    if not openai_api_key or openai_api_key == "your_openai_api_key_here":
-        raise HTTPException(
-            status_code=500,
-            detail="OPENAI_API_KEY not configured. Please set it in the .env file on the server."
-        )
+    multi_api_key = get_api_key("multi")
 
     try:
-        result = solve_with_multi_agent(request.problem, openai_api_key)
-        return result
+        result = await solve_with_multi_agent(request.problem, multi_api_key,
+                                              request.latency_budget_ms, request.token_budget)
+        return encode(result, response_format)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/solve/single/stream")
+async def solve_single_agent_stream(request: ProblemRequest):
+    """
+    Stream the single-agent solve as server-sent events:
+    `step` for each reasoning step, `delta` for model tokens, then `result`
+    """
+    single_api_key = get_api_key("single")
+    events = stream_with_single_agent(request.problem, single_api_key)
+    return StreamingResponse(sse_stream(events), media_type="text/event-stream")
+
+@app.post("/api/solve/multi/stream")
+async def solve_multi_agent_stream(request: ProblemRequest):
+    """
+    Stream the multi-agent debate as server-sent events:
+    `step` for each reasoning step, `delta` for model tokens, then `result`
+    """
+    multi_api_key = get_api_key("multi")
+    events = stream_with_multi_agent(request.problem, multi_api_key,
+                                     request.latency_budget_ms, request.token_budget)
+    return StreamingResponse(sse_stream(events), media_type="text/event-stream")
+
+async def timed_solve(solve, problem: str, api_key: Optional[str]):
+    """Run one solve path, turning failures into an error AgentResponse, and time it"""
+    start = time.perf_counter()
+    try:
+        result = await solve(problem, api_key)
+    except Exception as e:
+        result = AgentResponse(
+            success=False,
+            final_answer="Error occurred",
+            reasoning_steps=[],
+            total_steps=0,
+            error=str(e)
+        )
+    return result, (time.perf_counter() - start) * 1000
+
+@app.post("/api/solve/compare", response_model=CompareResponse)
+async def solve_compare(request: ProblemRequest, response_format: ResponseFormat = Query("full", alias="format")):
+    """
+    Solve a problem with the single agent and the multi-agent debate in parallel
+    Total latency is bounded by the slower of the two paths
+    """
+    single_api_key = get_api_key("single")
+    multi_api_key = get_api_key("multi")
+
+    start = time.perf_counter()
+    (single, single_ms), (multi, multi_ms) = await asyncio.gather(
+        timed_solve(solve_with_single_agent, request.problem, single_api_key),
+        timed_solve(solve_with_multi_agent, request.problem, multi_api_key)
+    )
+    return encode(CompareResponse(
+        single=single,
+        multi=multi,
+        single_time_ms=single_ms,
+        multi_time_ms=multi_ms,
+        total_time_ms=(time.perf_counter() - start) * 1000
+    ), response_format)
+
+@app.post("/api/solve/compare/stream")
+async def solve_compare_stream(request: ProblemRequest):
+    """
+    Solve with both systems in parallel and stream each result as it finishes:
+    `single` and `multi` events carry {"result": AgentResponse, "time_ms": ...},
+    then `done` carries the total time
+    """
+    single_api_key = get_api_key("single")
+    multi_api_key = get_api_key("multi")
+
+    async def labelled(label, solve, api_key):
+        result, time_ms = await timed_solve(solve, request.problem, api_key)
+        return label, {"result": result.model_dump(), "time_ms": time_ms}
+
+    async def events():
+        start = time.perf_counter()
+        tasks = [
+            asyncio.ensure_future(labelled("single", solve_with_single_agent, single_api_key)),
+            asyncio.ensure_future(labelled("multi", solve_with_multi_agent, multi_api_key))
+        ]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+            yield "done", {"total_time_ms": (time.perf_counter() - start) * 1000}
+        finally:
+            # The client disconnected mid-solve: stop the agent still running instead of paying for it
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(sse_stream(events()), media_type="text/event-stream")
+
+@app.post("/api/solve/batch")
+async def solve_batch(request: BatchRequest):
+    """
+    Solve a list of problems with bounded concurrency, streaming one JSON line
+    per problem as it finishes. Pass the ids of finished problems in skip_ids
+    to resume an interrupted run.
+    """
+    if request.mode == "single":
+        api_key = get_api_key("single")
+        solve = lambda item: solve_with_single_agent(item.problem, api_key)
+    else:
+        api_key = get_api_key("multi")
+        solve = lambda item: solve_with_multi_agent(item.problem, api_key, item.latency_budget_ms,
+                                                    item.token_budget)
+
+    # Each problem holds its own admission slot, so a batch stays within the in-flight caps
+    admission = get_admission_controller()
+    admit = (lambda: admission.hold(request.mode)) if admission.settings.enabled else None
+
+    async def lines():
+        async for record in run_batch(request.problems, solve, request.concurrency, request.skip_ids, admit):
+            yield json.dumps(record) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job(request: JobRequest):
+    """
+    Queue a solve and return its job id at once. Poll GET /api/jobs/{id} or
+    subscribe to GET /api/jobs/{id}/events for the result. A problem identical
+    to one still queued or running joins that job instead of starting another.
+    """
+    if request.mode == "single":
+        get_api_key("single")
+    else:
+        get_api_key("multi")
+
+    try:
+        job, deduplicated = await get_job_queue().submit(request)
+    except JobQueueFull:
+        raise HTTPException(status_code=503, detail="Job queue is full", headers={"Retry-After": "5"})
+    return {
+        "id": job.id,
+        "status": job.status,
+        "deduplicated": deduplicated,
+        "poll": f"/api/jobs/{job.id}",
+        "events": f"/api/jobs/{job.id}/events"
+    }
+
+@app.get("/api/jobs")
+async def get_job_stats():
+    """Jobs by status and how many submissions were deduplicated"""
+    return await get_job_queue().stats()
+
+@app.get("/api/jobs/{job_id}", response_model=Job)
+async def get_job(job_id: str, wait: float = Query(0, ge=0, le=60)):
+    """
+    Get a job and, once it has finished, its result. Pass ?wait=seconds to
+    long-poll: the response comes as soon as the job finishes or the time is up.
+    """
+    queue = get_job_queue()
+    job = await queue.wait_finished(job_id, wait) if wait else await queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return Response(job.model_dump_json(), media_type="application/json")
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """
+    Subscribe to a job as server-sent events: `status` on every change, then
+    `result` with the finished job
+    """
+    queue = get_job_queue()
+    job = await queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        current = job
+        status = None
+        while current is not None:
+            if current.status != status:
+                status = current.status
+                yield f"event: status\ndata: {json.dumps({'id': job_id, 'status': status})}\n\n"
+            if status in ("done", "failed"):
+                yield f"event: result\ndata: {current.model_dump_json()}\n\n"
+                return
+            current = await queue.backend.wait(job_id, 15)
+            if current is not None and current.status == status:
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """Response cache, request coalescing and LLM memo counters"""
+    cache = get_response_cache()
+    flights = get_single_flight()
+    memo = get_llm_memo()
+    return {
+        "response_cache": {"enabled": True, **cache.stats()} if cache else {"enabled": False},
+        "single_flight": {"enabled": True, **flights.stats()} if flights else {"enabled": False},
+        "llm_memo": {"enabled": True, **memo.stats()} if memo else {"enabled": False}
+    }
+
+@app.get("/api/admission/status")
+async def get_admission_status():
+    """In-flight solves, queue depth, limits and rejection counts"""
+    return get_admission_controller().status()
+
+@app.get("/api/batching/stats")
+async def get_batching_stats():
+    """Batch sizes, queue depth and recent throughput of each model micro-batcher"""
+    return {"batchers": [batcher.stats() for batcher in get_batchers()]}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """LLM call counts, token usage, cost and latency histograms in Prometheus text format"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/api/sample-problems")
 async def get_sample_problems():
     """Get sample problems that demonstrate the difference"""
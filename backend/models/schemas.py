@@ -1,6 +1,6 @@
 #pydentic models
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional
 
 class ReasoningStep(BaseModel):
     """A single step in the reasoning process"""
@@ -8,6 +8,32 @@ class ReasoningStep(BaseModel):
     content: str
     step_number: int
     timestamp: Optional[str] = None
+    duration_ms: Optional[float] = None  # Wall time since the previous step
+
+class LLMCall(BaseModel):
+    """One provider call made during a solve"""
+    agent: str
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    latency_ms: float
+    cost_usd: float
+
+class SolveStats(BaseModel):
+    """LLM work done for a solve, and what adaptive scheduling avoided"""
+    llm_calls: int = 0
+    calls_saved: int = 0
+    tokens_used: int = 0
+    tokens_saved: int = 0
+    prompt_tokens: int = 0
+    prompt_tokens_saved: int = 0  # Prompt tokens the compact prompt layout saved over the full one
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+    wall_time_ms: float = 0.0
+    rounds: int = 0
+    stop_reason: Optional[str] = None
+    votes: Dict[str, int] = {}  # Answers the parallel proposers gave, with how many gave each
+    calls: List[LLMCall] = []
 
 class AgentResponse(BaseModel):
     """Response from an agent system"""
@@ -16,8 +42,51 @@ class AgentResponse(BaseModel):
     reasoning_steps: List[ReasoningStep]
     total_steps: int
     error: Optional[str] = None
+    cached: bool = False
+    coalesced: bool = False  # Shared the result of an identical solve already in flight
+    stats: Optional[SolveStats] = None
+
+class CompareResponse(BaseModel):
+    """Single-agent and multi-agent results for the same problem, solved in parallel"""
+    single: AgentResponse
+    multi: AgentResponse
+    single_time_ms: float
+    multi_time_ms: float
+    total_time_ms: float
 
 class ProblemRequest(BaseModel):
     """Request to solve a problem"""
     problem: str
-    openai_api_key: Optional[str] = None
\ No newline at end of file
+    openai_api_key: Optional[str] = None
+    latency_budget_ms: Optional[float] = None  # Stop debating once another round would exceed this
+    token_budget: Optional[int] = None         # Stop debating once another round would exceed this
+
+class BatchItem(ProblemRequest):
+    """One problem in a batch; the id defaults to a hash of the problem text"""
+    id: Optional[str] = None
+
+class BatchRequest(BaseModel):
+    """Request to solve many problems with bounded concurrency"""
+    problems: List[BatchItem]
+    mode: Literal["single", "multi"] = "multi"
+    concurrency: int = Field(default=4, ge=1, le=64)
+    skip_ids: List[str] = []  # Ids already solved in an earlier, interrupted run
+
+class JobRequest(ProblemRequest):
+    """Request to solve a problem in the background"""
+    mode: Literal["single", "multi"] = "multi"
+
+class Job(BaseModel):
+    """A background solve and, once it has finished, its result"""
+    id: str
+    status: Literal["queued", "running", "done", "failed"] = "queued"
+    mode: Literal["single", "multi"] = "multi"
+    problem: str
+    latency_budget_ms: Optional[float] = None
+    token_budget: Optional[int] = None
+    submissions: int = 1  # Identical submissions made while the job was in flight share it
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[AgentResponse] = None
+    error: Optional[str] = None
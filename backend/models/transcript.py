@@ -0,0 +1,66 @@
+"""
+Transcript - Compact in-memory record of a solve's reasoning steps
+Agents add a step for every line of model output, so steps are kept as
+slotted records with interned agent names and plain float timestamps while a
+solve runs. They become ReasoningStep models (validated in one pass together
+with the AgentResponse) or JSON only at the response boundary.
+"""
+
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+
+def _iso(at: float) -> str:
+    return datetime.fromtimestamp(at, timezone.utc).isoformat()
+
+
+class Step:
+    """One reasoning step: the agent, what it said, and when"""
+
+    __slots__ = ("agent", "content", "step_number", "at", "duration_ms")
+
+    def __init__(self, agent: str, content: str, step_number: int, at: float, duration_ms: float):
+        self.agent = agent
+        self.content = content
+        self.step_number = step_number
+        self.at = at                    # Unix time the step was added
+        self.duration_ms = duration_ms  # Wall time since the previous step
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The step in ReasoningStep's shape"""
+        return {
+            "agent": self.agent,
+            "content": self.content,
+            "step_number": self.step_number,
+            "timestamp": _iso(self.at),
+            "duration_ms": self.duration_ms
+        }
+
+
+class Transcript:
+    """Numbered steps of one solve; only kept in memory when collecting a transcript"""
+
+    __slots__ = ("steps", "collect", "count", "_last_at")
+
+    def __init__(self, collect: bool = True):
+        self.steps: List[Step] = []
+        self.collect = collect
+        self.count = 0
+        self._last_at = time.perf_counter()
+
+    def add(self, agent: str, content: str) -> Step:
+        """Number and time a new step"""
+        now = time.perf_counter()
+        self.count += 1
+        step = Step(sys.intern(agent), content, self.count, time.time(), (now - self._last_at) * 1000)
+        self._last_at = now
+        if self.collect:
+            self.steps.append(step)
+        return step
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Steps as plain dicts, ready to validate into ReasoningStep models"""
+        return [step.to_dict() for step in self.steps]
+
@@ -0,0 +1,49 @@
+"""
+Server Launcher - Run the API in several worker processes
+Starts `main:app` under uvicorn's process manager. The worker processes
+share one listening socket, so the requests and the CPU work of serving
+them are spread over the workers. With more than one worker, shared state
+(STATE_SHARED, see services/state.py) is turned on unless it has been set
+explicitly. Response cache entries, per-client rate limits and job status
+then hold across workers. Each worker keeps its own in-flight caps, request
+coalescing, connection pool and /metrics.
+
+Usage (from the backend directory):
+    python serve.py --workers 4 --port 8000
+    WEB_CONCURRENCY=4 python serve.py --host 0.0.0.0 --port $PORT
+"""
+
+import argparse
+import os
+
+import uvicorn
+from dotenv import load_dotenv
+
+from services.state import StateSettings
+
+load_dotenv()
+
+
+def worker_count(requested: int) -> int:
+    """Workers to start: the number requested, or one per CPU core for 0"""
+    return requested if requested > 0 else os.cpu_count() or 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the API in several worker processes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")),
+                        help="Worker processes (0 starts one per CPU core)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    workers = worker_count(args.workers)
+    if workers > 1:
+        # Set before the workers start, so every one of them inherits it
+        os.environ.setdefault("STATE_SHARED", "true")
+    # Read the way the workers will read it, so "yes" or "on" count too
+    shared = StateSettings().shared
+    print(f"Serving on {args.host}:{args.port} with {workers} worker process(es), "
+          f"shared state {'on' if shared else 'off'}")
+    uvicorn.run("main:app", host=args.host, port=args.port, workers=workers, log_level=args.log_level)
@@ -0,0 +1,284 @@
+"""
+Admission Control - Bound the solves in flight and rate limit each client
+Every solve request takes a slot under a global in-flight cap and a cap for
+its endpoint (a multi-agent debate costs several gpt-4o calls, so it gets a
+smaller share than the single agent). When no slot is free the request waits
+in a bounded FIFO queue for at most the queue-time SLO. A full queue or an
+expired wait is answered right away with 503 and Retry-After, rather than
+piling up more provider calls. Before that, each client has a token
+bucket; requests beyond it get 429. A client is a known API key
+(ADMISSION_API_KEYS), or else an IP address. Other key headers are ignored,
+since a client could send a new one with every request to get a fresh
+bucket. Behind a reverse proxy every request comes from the proxy's
+address, so the client address is read from X-Forwarded-For instead
+(ADMISSION_FORWARDED_HOPS). With
+shared state on (services/state.py) the buckets live in the shared store, so
+a client's limit holds across worker processes. The in-flight caps and the
+queue stay per process.
+
+AdmissionMiddleware applies this to POST requests on the solve and job
+routes and holds the slot until the response has been sent, so streaming
+solves count for their whole duration. A batch is admitted once, and each
+of its problems then holds a slot of its own (hold()), so a batch cannot
+run more solves than the caps allow.
+"""
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Collection, Deque, Dict, List, Optional, Tuple
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from starlette.responses import JSONResponse
+
+from services.metrics import ADMISSION_REJECTED, ADMISSION_WAIT
+from services.ratelimit import TokenBucket
+from services.state import get_state_store, run_blocking
+
+
+class AdmissionSettings(BaseSettings):
+    """Admission control settings, overridable with ADMISSION_* environment variables"""
+    model_config = SettingsConfigDict(env_prefix="ADMISSION_")
+
+    enabled: bool = True
+    max_in_flight: int = 64          # Solve requests running at once across all endpoints
+    # Per-endpoint caps; endpoints not listed are only bound by max_in_flight
+    endpoint_limits: Dict[str, int] = {"single": 32, "multi": 16, "compare": 8, "batch": 2}
+    max_queue: int = 128             # Requests allowed to wait for a slot
+    queue_timeout: float = 5.0       # Queue-time SLO: seconds to wait for a slot before a 503
+    rate_limit: float = 2.0          # Requests per second per client (0 disables)
+    burst: float = 20.0              # Requests a client may make at once
+    max_clients: int = 10000         # Client buckets kept (least recently seen are dropped)
+    api_keys: List[str] = []         # Keys that get a bucket of their own; any other key is ignored
+    forwarded_hops: int = 0          # Reverse proxies in front that append to X-Forwarded-For (1 on Render)
+
+
+# Route prefix -> endpoint class; streaming variants share their endpoint's cap
+ROUTES = (
+    ("/api/solve/single", "single"),
+    ("/api/solve/multi", "multi"),
+    ("/api/solve/compare", "compare"),
+    ("/api/solve/batch", "batch"),
+    ("/api/jobs", "jobs"),  # Only the submission; polling is not admitted
+)
+
+
+class AdmissionRejected(Exception):
+    """A request that was not admitted"""
+
+    def __init__(self, status_code: int, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """In-flight caps, the wait queue and per-client token buckets"""
+
+    def __init__(self, settings: Optional[AdmissionSettings] = None):
+        self.settings = settings or AdmissionSettings()
+        self.in_flight = 0
+        self.by_endpoint: Dict[str, int] = {}
+        self.waiters: Deque[Tuple[str, asyncio.Future, float]] = deque()
+        self.buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.store = get_state_store()
+        self.known_keys = {_hash_key(key) for key in self.settings.api_keys}
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"rate_limited": 0, "queue_full": 0, "queue_timeout": 0}
+
+    def _fits(self, endpoint: str) -> bool:
+        limit = self.settings.endpoint_limits.get(endpoint)
+        return (self.in_flight < self.settings.max_in_flight
+                and (limit is None or self.by_endpoint.get(endpoint, 0) < limit))
+
+    def _take(self, endpoint: str):
+        self.in_flight += 1
+        self.by_endpoint[endpoint] = self.by_endpoint.get(endpoint, 0) + 1
+        self.admitted += 1
+
+    def _reject(self, endpoint: str, status_code: int, reason: str, retry_after: float) -> AdmissionRejected:
+        self.rejected[reason] += 1
+        ADMISSION_REJECTED.inc(endpoint, reason)
+        return AdmissionRejected(status_code, reason, retry_after)
+
+    def check_rate(self, client: str, endpoint: str):
+        """Take a token from the client's bucket, or raise a 429"""
+        if self.settings.rate_limit <= 0:
+            return
+        if self.store is not None:
+            wait = self.store.take_token(f"rate:{client}", self.settings.rate_limit, self.settings.burst)
+            if wait > 0:
+                raise self._reject(endpoint, 429, "rate_limited", wait)
+            return
+        bucket = self.buckets.get(client)
+        if bucket is None:
+            bucket = self.buckets[client] = TokenBucket(self.settings.rate_limit, self.settings.burst)
+            if len(self.buckets) > self.settings.max_clients:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(client)
+        if not bucket.try_acquire():
+            raise self._reject(endpoint, 429, "rate_limited", bucket.wait_time())
+
+    async def acquire(self, endpoint: str):
+        """Take an in-flight slot, waiting up to the queue timeout, or raise a 503"""
+        # Waiters left in the queue are blocked by a cap, so a request that fits can go first
+        if self._fits(endpoint):
+            self._take(endpoint)
+            ADMISSION_WAIT.observe(endpoint, value=0.0)
+            return
+        if len(self.waiters) >= self.settings.max_queue:
+            raise self._reject(endpoint, 503, "queue_full", self.settings.queue_timeout)
+
+        start = time.monotonic()
+        waiter = (endpoint, asyncio.get_running_loop().create_future(), start)
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter[1]), self.settings.queue_timeout)
+        except asyncio.TimeoutError:
+            if not waiter[1].done():  # Otherwise the slot was granted just as the wait expired
+                self.waiters.remove(waiter)
+                raise self._reject(endpoint, 503, "queue_timeout", self.settings.queue_timeout)
+        except asyncio.CancelledError:
+            if waiter[1].done():
+                self.release(endpoint)
+            else:
+                self.waiters.remove(waiter)
+            raise
+        ADMISSION_WAIT.observe(endpoint, value=time.monotonic() - start)
+
+    def release(self, endpoint: str):
+        """Free a slot and hand it to the first waiters that fit"""
+        self.in_flight -= 1
+        self.by_endpoint[endpoint] -= 1
+        for waiter in list(self.waiters):
+            waiting_for, future, _ = waiter
+            if self._fits(waiting_for):
+                self.waiters.remove(waiter)
+                self._take(waiting_for)
+                future.set_result(None)
+            elif self.in_flight >= self.settings.max_in_flight:
+                break
+
+    @asynccontextmanager
+    async def hold(self, endpoint: str):
+        """Hold an in-flight slot, with no rate check (also for work an admitted request fans out)"""
+        await self.acquire(endpoint)
+        try:
+            yield
+        finally:
+            self.release(endpoint)
+
+    @asynccontextmanager
+    async def slot(self, endpoint: str, client: str):
+        """Admit one request for its whole duration"""
+        if self.store is not None:
+            # A shared bucket may wait for the store's write lock
+            await run_blocking(self.check_rate, client, endpoint)
+        else:
+            self.check_rate(client, endpoint)
+        async with self.hold(endpoint):
+            yield
+
+    def status(self) -> dict:
+        """Current load, limits and rejection counts"""
+        now = time.monotonic()
+        endpoints = {}
+        for _, endpoint in ROUTES:
+            endpoints[endpoint] = {
+                "in_flight": self.by_endpoint.get(endpoint, 0),
+                "limit": self.settings.endpoint_limits.get(endpoint),
+                "queued": sum(1 for waiting_for, _, _ in self.waiters if waiting_for == endpoint)
+            }
+        return {
+            "enabled": self.settings.enabled,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.settings.max_in_flight,
+            "queued": len(self.waiters),
+            "max_queue": self.settings.max_queue,
+            "oldest_wait_s": now - self.waiters[0][2] if self.waiters else 0.0,
+            "queue_timeout_s": self.settings.queue_timeout,
+            "endpoints": endpoints,
+            "rate_limit": {
+                "per_second": self.settings.rate_limit,
+                "burst": self.settings.burst,
+                "shared": self.store is not None,  # Buckets in the shared store are not counted below
+                "clients": len(self.buckets),
+                "clients_limited": sum(1 for bucket in self.buckets.values() if bucket.wait_time() > 0)
+            },
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected)
+        }
+
+
+def _hash_key(key: str) -> str:
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+def client_id(headers: Dict[str, str], client: Optional[Tuple[str, int]],
+              known_keys: Collection[str] = (), forwarded_hops: int = 0) -> str:
+    """
+    Identify the caller by a known API key (known_keys holds their hashes) or
+    else by IP address. Behind forwarded_hops proxies the address is the one
+    the outermost proxy saw: each proxy appends to X-Forwarded-For, so only
+    the last forwarded_hops entries are trusted and anything before them is
+    whatever the client sent.
+    """
+    key = headers.get("x-api-key") or headers.get("authorization", "").removeprefix("Bearer ").strip()
+    if key and _hash_key(key) in known_keys:
+        return "key:" + _hash_key(key)
+    if forwarded_hops > 0:
+        forwarded = [host.strip() for host in headers.get("x-forwarded-for", "").split(",") if host.strip()]
+        if forwarded:
+            return "ip:" + forwarded[-min(forwarded_hops, len(forwarded))]
+    return "ip:" + (client[0] if client else "unknown")
+
+
+def endpoint_for(path: str) -> Optional[str]:
+    """The endpoint class a request path is admitted under, if any"""
+    for prefix, endpoint in ROUTES:
+        if path == prefix or path.startswith(prefix + "/"):
+            return endpoint
+    return None
+
+
+class AdmissionMiddleware:
+    """ASGI middleware that admits solve requests through an AdmissionController"""
+
+    def __init__(self, app, controller: Optional["AdmissionController"] = None):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        controller = self.controller or get_admission_controller()
+        endpoint = endpoint_for(scope["path"]) if scope["type"] == "http" else None
+        if endpoint is None or scope["method"] != "POST" or not controller.settings.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+        client = client_id(headers, scope.get("client"), controller.known_keys, controller.settings.forwarded_hops)
+        try:
+            async with controller.slot(endpoint, client):
+                await self.app(scope, receive, send)
+        except AdmissionRejected as rejected:
+            response = JSONResponse(
+                {"detail": f"Request not admitted: {rejected.reason}", "reason": rejected.reason},
+                status_code=rejected.status_code,
+                headers={"Retry-After": str(max(1, round(rejected.retry_after)))}
+            )
+            await response(scope, receive, send)
+
+
+_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Get the application admission controller, creating it on first use"""
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController()
+    return _controller
@@ -0,0 +1,75 @@
+"""
+Batch Solving - Run many problems through one pipeline with bounded concurrency
+Results are yielded as soon as each problem finishes (not in input order), so
+callers can stream them out as JSONL and resume an interrupted run by skipping
+the ids that already have a result.
+"""
+
+import asyncio
+import hashlib
+import time
+from contextlib import nullcontext
+from typing import AsyncContextManager, AsyncIterator, Awaitable, Callable, Iterable, List, Optional, Set
+
+from models.schemas import AgentResponse, BatchItem
+
+
+def batch_item_id(item: BatchItem) -> str:
+    """Stable id for a batch item: its own id, or a hash of the problem text"""
+    if item.id:
+        return item.id
+    return hashlib.sha256(item.problem.strip().encode()).hexdigest()[:16]
+
+
+async def run_batch(items: Iterable[BatchItem],
+                    solve: Callable[[BatchItem], Awaitable[AgentResponse]],
+                    concurrency: int = 4,
+                    skip_ids: Iterable[str] = (),
+                    admit: Optional[Callable[[], AsyncContextManager]] = None) -> AsyncIterator[dict]:
+    """
+    Solve every item not in skip_ids with at most `concurrency` solves in
+    flight, yielding {"id", "problem", "result", "time_ms"} records as they finish.
+    `solve` gets the whole item, so per-problem settings such as budgets reach the agent.
+    Each solve runs inside `admit()` (e.g. an admission slot); an item it
+    rejects is recorded as failed.
+    """
+    skip: Set[str] = set(skip_ids)
+    slots = asyncio.Semaphore(concurrency)
+    admit = admit or nullcontext
+
+    async def solve_one(item_id: str, item: BatchItem) -> dict:
+        async with slots:
+            start = time.perf_counter()
+            try:
+                async with admit():
+                    result = await solve(item)
+            except Exception as e:
+                result = AgentResponse(
+                    success=False,
+                    final_answer="Error occurred",
+                    reasoning_steps=[],
+                    total_steps=0,
+                    error=str(e)
+                )
+            return {
+                "id": item_id,
+                "problem": item.problem,
+                "result": result.model_dump(),
+                "time_ms": (time.perf_counter() - start) * 1000
+            }
+
+    pending: List[asyncio.Task] = []
+    for item in items:
+        item_id = batch_item_id(item)
+        if item_id in skip:
+            continue
+        skip.add(item_id)  # Duplicate problems in the same batch are solved once
+        pending.append(asyncio.create_task(solve_one(item_id, item)))
+
+    try:
+        for finished in asyncio.as_completed(pending):
+            yield await finished
+    finally:
+        # Client went away or the run was interrupted: stop the remaining solves
+        for task in pending:
+            task.cancel()
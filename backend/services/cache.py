@@ -0,0 +1,336 @@
+"""
+Response Cache - Reuse finished solves for repeated problems
+Keys are the normalized problem text plus the model configuration. Entries
+expire after a TTL and are evicted least-recently-used once the store is
+full. The in-process backend is the default; the SQLite backend is shared by
+every worker process pointed at the same file. With shared state on
+(services/state.py), the in-process backend is replaced by the shared store.
+A hit is marked cached and reports no LLM calls, tokens or cost of its own.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from models.schemas import AgentResponse
+from services.metrics import reused_stats
+from services.state import StateStore, get_state_store, run_blocking
+
+# Words that rewording tends to add or drop without changing the problem
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "at", "for", "by", "with",
+    "is", "are", "was", "were", "be", "it", "its", "this", "that", "what", "how",
+    "many", "much", "does", "do", "if", "then", "please", "find", "calculate", "compute",
+    "solve", "determine", "total", "amount"
+}
+
+_WHITESPACE = re.compile(r"\s+")
+_NUMBER = re.compile(r"\d[\d,]*(?:\.\d+)?")
+_WORD = re.compile(r"[a-z]+")
+
+
+def normalize_problem(problem: str) -> str:
+    """Normalize unicode, case and whitespace so trivially different inputs share a key"""
+    text = unicodedata.normalize("NFKC", problem).lower()
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def _canonical_number(raw: str) -> str:
+    value = float(raw.replace(",", ""))
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def fingerprint_problem(problem: str) -> str:
+    """
+    Fingerprint for near-duplicate matching: the numbers in the order they
+    appear (with formatting such as "1,000" or "97.0" normalized), each bound
+    to the content word after it, plus the set of content words. Light
+    rewording keeps the fingerprint. Changing a number, or moving it to
+    another quantity (60 mph out and 80 mph back vs the reverse), does not.
+    """
+    text = normalize_problem(problem)
+    quantities = []
+    for match in _NUMBER.finditer(text):
+        following = (word for word in _WORD.findall(text[match.end():match.end() + 60]) if word not in STOPWORDS)
+        quantities.append(f"{_canonical_number(match.group())}:{next(following, '')}")
+    words = sorted(set(_WORD.findall(_NUMBER.sub(" ", text))) - STOPWORDS)
+    return hashlib.sha256(f"{' '.join(quantities)}|{' '.join(words)}".encode()).hexdigest()
+
+
+class CacheBackend:
+    """Storage interface for cached responses (values are JSON strings)"""
+
+    evictions = 0
+    blocking = False  # Operations wait on a database or the network, so async callers run them in a thread
+
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: str, ttl: float):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process LRU store bounded by entry count and total value size"""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: float):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._bytes += len(value)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: str):
+        value, _ = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """Store shared by every process using the same database file"""
+
+    blocking = True
+
+    def __init__(self, path: str, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._local = threading.local()
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    def get(self, key: str) -> Optional[str]:
+        db = self._connect()
+        now = time.time()
+        row = db.execute(
+            "SELECT value FROM response_cache WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        db.execute("UPDATE response_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def set(self, key: str, value: str, ttl: float):
+        db = self._connect()
+        now = time.time()
+        db.execute(
+            "INSERT OR REPLACE INTO response_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, value, now + ttl, now)
+        )
+        db.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,))
+        overflow = len(self) - self.max_entries
+        if overflow > 0:
+            db.execute(
+                "DELETE FROM response_cache WHERE key IN "
+                "(SELECT key FROM response_cache ORDER BY accessed_at LIMIT ?)", (overflow,)
+            )
+            self.evictions += overflow
+
+    def clear(self):
+        self._connect().execute("DELETE FROM response_cache")
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+
+class StoreCacheBackend(CacheBackend):
+    """Entries kept in the shared state store under a key prefix, for every worker process"""
+
+    blocking = True
+
+    def __init__(self, store: StateStore, prefix: str, max_entries: int = 10000):
+        self.store = store
+        self.prefix = prefix
+        self.max_entries = max_entries
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        return self.store.get(self.prefix + key)
+
+    def set(self, key: str, value: str, ttl: float):
+        self.store.set(self.prefix + key, value, ttl)
+        self.evictions += self.store.trim(self.prefix, self.max_entries)
+
+    def clear(self):
+        self.store.clear(self.prefix)
+
+    def __len__(self) -> int:
+        return self.store.count(self.prefix)
+
+
+def memory_or_shared(prefix: str, max_entries: int, max_bytes: int = 64 * 1024 * 1024) -> CacheBackend:
+    """The in-process backend, or the shared store when worker processes share state"""
+    store = get_state_store()
+    if store is not None:
+        return StoreCacheBackend(store, prefix, max_entries)
+    return MemoryCacheBackend(max_entries, max_bytes)
+
+
+class CacheSettings(BaseSettings):
+    """Response cache settings, overridable with RESPONSE_CACHE_* environment variables"""
+    model_config = SettingsConfigDict(env_prefix="RESPONSE_CACHE_")
+
+    enabled: bool = True
+    backend: str = "memory"         # "memory" (the shared store with shared state on) or "sqlite"
+    path: str = "response_cache.db"  # SQLite file for the shared backend
+    ttl: float = 3600.0
+    max_entries: int = 1024
+    max_bytes: int = 64 * 1024 * 1024
+    near_duplicates: bool = False   # Also match lightly reworded problems
+
+
+class ResponseCache:
+    """Cache of successful AgentResponses keyed by problem and model configuration"""
+
+    def __init__(self, backend: CacheBackend, ttl: float = 3600.0, near_duplicates: bool = False):
+        self.backend = backend
+        self.ttl = ttl
+        self.near_duplicates = near_duplicates
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    @staticmethod
+    def _config(model: str, temperature: float, rounds: int) -> str:
+        return json.dumps([model, temperature, rounds])
+
+    def key_for(self, problem: str, model: str, temperature: float, rounds: int) -> str:
+        raw = f"{normalize_problem(problem)}|{self._config(model, temperature, rounds)}"
+        return "exact:" + hashlib.sha256(raw.encode()).hexdigest()
+
+    def _near_key_for(self, problem: str, model: str, temperature: float, rounds: int) -> str:
+        raw = f"{fingerprint_problem(problem)}|{self._config(model, temperature, rounds)}"
+        return "near:" + hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, problem: str, model: str, temperature: float, rounds: int) -> Optional[AgentResponse]:
+        """Look up a cached response, falling back to near-duplicate matching if enabled"""
+        value = self.backend.get(self.key_for(problem, model, temperature, rounds))
+        if value is not None:
+            self.hits += 1
+        elif self.near_duplicates:
+            exact_key = self.backend.get(self._near_key_for(problem, model, temperature, rounds))
+            value = self.backend.get(exact_key) if exact_key else None
+            if value is not None:
+                self.near_hits += 1
+
+        if value is None:
+            self.misses += 1
+            return None
+
+        response = AgentResponse.model_validate_json(value)
+        # The original solve already paid for the calls; this response made none
+        response.cached = True
+        response.stats = reused_stats(response.stats)
+        return response
+
+    def set(self, problem: str, model: str, temperature: float, rounds: int, response: AgentResponse):
+        """Store a successful response"""
+        if not response.success:
+            return
+        key = self.key_for(problem, model, temperature, rounds)
+        self.backend.set(key, response.model_dump_json(), self.ttl)
+        if self.near_duplicates:
+            self.backend.set(self._near_key_for(problem, model, temperature, rounds), key, self.ttl)
+        self.stores += 1
+
+    async def get_async(self, problem: str, model: str, temperature: float, rounds: int) -> Optional[AgentResponse]:
+        """Like get, but off the event loop when the backend blocks"""
+        if self.backend.blocking:
+            return await run_blocking(self.get, problem, model, temperature, rounds)
+        return self.get(problem, model, temperature, rounds)
+
+    async def set_async(self, problem: str, model: str, temperature: float, rounds: int, response: AgentResponse):
+        """Like set, but off the event loop when the backend blocks"""
+        if self.backend.blocking:
+            await run_blocking(self.set, problem, model, temperature, rounds, response)
+        else:
+            self.set(problem, model, temperature, rounds, response)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.near_hits + self.misses
+        return {
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.backend.evictions,
+            "entries": len(self.backend),
+            "hit_rate": (self.hits + self.near_hits) / lookups if lookups else 0.0
+        }
+
+
+_cache: Optional[ResponseCache] = None
+_cache_configured = False
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Get the application response cache, or None when caching is disabled"""
+    global _cache, _cache_configured
+    if not _cache_configured:
+        _cache_configured = True
+        settings = CacheSettings()
+        if not settings.enabled:
+            return None
+        if settings.backend == "sqlite":
+            backend = SQLiteCacheBackend(settings.path, settings.max_entries)
+        else:
+            backend = memory_or_shared("cache:", settings.max_entries, settings.max_bytes)
+        _cache = ResponseCache(backend, settings.ttl, settings.near_duplicates)
+    return _cache
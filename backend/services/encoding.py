@@ -0,0 +1,71 @@
+"""
+Response Encoding - Serialize solve results once, in full or compact form
+Solve endpoints return pre-encoded responses instead of letting FastAPI
+dump, re-validate and re-serialize the result through response_model.
+The full format is the AgentResponse JSON as before, written by
+pydantic-core. The compact format (?format=compact) replaces reasoning_steps
+with step_groups: runs of consecutive steps by the same agent, with the
+agent name and start time sent once per run. orjson encodes the compact
+format when it is installed.
+"""
+
+import json
+from typing import Any, Dict, List, Literal, Sequence
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from models.schemas import AgentResponse, CompareResponse, ReasoningStep
+
+try:
+    import orjson
+except ImportError:  # Optional: pip install orjson
+    orjson = None
+
+ResponseFormat = Literal["full", "compact"]
+
+
+def dumps(data: Any) -> bytes:
+    """Encode plain data as JSON bytes, with orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def group_steps(steps: Sequence[ReasoningStep]) -> List[Dict[str, Any]]:
+    """Group consecutive steps by the same agent"""
+    groups: List[Dict[str, Any]] = []
+    current = None
+    for step in steps:
+        if current is None or step.agent != current["agent"]:
+            current = {
+                "agent": step.agent,
+                "first_step": step.step_number,
+                "started_at": step.timestamp,
+                "contents": [],
+                "duration_ms": []
+            }
+            groups.append(current)
+        current["contents"].append(step.content)
+        current["duration_ms"].append(step.duration_ms)
+    return groups
+
+
+def compact(result: AgentResponse) -> Dict[str, Any]:
+    """AgentResponse fields with the reasoning steps grouped by agent"""
+    data = result.model_dump(exclude={"reasoning_steps"})
+    data["step_groups"] = group_steps(result.reasoning_steps)
+    return data
+
+
+def encode(result: BaseModel, response_format: ResponseFormat = "full") -> Response:
+    """Encode an AgentResponse or CompareResponse as the JSON response body"""
+    if response_format == "full":
+        return Response(result.model_dump_json(), media_type="application/json")
+
+    if isinstance(result, CompareResponse):
+        data = {"single": compact(result.single), "multi": compact(result.multi)}
+        data.update(result.model_dump(exclude={"single", "multi"}))
+    else:
+        data = compact(result)
+    return Response(dumps(data), media_type="application/json")
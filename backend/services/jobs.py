@@ -0,0 +1,477 @@
+"""
+Job Queue - Background solves that clients poll or subscribe to
+POST /api/jobs enqueues a solve and returns its id at once. Workers claim
+jobs from the queue, run them and store the result for clients to fetch, so
+long debates no longer hold an HTTP request open. Identical problems (same
+normalized text, mode and budgets) submitted while a job for them is still
+queued or running share that job, so N concurrent submissions cost one
+solve. The in-process backend is the default; the SQLite backend is a local
+stand-in for a network queue, shared by every API and worker process pointed
+at the same file so they can be scaled separately. When worker processes
+share state (services/state.py), jobs are kept in the state store instead,
+so with Redis every host sees every job. Backend operations that touch a
+database run in a worker thread, off the event loop.
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from models.schemas import AgentResponse, Job, JobRequest
+from services.cache import normalize_problem
+from services.metrics import JOB_QUEUE_WAIT, JOBS
+from services.state import StateStore, get_state_store, run_blocking
+
+FINISHED = ("done", "failed")
+
+
+class JobSettings(BaseSettings):
+    """Job queue settings, overridable with JOBS_* environment variables"""
+    model_config = SettingsConfigDict(env_prefix="JOBS_")
+
+    backend: str = "memory"       # "memory" or "sqlite" (the state store with shared state on)
+    path: str = "jobs.db"         # SQLite file for the shared backend
+    workers: int = 4              # Worker tasks started by each API process (0 with separate workers)
+    max_pending: int = 1000       # Queued jobs before submissions get 503
+    result_ttl: float = 3600.0    # Seconds finished jobs are kept for polling
+    poll_interval: float = 0.2    # Seconds between checks of a shared queue
+    lease: float = 600.0          # Seconds before a running job is assumed lost (SQLite re-queues it)
+
+
+class JobQueueFull(Exception):
+    """The queue already holds max_pending jobs"""
+
+
+def job_key(request: Union[JobRequest, Job]) -> str:
+    """Jobs with the same key would produce the same solve"""
+    raw = json.dumps([request.mode, normalize_problem(request.problem),
+                      request.latency_budget_ms, request.token_budget])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class JobBackend:
+    """Storage and queue interface for jobs"""
+
+    async def submit(self, job: Job, key: str, max_pending: int) -> Tuple[Job, bool]:
+        """Store and enqueue a job, or return the in-flight job with the same key; True if stored"""
+        raise NotImplementedError
+
+    async def claim(self) -> Job:
+        """Wait for the next queued job and mark it running"""
+        raise NotImplementedError
+
+    async def finish(self, job: Job):
+        """Store a finished job"""
+        raise NotImplementedError
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        raise NotImplementedError
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Job]:
+        """Wait until the job changes state (or the timeout passes), then return it"""
+        job = await self.get(job_id)
+        deadline = time.monotonic() + timeout
+        while job is not None and time.monotonic() < deadline:
+            await asyncio.sleep(min(self.poll_interval, max(0.0, deadline - time.monotonic())))
+            current = await self.get(job_id)
+            if current is None or current.status != job.status:
+                return current
+        return job
+
+    async def counts(self) -> Dict[str, int]:
+        """Number of jobs in each status"""
+        raise NotImplementedError
+
+
+class MemoryJobBackend(JobBackend):
+    """In-process queue, served by the API process's own workers"""
+
+    def __init__(self, result_ttl: float = 3600.0):
+        self.result_ttl = result_ttl
+        self._jobs: Dict[str, Job] = {}
+        self._in_flight: Dict[str, str] = {}  # key -> job id
+        self._keys: Dict[str, str] = {}       # job id -> key
+        self._queue: Deque[str] = deque()
+        self._ready = asyncio.Event()
+        self._changed: Dict[str, asyncio.Event] = {}
+        self._finished: Deque[Tuple[float, str]] = deque()
+
+    async def submit(self, job: Job, key: str, max_pending: int) -> Tuple[Job, bool]:
+        self._prune()
+        existing = self._in_flight.get(key)
+        if existing is not None:
+            job = self._jobs[existing]
+            job.submissions += 1
+            return job, False
+        if len(self._queue) >= max_pending:
+            raise JobQueueFull()
+
+        self._jobs[job.id] = job
+        self._in_flight[key] = job.id
+        self._keys[job.id] = key
+        self._queue.append(job.id)
+        self._ready.set()
+        return job, True
+
+    async def claim(self) -> Job:
+        while not self._queue:
+            self._ready.clear()
+            await self._ready.wait()
+        job = self._jobs[self._queue.popleft()]
+        job.status = "running"
+        job.started_at = time.time()
+        self._notify(job.id)
+        return job
+
+    async def finish(self, job: Job):
+        self._jobs[job.id] = job
+        self._in_flight.pop(self._keys.pop(job.id, None), None)
+        self._finished.append((time.monotonic(), job.id))
+        self._notify(job.id)
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Job]:
+        if job_id not in self._jobs:
+            return None
+        changed = self._changed.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self._jobs.get(job_id)
+
+    async def counts(self) -> Dict[str, int]:
+        counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        for job in self._jobs.values():
+            counts[job.status] += 1
+        return counts
+
+    def _notify(self, job_id: str):
+        changed = self._changed.pop(job_id, None)
+        if changed is not None:
+            changed.set()
+
+    def _prune(self):
+        cutoff = time.monotonic() - self.result_ttl
+        while self._finished and self._finished[0][0] < cutoff:
+            _, job_id = self._finished.popleft()
+            self._jobs.pop(job_id, None)
+
+
+class SQLiteJobBackend(JobBackend):
+    """Queue shared by every API and worker process using the same database file"""
+
+    def __init__(self, path: str, result_ttl: float = 3600.0, poll_interval: float = 0.2, lease: float = 600.0):
+        self.path = path
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self._local = threading.local()
+        db = self._connect()
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, key TEXT NOT NULL, status TEXT NOT NULL, "
+            "data TEXT NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        # At most one in-flight job per key
+        db.execute("CREATE UNIQUE INDEX IF NOT EXISTS jobs_in_flight ON jobs (key) "
+                   "WHERE status IN ('queued', 'running')")
+
+    def _connect(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    async def submit(self, job: Job, key: str, max_pending: int) -> Tuple[Job, bool]:
+        return await run_blocking(self._submit, job, key, max_pending)
+
+    def _submit(self, job: Job, key: str, max_pending: int) -> Tuple[Job, bool]:
+        db = self._connect()
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+                       (now - self.result_ttl,))
+            row = db.execute("SELECT data FROM jobs WHERE key = ? AND status IN ('queued', 'running')",
+                             (key,)).fetchone()
+            if row is not None:
+                existing = Job.model_validate_json(row[0])
+                existing.submissions += 1
+                db.execute("UPDATE jobs SET data = ? WHERE id = ?", (existing.model_dump_json(), existing.id))
+                db.execute("COMMIT")
+                return existing, False
+            if db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0] >= max_pending:
+                raise JobQueueFull()
+            db.execute("INSERT INTO jobs (id, key, status, data, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                       (job.id, key, job.status, job.model_dump_json(), job.created_at, now))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return job, True
+
+    async def claim(self) -> Job:
+        while True:
+            job = await run_blocking(self._claim_next)
+            if job is not None:
+                return job
+            await asyncio.sleep(self.poll_interval)
+
+    def _claim_next(self) -> Optional[Job]:
+        db = self._connect()
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            # Queued jobs first come first served; running jobs whose lease ran out were lost with their worker
+            row = db.execute(
+                "SELECT data FROM jobs WHERE status = 'queued' OR (status = 'running' AND updated_at < ?) "
+                "ORDER BY created_at LIMIT 1", (now - self.lease,)
+            ).fetchone()
+            if row is None:
+                db.execute("COMMIT")
+                return None
+            job = Job.model_validate_json(row[0])
+            job.status = "running"
+            job.started_at = now
+            db.execute("UPDATE jobs SET status = ?, data = ?, updated_at = ? WHERE id = ?",
+                       (job.status, job.model_dump_json(), now, job.id))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return job
+
+    async def finish(self, job: Job):
+        await run_blocking(self._finish, job)
+
+    def _finish(self, job: Job):
+        self._connect().execute(
+            "UPDATE jobs SET status = ?, data = ?, updated_at = ? WHERE id = ?",
+            (job.status, job.model_dump_json(), time.time(), job.id)
+        )
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return await run_blocking(self._get, job_id)
+
+    def _get(self, job_id: str) -> Optional[Job]:
+        row = self._connect().execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.model_validate_json(row[0]) if row else None
+
+    async def counts(self) -> Dict[str, int]:
+        return await run_blocking(self._counts)
+
+    def _counts(self) -> Dict[str, int]:
+        counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        for status, count in self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"):
+            counts[status] = count
+        return counts
+
+
+class StoreJobBackend(JobBackend):
+    """
+    Jobs in the shared state store, seen by every process using it (on every
+    host, with Redis). A job's record lives under job:<id>, the queue holds
+    the ids waiting to run, and jobs:key:<key> points at the in-flight job
+    for a problem. A job lost with its worker is not re-queued: it stays
+    running until its record expires, and its key expires after the lease,
+    so the problem can be submitted again.
+    """
+
+    QUEUE = "jobs:queue"
+    SUBMIT_ATTEMPTS = 3  # Passes at joining or taking a problem's key before overwriting it
+
+    def __init__(self, store: StateStore, result_ttl: float = 3600.0, poll_interval: float = 0.2,
+                 lease: float = 600.0):
+        self.store = store
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.lease = lease
+
+    def _load(self, job_id: str) -> Optional[Job]:
+        value = self.store.get(f"job:{job_id}")
+        return Job.model_validate_json(value) if value else None
+
+    def _save(self, job: Job, previous_status: Optional[str] = None):
+        ttl = self.result_ttl if job.status in FINISHED else self.lease + self.result_ttl
+        self.store.set(f"job:{job.id}", job.model_dump_json(), ttl)
+        # One marker per job under its status, so counts() is a prefix count
+        if previous_status is not None and previous_status != job.status:
+            self.store.delete(f"jobs:status:{previous_status}:{job.id}")
+        self.store.set(f"jobs:status:{job.status}:{job.id}", "", ttl)
+
+    async def submit(self, job: Job, key: str, max_pending: int) -> Tuple[Job, bool]:
+        return await run_blocking(self._submit, job, key, max_pending)
+
+    def _submit(self, job: Job, key: str, max_pending: int) -> Tuple[Job, bool]:
+        key_name = f"jobs:key:{key}"
+        for _ in range(self.SUBMIT_ATTEMPTS):
+            existing_id = self.store.get(key_name)
+            if existing_id:
+                existing = self._load(existing_id)
+                if existing is not None and existing.status not in FINISHED:
+                    existing.submissions += 1
+                    self._save(existing)
+                    return existing, False
+                # The key outlived its job (the record expired, or the job finished and its key
+                # is not cleared yet): drop it, unless another submission already replaced it
+                if self.store.get(key_name) == existing_id:
+                    self.store.delete(key_name)
+            if self.store.length(self.QUEUE) >= max_pending:
+                raise JobQueueFull()
+            # The record goes in before the key, so whoever finds the key can load the job
+            self._save(job)
+            if self.store.add(key_name, job.id, self.lease):
+                self.store.push(self.QUEUE, job.id)
+                return job, True
+            # Another process queued the same problem first: join its job on the next pass
+            self.store.delete(f"job:{job.id}")
+            self.store.delete(f"jobs:status:{job.status}:{job.id}")
+
+        # Still racing for the key: queue this job under it anyway (at worst the problem is solved twice)
+        if self.store.length(self.QUEUE) >= max_pending:
+            raise JobQueueFull()
+        self._save(job)
+        self.store.set(key_name, job.id, self.lease)
+        self.store.push(self.QUEUE, job.id)
+        return job, True
+
+    async def claim(self) -> Job:
+        while True:
+            job = await run_blocking(self._claim_next)
+            if job is not None:
+                return job
+            await asyncio.sleep(self.poll_interval)
+
+    def _claim_next(self) -> Optional[Job]:
+        while True:
+            job_id = self.store.pop(self.QUEUE)
+            if job_id is None:
+                return None
+            job = self._load(job_id)
+            if job is None:
+                continue  # Expired while queued
+            job.status = "running"
+            job.started_at = time.time()
+            self._save(job, "queued")
+            return job
+
+    async def finish(self, job: Job):
+        await run_blocking(self._finish, job)
+
+    def _finish(self, job: Job):
+        self._save(job, "running")
+        key = f"jobs:key:{job_key(job)}"
+        # After the lease the key may already belong to a newer job for the same problem
+        if self.store.get(key) == job.id:
+            self.store.delete(key)
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return await run_blocking(self._load, job_id)
+
+    async def counts(self) -> Dict[str, int]:
+        return await run_blocking(self._counts)
+
+    def _counts(self) -> Dict[str, int]:
+        return {status: self.store.count(f"jobs:status:{status}:")
+                for status in ("queued", "running", "done", "failed")}
+
+
+class JobQueue:
+    """Submits jobs with in-flight deduplication and runs worker loops"""
+
+    def __init__(self, backend: JobBackend, max_pending: int = 1000):
+        self.backend = backend
+        self.max_pending = max_pending
+        self.submitted = 0
+        self.deduplicated = 0
+
+    async def submit(self, request: JobRequest) -> Tuple[Job, bool]:
+        """Queue a solve; returns the job and whether it is shared with an earlier identical submission"""
+        job = Job(
+            id=uuid.uuid4().hex,
+            mode=request.mode,
+            problem=request.problem,
+            latency_budget_ms=request.latency_budget_ms,
+            token_budget=request.token_budget,
+            created_at=time.time()
+        )
+        job, created = await self.backend.submit(job, job_key(request), self.max_pending)
+        if created:
+            self.submitted += 1
+            JOBS.inc(job.mode, "submitted")
+        else:
+            self.deduplicated += 1
+            JOBS.inc(job.mode, "deduplicated")
+        return job, not created
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return await self.backend.get(job_id)
+
+    async def wait_finished(self, job_id: str, timeout: float) -> Optional[Job]:
+        """Wait up to timeout for a job to finish, returning it in whatever state it is then"""
+        deadline = time.monotonic() + timeout
+        job = await self.backend.get(job_id)
+        while job is not None and job.status not in FINISHED and time.monotonic() < deadline:
+            job = await self.backend.wait(job_id, deadline - time.monotonic())
+        return job
+
+    async def work(self, solve: Callable[[Job], Awaitable[AgentResponse]]):
+        """Worker loop: claim jobs and run them until cancelled"""
+        while True:
+            job = await self.backend.claim()
+            JOB_QUEUE_WAIT.observe(job.mode, value=job.started_at - job.created_at)
+            try:
+                job.result = await solve(job)
+                job.status = "done" if job.result.success else "failed"
+                job.error = job.result.error
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+            job.finished_at = time.time()
+            await self.backend.finish(job)
+            JOBS.inc(job.mode, job.status)
+
+    def start_workers(self, solve: Callable[[Job], Awaitable[AgentResponse]], count: int) -> List[asyncio.Task]:
+        """Start `count` worker loops on the running event loop"""
+        return [asyncio.create_task(self.work(solve)) for _ in range(count)]
+
+    async def stats(self) -> dict:
+        return {
+            "jobs": await self.backend.counts(),
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated
+        }
+
+
+_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    """Get the application job queue, creating it on first use"""
+    global _queue
+    if _queue is None:
+        settings = JobSettings()
+        store = get_state_store()
+        if settings.backend == "sqlite":
+            backend = SQLiteJobBackend(settings.path, settings.result_ttl, settings.poll_interval, settings.lease)
+        elif store is not None:
+            # Worker processes sharing state also share jobs, or a job could only be polled where it was queued
+            backend = StoreJobBackend(store, settings.result_ttl, settings.poll_interval, settings.lease)
+        else:
+            backend = MemoryJobBackend(settings.result_ttl)
+        _queue = JobQueue(backend, settings.max_pending)
+    return _queue
@@ -0,0 +1,109 @@
+"""
+LLM Call Memoization - Content-addressed store of individual model replies
+Each call is keyed by its exact (model, messages, sampling params). Replies
+are only memoized in deterministic mode (temperature 0), where replaying a
+stored reply is equivalent to calling the provider again; replays and
+regression runs then cost no API calls.
+"""
+
+import hashlib
+import json
+from typing import List, Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from services.cache import CacheBackend, SQLiteCacheBackend, memory_or_shared
+from services.state import run_blocking
+
+
+class MemoSettings(BaseSettings):
+    """Memo settings, overridable with LLM_MEMO_* environment variables"""
+    model_config = SettingsConfigDict(env_prefix="LLM_MEMO_")
+
+    deterministic: bool = False   # Opt-in: force temperature 0 and memoize replies
+    backend: str = "memory"       # "memory" (the shared store with shared state on) or "sqlite" (persists across runs)
+    path: str = "llm_memo.db"
+    max_entries: int = 4096
+    ttl: float = 7 * 24 * 3600.0
+
+
+class LLMMemo:
+    """Bounded memo of model replies keyed by a hash of the full request"""
+
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(model: str, messages: List[dict], params: dict) -> str:
+        raw = json.dumps([model, messages, params], sort_keys=True, ensure_ascii=False)
+        return "llm:" + hashlib.sha256(raw.encode()).hexdigest()
+
+    @staticmethod
+    def _is_deterministic(params: dict) -> bool:
+        # Sampled replies are not reproducible, so they are never memoized
+        return params.get("temperature") == 0
+
+    def get(self, model: str, messages: List[dict], params: dict) -> Optional[str]:
+        """Return the memoized reply for this exact call, if any"""
+        if not self._is_deterministic(params):
+            return None
+        value = self.backend.get(self.key_for(model, messages, params))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, model: str, messages: List[dict], params: dict, reply: str):
+        """Memoize a successful reply"""
+        if self._is_deterministic(params):
+            self.backend.set(self.key_for(model, messages, params), reply, self.ttl)
+
+    async def get_async(self, model: str, messages: List[dict], params: dict) -> Optional[str]:
+        """The memoized reply, looked up in a worker thread when the memo is a database"""
+        if self.backend.blocking and self._is_deterministic(params):
+            return await run_blocking(self.get, model, messages, params)
+        return self.get(model, messages, params)
+
+    async def set_async(self, model: str, messages: List[dict], params: dict, reply: str):
+        """Memoize a reply, from a worker thread when the memo is a database"""
+        if self.backend.blocking and self._is_deterministic(params):
+            await run_blocking(self.set, model, messages, params, reply)
+        else:
+            self.set(model, messages, params, reply)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.backend.evictions,
+            "entries": len(self.backend)
+        }
+
+
+_memo: Optional[LLMMemo] = None
+_memo_configured = False
+
+
+def get_llm_memo() -> Optional[LLMMemo]:
+    """Get the application LLM memo, or None unless deterministic mode is on"""
+    global _memo, _memo_configured
+    if not _memo_configured:
+        _memo_configured = True
+        settings = MemoSettings()
+        if not settings.deterministic:
+            return None
+        if settings.backend == "sqlite":
+            backend = SQLiteCacheBackend(settings.path, settings.max_entries)
+        else:
+            backend = memory_or_shared("memo:", settings.max_entries)
+        _memo = LLMMemo(backend, settings.ttl)
+    return _memo
+
+
+def sampling_temperature(default: float) -> float:
+    """Temperature agents should use: 0 in deterministic mode, else their default"""
+    return 0.0 if get_llm_memo() is not None else default
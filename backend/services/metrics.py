@@ -0,0 +1,177 @@
+"""
+Metrics - Lightweight Prometheus-style counters and histograms
+Metrics live in process memory as plain dicts keyed by label values, so
+recording on the hot path is a dict update (plus a bisect for histograms).
+render() produces the Prometheus text exposition format for /metrics.
+"""
+
+import bisect
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from models.schemas import LLMCall, SolveStats
+
+# USD per 1M (prompt, completion) tokens; models not listed are costed at 0
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        self.values[label_values] = self.values.get(label_values, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for label_values, value in self.values.items():
+            lines.append(f"{self.name}{_labels(self.labels, label_values)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels"""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self.values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, *label_values: str, value: float):
+        series = self.values.get(label_values)
+        if series is None:
+            series = self.values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), label_values + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, label_values)} {total:g}")
+            lines.append(f"{self.name}_count{_labels(self.labels, label_values)} {count}")
+        return lines
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+LLM_REQUESTS = Counter("llm_requests_total", "LLM provider calls", ["provider", "model", "status"])
+LLM_LATENCY = Histogram("llm_request_latency_seconds", "LLM provider call latency", ["provider", "model"])
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens sent to and received from LLM providers",
+                     ["provider", "model", "kind"])
+LLM_COST = Counter("llm_cost_usd_total", "Estimated LLM spend in USD", ["provider", "model"])
+SOLVES = Counter("solve_requests_total", "Finished solves", ["mode", "status"])
+SOLVE_DURATION = Histogram("solve_duration_seconds", "End-to-end solve wall time", ["mode"])
+LLM_RETRIES = Counter("llm_retries_total", "LLM provider calls retried, by the error that caused it",
+                      ["provider", "reason"])
+LLM_HEDGES = Counter("llm_hedges_total", "Hedged LLM requests sent, and how many answered first",
+                     ["provider", "outcome"])
+LLM_CIRCUIT_OPENS = Counter("llm_circuit_opens_total", "Times a provider's circuit breaker opened", ["provider"])
+ADMISSION_WAIT = Histogram("admission_queue_wait_seconds", "Time admitted requests waited for a slot", ["endpoint"],
+                           buckets=(0.0, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+ADMISSION_REJECTED = Counter("admission_rejected_total", "Requests turned away by admission control",
+                             ["endpoint", "reason"])
+JOBS = Counter("jobs_total", "Background jobs submitted, deduplicated and finished", ["mode", "event"])
+JOB_QUEUE_WAIT = Histogram("job_queue_wait_seconds", "Time jobs waited in the queue before a worker took them",
+                           ["mode"])
+SOLVES_COALESCED = Counter("solves_coalesced_total", "Solve requests served by an identical solve already in flight",
+                           ["mode"])
+MODEL_BATCH_SIZE = Histogram("model_batch_size", "Model calls dispatched together per micro-batch", ["provider"],
+                             buckets=(1, 2, 4, 8, 16, 32, 64))
+MODEL_BATCH_WAIT = Histogram("model_batch_wait_seconds", "Time model calls waited for their micro-batch",
+                             ["provider"], buckets=(0.0, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+
+REGISTRY: List = [LLM_REQUESTS, LLM_LATENCY, LLM_TOKENS, LLM_COST, SOLVES, SOLVE_DURATION,
+                  LLM_RETRIES, LLM_HEDGES, LLM_CIRCUIT_OPENS, ADMISSION_WAIT, ADMISSION_REJECTED,
+                  JOBS, JOB_QUEUE_WAIT, SOLVES_COALESCED, MODEL_BATCH_SIZE, MODEL_BATCH_WAIT]
+
+
+def call_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimated USD cost of one call"""
+    prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+def record_llm_call(stats: Optional[SolveStats], provider: str, model: str, agent: str,
+                    latency: float, prompt_tokens: int, completion_tokens: int, status: str = "ok"):
+    """Record one provider call in the process metrics and in the solve's stats"""
+    LLM_REQUESTS.inc(provider, model, status)
+    LLM_LATENCY.observe(provider, model, value=latency)
+    if status != "ok":
+        return
+
+    cost = call_cost(model, prompt_tokens, completion_tokens)
+    LLM_TOKENS.inc(provider, model, "prompt", amount=prompt_tokens)
+    LLM_TOKENS.inc(provider, model, "completion", amount=completion_tokens)
+    LLM_COST.inc(provider, model, amount=cost)
+
+    if stats is not None:
+        stats.llm_calls += 1
+        stats.prompt_tokens += prompt_tokens
+        stats.completion_tokens += completion_tokens
+        stats.tokens_used += prompt_tokens + completion_tokens
+        stats.cost_usd += cost
+        stats.calls.append(LLMCall(
+            agent=agent,
+            model=model,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            latency_ms=latency * 1000,
+            cost_usd=cost
+        ))
+
+
+def reused_stats(stats: Optional[SolveStats]) -> Optional[SolveStats]:
+    """
+    Stats for a response that reuses another solve's result: no calls, tokens
+    or cost of its own (nor savings), so per-request totals count that spend
+    once. Rounds, stop reason and votes still describe the debate behind it.
+    """
+    if stats is None:
+        return None
+    return stats.model_copy(update={
+        "llm_calls": 0, "calls_saved": 0, "tokens_used": 0, "tokens_saved": 0, "prompt_tokens": 0,
+        "prompt_tokens_saved": 0, "completion_tokens": 0, "cost_usd": 0.0, "calls": [],
+    })
+
+
+def record_solve(mode: str, success: bool, duration: float):
+    """Record a finished solve"""
+    SOLVES.inc(mode, "success" if success else "error")
+    SOLVE_DURATION.observe(mode, value=duration)
+
+
+def estimate_tokens(messages: List[dict], reply: str) -> Tuple[int, int]:
+    """Rough (prompt, completion) token counts (~4 characters per token) when no usage is reported"""
+    return sum(len(m["content"]) for m in messages) // 4, len(reply) // 4
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,107 @@
+"""
+Request Coalescing - One in-flight solve per identical problem
+When the same problem arrives many times at once (a sample problem demoed to
+a room), the first request runs the solve and every concurrent duplicate
+attaches to it and gets the same result, so the provider sees one debate
+instead of dozens. Requests are identical when they share the normalized
+problem text, the model configuration and the API key. The response cache
+covers repeats after a solve has finished; this covers the window while it
+is still running.
+
+The shared solve runs in its own task, so a caller that disconnects does
+not cancel it for the others still waiting on it. Once every caller has
+gone, it is cancelled. Followers' responses are
+marked coalesced and report no calls, tokens or cost: the leader's response
+already carries them.
+"""
+
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from models.schemas import AgentResponse
+from services.cache import normalize_problem
+from services.metrics import SOLVES_COALESCED, reused_stats
+
+
+class SingleFlightSettings(BaseSettings):
+    """Coalescing settings, overridable with SINGLE_FLIGHT_* environment variables"""
+    model_config = SettingsConfigDict(env_prefix="SINGLE_FLIGHT_")
+
+    enabled: bool = True
+
+
+class SingleFlight:
+    """Shares one running solve between concurrent callers with the same key"""
+
+    def __init__(self):
+        self._flights: Dict[str, asyncio.Task] = {}
+        self._waiting: Dict[asyncio.Task, int] = {}  # Callers still waiting on each flight
+        self.leaders = 0
+        self.followers = 0
+
+    @staticmethod
+    def key_for(mode: str, problem: str, api_key: Optional[str], *config: Any) -> str:
+        # The key is hashed so credentials are never held in the flight table
+        raw = json.dumps([mode, normalize_problem(problem), api_key or "", *config])
+        return f"{mode}:" + hashlib.sha256(raw.encode()).hexdigest()
+
+    async def do(self, key: str, solve: Callable[[], Awaitable[AgentResponse]],
+                 mode: str = "solve") -> Tuple[AgentResponse, bool]:
+        """Run `solve`, or wait for the identical one already running; returns (result, coalesced)"""
+        flight = self._flights.get(key)
+        coalesced = flight is not None
+        if coalesced:
+            self.followers += 1
+            SOLVES_COALESCED.inc(mode)
+        else:
+            self.leaders += 1
+            flight = self._flights[key] = asyncio.ensure_future(solve())
+            flight.add_done_callback(lambda _: self._flights.pop(key, None))
+        self._waiting[flight] = self._waiting.get(flight, 0) + 1
+        try:
+            return await asyncio.shield(flight), coalesced
+        finally:
+            self._waiting[flight] -= 1
+            if not self._waiting[flight]:
+                del self._waiting[flight]
+                # Every caller was cancelled (e.g. disconnected): nobody will read the result
+                if not flight.done():
+                    flight.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._flights),
+            "leaders": self.leaders,
+            "followers": self.followers
+        }
+
+
+async def coalesce(key: str, solve: Callable[[], Awaitable[AgentResponse]], mode: str) -> AgentResponse:
+    """Run `solve` through the application SingleFlight; duplicates get a copy marked coalesced"""
+    flights = get_single_flight()
+    if flights is None:
+        return await solve()
+    result, coalesced = await flights.do(key, solve, mode)
+    if not coalesced:
+        return result
+    # Followers get their own copy so no two responses share one mutable object, and the leader's
+    # calls and cost stay with the leader
+    return result.model_copy(update={"coalesced": True, "stats": reused_stats(result.stats)})
+
+
+_single_flight: Optional[SingleFlight] = None
+_single_flight_configured = False
+
+
+def get_single_flight() -> Optional[SingleFlight]:
+    """Get the application SingleFlight, or None when coalescing is disabled"""
+    global _single_flight, _single_flight_configured
+    if not _single_flight_configured:
+        _single_flight_configured = True
+        if SingleFlightSettings().enabled:
+            _single_flight = SingleFlight()
+    return _single_flight
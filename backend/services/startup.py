@@ -0,0 +1,104 @@
+"""
+Startup Warm-up - Open the provider connections before the first request
+With STARTUP_WARM_UP on, a background task started right after startup
+builds each configured model backend and opens a pooled connection to each
+remote provider, so the first solve doesn't wait for a TCP/TLS handshake.
+A local model is loaded in a worker thread. GET /api/ready answers 503
+until the warm-up is done. A step that fails is reported there too, but
+doesn't hold readiness back: the first request then just pays for it.
+
+It is off by default. The request that wakes a cold process arrives as soon
+as the port opens, before any warm-up could finish, so warming up only
+helps when traffic waits for /api/ready. GET / is the liveness check either way.
+"""
+
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from agents.backends import api_key_variable, get_model_backend
+
+
+class StartupSettings(BaseSettings):
+    """Warm-up settings, overridable with STARTUP_* environment variables"""
+    model_config = SettingsConfigDict(env_prefix="STARTUP_")
+
+    warm_up: bool = False        # Off: ready at once, and the first request opens the connections
+    step_timeout: float = 15.0   # Seconds before a warm-up step is given up on
+
+
+class WarmUp:
+    """Runs the warm-up steps once and reports whether the process is ready"""
+
+    def __init__(self, settings: Optional[StartupSettings] = None):
+        self.settings = settings or StartupSettings()
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        self.steps: Dict[str, dict] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.finished is not None
+
+    def start(self):
+        """Start warming up in the background (or mark the process ready at once when it is off)"""
+        self.started = time.monotonic()
+        if not self.settings.warm_up:
+            self.finished = self.started
+            return
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self):
+        for role in ("single", "multi"):
+            variable = api_key_variable(role)
+            api_key = os.getenv(variable) if variable else None
+            if variable and (not api_key or api_key == f"your_{variable.lower()}_here"):
+                self.steps[f"{role}_backend"] = {"ok": False, "ms": 0.0, "error": f"{variable} not configured"}
+                continue
+
+            async def warm_backend(role=role, variable=variable, api_key=api_key):
+                if variable is None:
+                    # An in-process model is loaded in a thread so the event loop keeps serving
+                    backend = await asyncio.to_thread(get_model_backend, role, api_key)
+                else:
+                    backend = get_model_backend(role, api_key)
+                await backend.warm_up()
+            await self._step(f"{role}_backend", warm_backend)
+
+        self.finished = time.monotonic()
+
+    async def _step(self, name: str, step: Callable[[], Awaitable]):
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(step(), self.settings.step_timeout)
+            self.steps[name] = {"ok": True, "ms": (time.monotonic() - start) * 1000}
+        except Exception as error:
+            self.steps[name] = {"ok": False, "ms": (time.monotonic() - start) * 1000,
+                                "error": str(error) or type(error).__name__}
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "warm_up_ms": ((self.finished or time.monotonic()) - self.started) * 1000,
+            "steps": self.steps
+        }
+
+
+_warm_up: Optional[WarmUp] = None
+
+
+def get_warm_up() -> WarmUp:
+    """Get the application warm-up, creating it on first use"""
+    global _warm_up
+    if _warm_up is None:
+        _warm_up = WarmUp()
+    return _warm_up
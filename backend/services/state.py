@@ -0,0 +1,352 @@
+"""
+Shared State - Key-value state shared by every worker process
+Each API worker process would otherwise keep its own response cache,
+rate-limit buckets and job table. A client would then get its rate limit
+once per worker, and a cached solve would only be found by the worker that
+stored it. With STATE_SHARED on, that state goes through one StateStore.
+serve.py turns it on when it starts more than one worker.
+
+The local store is the default. It is a SQLite file in shared memory
+(/dev/shm where the host has it), shared by every process on the host that
+runs the same deployment: the file is named after the namespace and the
+app directory. The Redis store shares state across hosts and needs the
+optional `redis` package. Both implement the same operations, so the local
+store stands in for the network one in development and load tests.
+
+The operations block: SQLite may wait up to its busy timeout for the write
+lock, and Redis waits on the network. Async code calls them through
+run_blocking so the event loop keeps serving meanwhile.
+"""
+
+import asyncio
+import hashlib
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Callable, Optional, TypeVar
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+T = TypeVar("T")
+
+# Shared memory where the host has it, so the store never waits on a disk
+STATE_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def default_path(namespace: str) -> str:
+    """The local store's file for this deployment: other apps on the host get files of their own"""
+    app = hashlib.sha256(APP_DIR.encode()).hexdigest()[:12]
+    return os.path.join(STATE_DIR, f"{namespace or 'state'}-{app}.db")
+
+
+# Sorts after any character a key uses, so [prefix, prefix + _END) covers every key under prefix
+_END = "\uffff"
+
+
+class StateSettings(BaseSettings):
+    """Shared state settings, overridable with STATE_* environment variables"""
+    model_config = SettingsConfigDict(env_prefix="STATE_")
+
+    shared: bool = False               # Keep caches, rate limits and jobs in the store instead of in-process
+    backend: str = "local"             # "local" (SQLite file shared on this host) or "redis"
+    path: str = ""                     # File for the local store (default: per deployment in shared memory)
+    url: str = "redis://localhost:6379/0"
+    namespace: str = "multi_agent"     # Key prefix, so several deployments can share one Redis
+
+
+class StateStore:
+    """Operations on shared state; values are strings, and keys expire after their TTL"""
+
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: str, ttl: float):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def count(self, prefix: str) -> int:
+        """Live keys starting with prefix"""
+        raise NotImplementedError
+
+    def trim(self, prefix: str, max_entries: int) -> int:
+        """Drop the keys under prefix that expire soonest until at most max_entries are left; returns how many"""
+        raise NotImplementedError
+
+    def clear(self, prefix: str):
+        raise NotImplementedError
+
+    def take_token(self, key: str, rate: float, burst: float) -> float:
+        """
+        Take one token from the bucket at key, which refills at rate per second
+        up to burst. Returns 0 if a token was taken, else the seconds until one
+        will be available. Atomic across every process using the store.
+        """
+        raise NotImplementedError
+
+    def add(self, key: str, value: str, ttl: float) -> bool:
+        """Set key only if it has no live value; True if it was set. Atomic across processes"""
+        raise NotImplementedError
+
+    def push(self, queue: str, value: str):
+        """Append a value to the end of a queue"""
+        raise NotImplementedError
+
+    def pop(self, queue: str) -> Optional[str]:
+        """Remove and return the value at the front of a queue, or None if it is empty"""
+        raise NotImplementedError
+
+    def length(self, queue: str) -> int:
+        raise NotImplementedError
+
+
+async def run_blocking(operation: Callable[..., T], *args) -> T:
+    """Run store operations in a worker thread, off the event loop"""
+    return await asyncio.to_thread(operation, *args)
+
+
+class LocalStateStore(StateStore):
+    """State in a SQLite file, shared by every process on this host that opens it"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                       "expires_at REAL NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS state_expiry ON state (expires_at)")
+            db.execute("CREATE TABLE IF NOT EXISTS queues (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                       "name TEXT NOT NULL, value TEXT NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS queue_order ON queues (name, id)")
+
+    def _connect(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._connect().execute("SELECT value FROM state WHERE key = ? AND expires_at > ?",
+                                      (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl: float):
+        db = self._connect()
+        now = time.time()
+        db.execute("INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)", (key, value, now + ttl))
+        self._writes += 1
+        if self._writes % 100 == 0:
+            db.execute("DELETE FROM state WHERE expires_at <= ?", (now,))
+
+    def delete(self, key: str):
+        self._connect().execute("DELETE FROM state WHERE key = ?", (key,))
+
+    def count(self, prefix: str) -> int:
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM state WHERE key >= ? AND key < ? AND expires_at > ?",
+            (prefix, prefix + _END, time.time())
+        ).fetchone()[0]
+
+    def trim(self, prefix: str, max_entries: int) -> int:
+        overflow = self.count(prefix) - max_entries
+        if overflow <= 0:
+            return 0
+        self._connect().execute(
+            "DELETE FROM state WHERE key IN (SELECT key FROM state WHERE key >= ? AND key < ? "
+            "ORDER BY expires_at LIMIT ?)", (prefix, prefix + _END, overflow)
+        )
+        return overflow
+
+    def clear(self, prefix: str):
+        self._connect().execute("DELETE FROM state WHERE key >= ? AND key < ?", (prefix, prefix + _END))
+
+    def take_token(self, key: str, rate: float, burst: float) -> float:
+        db = self._connect()
+        db.execute("BEGIN IMMEDIATE")  # Holds the write lock, so concurrent takes see each other
+        try:
+            now = time.time()
+            row = db.execute("SELECT value FROM state WHERE key = ? AND expires_at > ?", (key, now)).fetchone()
+            tokens, updated = map(float, row[0].split()) if row else (burst, now)
+            tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            # A bucket left alone until it is full again is the same as no bucket
+            db.execute("INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+                       (key, f"{tokens} {now}", now + burst / rate + 1))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return wait
+
+    def add(self, key: str, value: str, ttl: float) -> bool:
+        db = self._connect()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            db.execute("DELETE FROM state WHERE key = ? AND expires_at <= ?", (key, now))
+            added = db.execute("INSERT OR IGNORE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+                               (key, value, now + ttl)).rowcount == 1
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return added
+
+    def push(self, queue: str, value: str):
+        self._connect().execute("INSERT INTO queues (name, value) VALUES (?, ?)", (queue, value))
+
+    def pop(self, queue: str) -> Optional[str]:
+        db = self._connect()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute("SELECT id, value FROM queues WHERE name = ? ORDER BY id LIMIT 1", (queue,)).fetchone()
+            if row is not None:
+                db.execute("DELETE FROM queues WHERE id = ?", (row[0],))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return row[1] if row else None
+
+    def length(self, queue: str) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM queues WHERE name = ?", (queue,)).fetchone()[0]
+
+
+# Token bucket update, run atomically by Redis; the wait goes back as a string so Lua doesn't truncate it
+_TAKE_TOKEN = """
+local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class RedisStateStore(StateStore):
+    """State in Redis, shared by every process on every host that connects to it"""
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError as error:
+            raise RuntimeError("The Redis state store needs the redis package: pip install redis") from error
+
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self._take_token = self.client.register_script(_TAKE_TOKEN)
+
+    def get(self, key: str) -> Optional[str]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: str, ttl: float):
+        self.client.set(key, value, px=max(1, math.ceil(ttl * 1000)))
+
+    def delete(self, key: str):
+        self.client.delete(key)
+
+    def count(self, prefix: str) -> int:
+        return sum(1 for _ in self.client.scan_iter(match=prefix + "*", count=1000))
+
+    def trim(self, prefix: str, max_entries: int) -> int:
+        # Redis evicts by its own maxmemory policy (allkeys-lru suits the cache)
+        return 0
+
+    def clear(self, prefix: str):
+        keys = list(self.client.scan_iter(match=prefix + "*", count=1000))
+        if keys:
+            self.client.delete(*keys)
+
+    def take_token(self, key: str, rate: float, burst: float) -> float:
+        return float(self._take_token(keys=[key], args=[rate, burst, time.time()]))
+
+    def add(self, key: str, value: str, ttl: float) -> bool:
+        return bool(self.client.set(key, value, px=max(1, math.ceil(ttl * 1000)), nx=True))
+
+    def push(self, queue: str, value: str):
+        self.client.rpush(queue, value)
+
+    def pop(self, queue: str) -> Optional[str]:
+        return self.client.lpop(queue)
+
+    def length(self, queue: str) -> int:
+        return self.client.llen(queue)
+
+
+class NamespacedStore(StateStore):
+    """A store whose keys all carry a prefix"""
+
+    def __init__(self, store: StateStore, namespace: str):
+        self.store = store
+        self.prefix = f"{namespace}:" if namespace else ""
+
+    def get(self, key: str) -> Optional[str]:
+        return self.store.get(self.prefix + key)
+
+    def set(self, key: str, value: str, ttl: float):
+        self.store.set(self.prefix + key, value, ttl)
+
+    def delete(self, key: str):
+        self.store.delete(self.prefix + key)
+
+    def count(self, prefix: str) -> int:
+        return self.store.count(self.prefix + prefix)
+
+    def trim(self, prefix: str, max_entries: int) -> int:
+        return self.store.trim(self.prefix + prefix, max_entries)
+
+    def clear(self, prefix: str):
+        self.store.clear(self.prefix + prefix)
+
+    def take_token(self, key: str, rate: float, burst: float) -> float:
+        return self.store.take_token(self.prefix + key, rate, burst)
+
+    def add(self, key: str, value: str, ttl: float) -> bool:
+        return self.store.add(self.prefix + key, value, ttl)
+
+    def push(self, queue: str, value: str):
+        self.store.push(self.prefix + queue, value)
+
+    def pop(self, queue: str) -> Optional[str]:
+        return self.store.pop(self.prefix + queue)
+
+    def length(self, queue: str) -> int:
+        return self.store.length(self.prefix + queue)
+
+
+_store: Optional[StateStore] = None
+_store_configured = False
+
+
+def get_state_store() -> Optional[StateStore]:
+    """Get the shared state store, or None when state is kept in-process"""
+    global _store, _store_configured
+    if not _store_configured:
+        _store_configured = True
+        settings = StateSettings()
+        if not settings.shared:
+            return None
+        if settings.backend == "redis":
+            store = RedisStateStore(settings.url)
+        elif settings.backend == "local":
+            store = LocalStateStore(settings.path or default_path(settings.namespace))
+        else:
+            raise ValueError(f"Unknown STATE_BACKEND {settings.backend!r}; expected 'local' or 'redis'")
+        _store = NamespacedStore(store, settings.namespace)
+    return _store
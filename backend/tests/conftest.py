@@ -0,0 +1,41 @@
+"""Shared fixtures: fresh application singletons and a scripted model for the debate"""
+
+import pytest
+
+from agents.multi_agent import DebateAgents
+from services import cache, memo, singleflight
+from services.metrics import estimate_tokens
+
+
+@pytest.fixture(autouse=True)
+def fresh_services(monkeypatch):
+    """Every test starts with an empty response cache and no memo or request coalescing"""
+    monkeypatch.setattr(cache, "_cache", cache.ResponseCache(cache.MemoryCacheBackend()))
+    monkeypatch.setattr(cache, "_cache_configured", True)
+    monkeypatch.setattr(memo, "_memo", None)
+    monkeypatch.setattr(memo, "_memo_configured", True)
+    monkeypatch.setattr(singleflight, "_single_flight", None)
+    monkeypatch.setattr(singleflight, "_single_flight_configured", True)
+
+
+@pytest.fixture
+def scripted_debate(monkeypatch):
+    """
+    Answer the debate's model calls from replies keyed by role. Returns the
+    replies dict (change it to change what the agents say) and the list of
+    (role, prompt, temperature) calls made.
+    """
+    replies = {
+        "proposer": "Step 1: 100 - 3 = 97\nMY PROPOSED ANSWER: 100 euros",
+        "critic": "The question asks for the confusing total.\nVERDICT: INCORRECT\nMY ANSWER: 10 euros",
+    }
+    calls = []
+
+    async def complete(self, messages, params, backend=None):
+        role = "critic" if "Agent 2 (Critic)" in messages[0]["content"] else "proposer"
+        calls.append((role, messages[-1]["content"], params["temperature"]))
+        reply = replies[role]
+        return (reply, *estimate_tokens(messages, reply))
+
+    monkeypatch.setattr(DebateAgents, "_complete", complete)
+    return replies, calls
@@ -0,0 +1,68 @@
+"""Admission control: per-client buckets, client identity and in-flight slots"""
+
+import asyncio
+
+import pytest
+
+from services.admission import AdmissionController, AdmissionRejected, AdmissionSettings, client_id
+
+
+def controller(**settings) -> AdmissionController:
+    return AdmissionController(AdmissionSettings(**settings))
+
+
+def test_bucket_is_per_client():
+    admission = controller(rate_limit=0.01, burst=2)
+    for _ in range(2):
+        admission.check_rate("ip:1.1.1.1", "single")
+    with pytest.raises(AdmissionRejected) as rejected:
+        admission.check_rate("ip:1.1.1.1", "single")
+    assert rejected.value.status_code == 429
+    admission.check_rate("ip:2.2.2.2", "single")
+
+
+def test_unknown_keys_share_the_address_bucket():
+    client = ("10.0.0.1", 5000)
+    ids = {client_id({"x-api-key": f"random-{i}"}, client) for i in range(5)}
+    ids.add(client_id({"authorization": "Bearer made-up"}, client))
+    assert ids == {"ip:10.0.0.1"}
+
+
+def test_known_key_gets_its_own_bucket():
+    admission = controller(api_keys=["team-key"])
+    client = ("10.0.0.1", 5000)
+    by_header = client_id({"x-api-key": "team-key"}, client, admission.known_keys)
+    by_bearer = client_id({"authorization": "Bearer team-key"}, client, admission.known_keys)
+    assert by_header == by_bearer != "ip:10.0.0.1"
+    assert "team-key" not in by_header
+
+
+def test_forwarded_address_is_taken_from_the_trusted_hop():
+    proxy = ("10.0.0.254", 443)
+    assert client_id({"x-forwarded-for": "203.0.113.7"}, proxy, forwarded_hops=1) == "ip:203.0.113.7"
+    # A client-supplied prefix is ignored: the proxy appended the real address last
+    spoofed = {"x-forwarded-for": "1.2.3.4, 203.0.113.7"}
+    assert client_id(spoofed, proxy, forwarded_hops=1) == "ip:203.0.113.7"
+    assert client_id(spoofed, proxy) == "ip:10.0.0.254"
+    assert client_id({}, proxy, forwarded_hops=1) == "ip:10.0.0.254"
+
+
+def test_in_flight_cap_queues_then_times_out():
+    async def scenario():
+        admission = controller(max_in_flight=1, queue_timeout=0.05, rate_limit=0)
+        async with admission.slot("single", "ip:a"):
+            with pytest.raises(AdmissionRejected) as rejected:
+                async with admission.slot("single", "ip:b"):
+                    pass
+        assert rejected.value.status_code == 503
+        assert admission.rejected["queue_timeout"] == 1
+
+        # A queued request gets the slot as soon as it is freed
+        async with admission.slot("single", "ip:a"):
+            waiting = asyncio.create_task(admission.acquire("single"))
+            await asyncio.sleep(0)
+            assert admission.status()["queued"] == 1
+        await waiting
+        assert admission.in_flight == 1
+
+    asyncio.run(scenario())
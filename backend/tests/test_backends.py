@@ -0,0 +1,56 @@
+"""Backend selection: which roles share an in-process engine"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from agents import backends
+from agents.backends import ModelSettings, get_model_backend
+
+
+class FakeLocal:
+    """Stands in for LocalBackend without loading a model"""
+    name = "local"
+    batched = True
+
+    loads = 0
+
+    def __init__(self, path: str, threads: int = 0):
+        FakeLocal.loads += 1
+        time.sleep(0.01)  # Loading takes a while, so concurrent builds overlap
+        self.model = path
+
+
+@pytest.fixture
+def local_models(monkeypatch):
+    monkeypatch.setattr(backends, "LocalBackend", FakeLocal)
+    monkeypatch.setattr(backends, "_batchers", {})
+    monkeypatch.setattr(FakeLocal, "loads", 0)
+
+    def configure(**settings):
+        monkeypatch.setattr(backends, "_settings", ModelSettings(single_backend="local", multi_backend="local",
+                                                                 **settings))
+    return configure
+
+
+def test_roles_with_different_local_models_get_their_own_engine(local_models):
+    local_models(single_model="small-model", multi_model="large-model")
+    single, multi = get_model_backend("single"), get_model_backend("multi")
+    assert single is not multi
+    assert (single.model, multi.model) == ("small-model", "large-model")
+
+
+def test_roles_with_the_same_local_model_share_one_engine(local_models):
+    local_models(local_path="shared-model")
+    assert get_model_backend("single") is get_model_backend("multi")
+    assert get_model_backend("single").model == "shared-model"
+
+
+def test_concurrent_builds_load_the_model_once(local_models):
+    # The startup warm-up builds the backend in a thread while requests build it on the event loop
+    local_models()
+    with ThreadPoolExecutor(4) as pool:
+        built = list(pool.map(lambda _: get_model_backend("single"), range(4)))
+    assert FakeLocal.loads == 1
+    assert all(backend is built[0] for backend in built)
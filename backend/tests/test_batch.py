@@ -0,0 +1,84 @@
+"""Batch solving: bounded concurrency, resumption and per-problem settings"""
+
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+import main
+from models.schemas import AgentResponse, BatchItem
+from services import admission
+from services.admission import AdmissionController, AdmissionSettings
+from services.batch import batch_item_id, run_batch
+
+
+def answer(text: str) -> AgentResponse:
+    return AgentResponse(success=True, final_answer=text, reasoning_steps=[], total_steps=0)
+
+
+async def collect(items, solve, skip_ids=()):
+    return [record async for record in run_batch(items, solve, 2, skip_ids)]
+
+
+def test_run_batch_skips_done_and_duplicate_items():
+    items = [BatchItem(problem="1 + 1", id="a"), BatchItem(problem="2 + 2", id="b"), BatchItem(problem="1 + 1")]
+    solved = []
+
+    async def solve(item):
+        solved.append(item.problem)
+        return answer("ok")
+
+    records = asyncio.run(collect(items + [BatchItem(problem="2 + 2", id="b")], solve, skip_ids=["a"]))
+    assert sorted(record["id"] for record in records) == sorted(["b", batch_item_id(items[2])])
+    assert sorted(solved) == ["1 + 1", "2 + 2"]
+
+
+def test_run_batch_records_failures():
+    async def solve(item):
+        raise RuntimeError("provider down")
+
+    [record] = asyncio.run(collect([BatchItem(problem="1 + 1")], solve))
+    assert not record["result"]["success"] and record["result"]["error"] == "provider down"
+
+
+def test_batch_endpoint_passes_budgets_to_the_debate(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "mock")
+    budgets = {}
+
+    async def solve(problem, api_key, latency_budget_ms=None, token_budget=None):
+        budgets[problem] = (latency_budget_ms, token_budget)
+        return answer("4")
+
+    monkeypatch.setattr(main, "solve_with_multi_agent", solve)
+    response = TestClient(main.app).post("/api/solve/batch", json={"problems": [
+        {"problem": "2 + 2", "token_budget": 500},
+        {"problem": "3 + 1", "latency_budget_ms": 2000},
+    ]})
+
+    assert response.status_code == 200
+    assert len([json.loads(line) for line in response.text.splitlines()]) == 2
+    assert budgets == {"2 + 2": (None, 500), "3 + 1": (2000, None)}
+
+
+def test_batch_problems_stay_within_the_admission_caps(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "mock")
+    controller = AdmissionController(AdmissionSettings(rate_limit=0, queue_timeout=10,
+                                                       endpoint_limits={"batch": 1, "multi": 2}))
+    monkeypatch.setattr(admission, "_controller", controller)
+    running, peak = [0], [0]
+
+    async def solve(problem, api_key, latency_budget_ms=None, token_budget=None):
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        await asyncio.sleep(0.01)
+        running[0] -= 1
+        return answer("ok")
+
+    monkeypatch.setattr(main, "solve_with_multi_agent", solve)
+    response = TestClient(main.app).post("/api/solve/batch", json={
+        "problems": [{"problem": f"{i} + 1"} for i in range(8)], "concurrency": 8})
+
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert len(records) == 8 and all(record["result"]["success"] for record in records)
+    assert peak[0] == 2  # The batch asked for 8 at once; the multi cap allows 2
+    assert controller.in_flight == 0
@@ -0,0 +1,55 @@
+"""Response cache keys and near-duplicate fingerprints"""
+
+from models.schemas import AgentResponse, LLMCall, SolveStats
+from services.cache import MemoryCacheBackend, ResponseCache, fingerprint_problem
+
+TRAIN = ("A train travels from City A to City B at 60 mph. The return journey from City B to City A "
+         "takes 3 hours at 80 mph. What is the total distance of the round trip?")
+SWAPPED = ("A train travels from City A to City B at 80 mph. The return journey from City B to City A "
+           "takes 3 hours at 60 mph. What is the total distance of the round trip?")
+
+
+def test_fingerprint_ignores_formatting_and_light_rewording():
+    assert fingerprint_problem("You pay €1,000.0 and get €3 back.") == \
+        fingerprint_problem("  you PAY €1000 and   get €3 back  ")
+    assert fingerprint_problem(TRAIN) == fingerprint_problem(TRAIN.replace("What is", "Find"))
+
+
+def test_fingerprint_changes_with_any_number():
+    assert fingerprint_problem(TRAIN) != fingerprint_problem(TRAIN.replace("3 hours", "4 hours"))
+
+
+def test_fingerprint_keeps_which_quantity_each_number_belongs_to():
+    # Same numbers and words, different answer (480 vs 360 miles)
+    assert fingerprint_problem(TRAIN) != fingerprint_problem(SWAPPED)
+
+
+def test_near_duplicate_lookup_does_not_serve_swapped_operands():
+    cache = ResponseCache(MemoryCacheBackend(), near_duplicates=True)
+    response = AgentResponse(success=True, final_answer="480 miles", reasoning_steps=[], total_steps=0)
+    cache.set(TRAIN, "model", 0.7, 3, response)
+
+    assert cache.get(TRAIN.replace("What is", "Find"), "model", 0.7, 3).final_answer == "480 miles"
+    assert cache.get(SWAPPED, "model", 0.7, 3) is None
+
+
+def test_failed_responses_are_not_cached():
+    cache = ResponseCache(MemoryCacheBackend())
+    cache.set(TRAIN, "model", 0.7, 3, AgentResponse(success=False, final_answer="", reasoning_steps=[],
+                                                    total_steps=0, error="boom"))
+    assert cache.get(TRAIN, "model", 0.7, 3) is None
+
+
+def test_a_hit_reports_no_spend_of_its_own():
+    cache = ResponseCache(MemoryCacheBackend())
+    call = LLMCall(agent="Agent 1", model="gpt-4o", prompt_tokens=100, completion_tokens=50,
+                   latency_ms=400.0, cost_usd=0.00075)
+    stats = SolveStats(llm_calls=1, tokens_used=150, prompt_tokens=100, completion_tokens=50,
+                       cost_usd=0.00075, rounds=1, stop_reason="consensus", calls=[call])
+    cache.set(TRAIN, "model", 0.7, 3, AgentResponse(success=True, final_answer="480 miles", reasoning_steps=[],
+                                                    total_steps=0, stats=stats))
+
+    hit = cache.get(TRAIN, "model", 0.7, 3)
+    assert hit.cached
+    assert (hit.stats.llm_calls, hit.stats.tokens_used, hit.stats.cost_usd, hit.stats.calls) == (0, 0, 0.0, [])
+    assert hit.stats.stop_reason == "consensus"
@@ -0,0 +1,37 @@
+"""Comparison endpoints: both solve paths in parallel"""
+
+import asyncio
+
+import main
+from models.schemas import AgentResponse, ProblemRequest
+
+
+def test_compare_stream_stops_the_other_agent_when_the_client_leaves(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "mock")
+    monkeypatch.setenv("HUGGINGFACE_API_KEY", "mock")
+    cancelled = []
+
+    async def single(problem, api_key):
+        return AgentResponse(success=True, final_answer="4", reasoning_steps=[], total_steps=0)
+
+    async def multi(problem, api_key):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    monkeypatch.setattr(main, "solve_with_single_agent", single)
+    monkeypatch.setattr(main, "solve_with_multi_agent", multi)
+
+    async def scenario():
+        response = await main.solve_compare_stream(ProblemRequest(problem="2 + 2"))
+        stream = response.body_iterator
+        first = await stream.__anext__()
+        assert first.startswith("event: single")
+        # The client disconnects before the debate finishes
+        await stream.aclose()
+        await asyncio.sleep(0)
+        assert cancelled
+
+    asyncio.run(scenario())
@@ -0,0 +1,87 @@
+"""Job queue: deduplication and jobs shared through the state store"""
+
+import asyncio
+
+from models.schemas import AgentResponse, JobRequest
+from services.jobs import JobQueue, MemoryJobBackend, StoreJobBackend, job_key
+from services.state import LocalStateStore, NamespacedStore
+
+PROBLEM = "A train travels 60 miles per hour for 8 hours. How far does it go?"
+
+
+async def solved(job) -> AgentResponse:
+    return AgentResponse(success=True, final_answer="480 miles", reasoning_steps=[], total_steps=0)
+
+
+def test_identical_submissions_share_a_job():
+    async def scenario():
+        queue = JobQueue(MemoryJobBackend())
+        first, shared_first = await queue.submit(JobRequest(problem=PROBLEM))
+        second, shared_second = await queue.submit(JobRequest(problem=f"  {PROBLEM.upper()} "))
+        assert second.id == first.id
+        assert (shared_first, shared_second) == (False, True)
+
+    asyncio.run(scenario())
+
+
+def test_jobs_in_the_store_are_seen_by_every_process(tmp_path):
+    store = NamespacedStore(LocalStateStore(str(tmp_path / "state.db")), "test")
+    # Two backends on one store stand in for an API process and a worker process
+    api = JobQueue(StoreJobBackend(store, poll_interval=0.01))
+    worker = JobQueue(StoreJobBackend(store, poll_interval=0.01))
+
+    async def scenario():
+        job, _ = await api.submit(JobRequest(problem=PROBLEM, mode="single"))
+        again, deduplicated = await worker.submit(JobRequest(problem=PROBLEM, mode="single"))
+        assert deduplicated and again.id == job.id
+        assert (await api.stats())["jobs"]["queued"] == 1
+
+        task = asyncio.create_task(worker.work(solved))
+        finished = await api.wait_finished(job.id, timeout=5)
+        task.cancel()
+        assert finished.status == "done" and finished.result.final_answer == "480 miles"
+        assert finished.submissions == 2
+        assert (await api.stats())["jobs"] == {"queued": 0, "running": 0, "done": 1, "failed": 0}
+
+        # A finished job no longer takes new submissions
+        fresh, deduplicated = await api.submit(JobRequest(problem=PROBLEM, mode="single"))
+        assert not deduplicated and fresh.id != job.id
+
+    asyncio.run(scenario())
+
+
+def test_a_key_that_outlived_its_job_is_replaced(tmp_path):
+    store = NamespacedStore(LocalStateStore(str(tmp_path / "state.db")), "test")
+    backend = StoreJobBackend(store)
+    queue = JobQueue(backend)
+
+    async def scenario():
+        job, _ = await queue.submit(JobRequest(problem=PROBLEM, mode="single"))
+        key = f"jobs:key:{job_key(job)}"
+
+        # The job's record expired while its key lives on
+        store.delete(f"job:{job.id}")
+        fresh, deduplicated = await queue.submit(JobRequest(problem=PROBLEM, mode="single"))
+        assert not deduplicated and fresh.id != job.id
+        assert store.get(key) == fresh.id
+
+        # The job finished but its key is not cleared yet
+        fresh.status = "done"
+        backend._save(fresh, "queued")
+        newest, deduplicated = await queue.submit(JobRequest(problem=PROBLEM, mode="single"))
+        assert not deduplicated and newest.id not in (job.id, fresh.id)
+        assert store.get(key) == newest.id
+
+    asyncio.run(scenario())
+
+
+def test_submissions_stop_retrying_a_key_they_cannot_take(tmp_path):
+    store = NamespacedStore(LocalStateStore(str(tmp_path / "state.db")), "test")
+    backend = StoreJobBackend(store)
+    # A key that is always claimed by someone else between the check and the add
+    store.add = lambda key, value, ttl=None: False
+
+    job, deduplicated = asyncio.run(JobQueue(backend).submit(JobRequest(problem=PROBLEM, mode="single")))
+
+    assert not deduplicated
+    assert store.get(f"jobs:key:{job_key(job)}") == job.id
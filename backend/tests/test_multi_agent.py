@@ -0,0 +1,42 @@
+"""Debate loop: caching, budgets and what lets a round skip the critic"""
+
+import asyncio
+
+from agents.multi_agent import DebateAgents, solve_with_multi_agent
+from services import memo
+from services.cache import MemoryCacheBackend, get_response_cache
+
+PROBLEM = "A meal costs €97. You pay €100, get €3 back, and tip €2. What's the real expense?"
+
+
+def test_budget_stopped_debate_is_not_cached(scripted_debate):
+    _, calls = scripted_debate
+    budgeted = asyncio.run(solve_with_multi_agent(PROBLEM, "mock", token_budget=1))
+    assert budgeted.stats.stop_reason == "token budget"
+    assert get_response_cache().stores == 0
+
+    calls.clear()
+    unbudgeted = asyncio.run(solve_with_multi_agent(PROBLEM, "mock"))
+    assert not unbudgeted.cached
+    assert unbudgeted.stats.stop_reason != "token budget"
+    assert len(calls) > 2
+
+
+def test_finished_debate_is_cached(scripted_debate):
+    first = asyncio.run(solve_with_multi_agent(PROBLEM, "mock"))
+    second = asyncio.run(solve_with_multi_agent(PROBLEM, "mock"))
+    assert not first.cached and second.cached
+    assert second.final_answer == first.final_answer
+
+
+def test_deterministic_mode_keeps_one_proposer_per_model(monkeypatch, scripted_debate):
+    _, calls = scripted_debate
+    monkeypatch.setattr(memo, "_memo", memo.LLMMemo(MemoryCacheBackend(), ttl=60))
+
+    agents = DebateAgents("mock", proposers=3)
+    assert agents.proposers == 1 and agents.proposer_temperatures == [0.0]
+    asyncio.run(agents.solve(PROBLEM))
+    assert [role for role, _, _ in calls].count("proposer") == agents.stats.rounds
+
+    mixed = DebateAgents("mock", proposers=3, proposer_models=["other-model"])
+    assert [backend.model for backend in mixed.proposer_backends] == [mixed.model, "other-model"]
@@ -0,0 +1,27 @@
+"""Debate prompts: the default layout, reported savings and the cache key"""
+
+from agents.multi_agent import DebateAgents
+from agents.prompts import DebatePrompts, PromptSettings
+
+PROBLEM = "A train travels 60 miles per hour for 8 hours. How far does it go?"
+
+
+def test_original_prompts_are_the_default():
+    prompt, saved = DebatePrompts(PROBLEM).proposer()
+    assert prompt.startswith("Solve this problem step by step:")
+    assert saved == 0
+
+
+def test_savings_are_never_negative():
+    prompts = DebatePrompts("A long problem statement. " * 40, PromptSettings(layout="compact"))
+    prompt, saved = prompts.proposer(feedback="VERDICT: INCORRECT\nMY ANSWER: 5", previous="4 apples")
+    assert "4 apples" in prompt
+    assert saved == 0
+
+
+def test_prompt_layout_is_part_of_the_cache_key():
+    full = DebateAgents("mock")
+    compact = DebateAgents("mock", prompt_settings=PromptSettings(layout="compact"))
+    capped = DebateAgents("mock", prompt_settings=PromptSettings(layout="compact", context_chars=300))
+    assert full.topology == full.model
+    assert len({full.topology, compact.topology, capped.topology}) == 3
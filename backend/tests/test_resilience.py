@@ -0,0 +1,104 @@
+"""Provider call layer: error classification, retries and the circuit breaker"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from agents.resilience import (CircuitBreaker, CircuitOpen, ProviderUnavailable, RateLimited, RequestRejected,
+                               ResilienceSettings, ResilientCaller, classify)
+
+
+def status_error(status: int, headers: dict = None) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "https://provider.test/v1/chat/completions")
+    return httpx.HTTPStatusError("error", request=request,
+                                 response=httpx.Response(status, headers=headers, request=request))
+
+
+def caller(**settings) -> ResilientCaller:
+    return ResilientCaller("test", ResilienceSettings(**{"backoff_base": 0.001, "backoff_max": 0.001,
+                                                          "hedge": False, **settings}))
+
+
+def failing(error: Exception, calls: list):
+    async def attempt():
+        calls.append(1)
+        raise error
+    return attempt
+
+
+async def ok():
+    return "ok"
+
+
+def test_classify_by_status():
+    assert isinstance(classify(status_error(503)), ProviderUnavailable)
+    assert isinstance(classify(status_error(401)), RequestRejected)
+    limited = classify(status_error(429, {"Retry-After": "2"}))
+    assert isinstance(limited, RateLimited) and limited.retry_after == 2
+    assert isinstance(classify(httpx.ConnectError("refused")), ProviderUnavailable)
+
+
+def test_transient_errors_are_retried_and_permanent_ones_are_not():
+    calls = []
+    with pytest.raises(ProviderUnavailable):
+        asyncio.run(caller(max_attempts=3).call(failing(status_error(503), calls)))
+    assert len(calls) == 3
+
+    calls.clear()
+    with pytest.raises(RequestRejected):
+        asyncio.run(caller(max_attempts=3).call(failing(status_error(400), calls)))
+    assert len(calls) == 1
+
+
+def test_breaker_opens_after_threshold_and_fails_fast():
+    resilient = caller(max_attempts=1, breaker_threshold=2, breaker_reset=60)
+    calls = []
+    for _ in range(2):
+        with pytest.raises(ProviderUnavailable):
+            asyncio.run(resilient.call(failing(status_error(503), calls)))
+    with pytest.raises(CircuitOpen):
+        asyncio.run(resilient.call(failing(status_error(503), calls)))
+    assert len(calls) == 2 and resilient.breaker.state == "open"
+
+
+def open_breaker(resilient: ResilientCaller):
+    resilient.breaker.failures = resilient.breaker.threshold
+    resilient.breaker.opened_at = -10 ** 9  # Long enough ago that the reset time has passed
+
+
+@pytest.mark.parametrize("trial_error", [status_error(429), status_error(400), asyncio.CancelledError()])
+def test_half_open_trial_that_is_neither_success_nor_failure_frees_the_next_call(trial_error):
+    resilient = caller(max_attempts=1, breaker_threshold=2, breaker_reset=60)
+    open_breaker(resilient)
+    assert resilient.breaker.state == "half_open"
+
+    with pytest.raises((RateLimited, RequestRejected, asyncio.CancelledError)):
+        asyncio.run(resilient.call(failing(trial_error, [])))
+
+    # Before the fix this raised CircuitOpen for another `reset` seconds
+    assert asyncio.run(resilient.call(ok)) == "ok"
+    assert resilient.breaker.state == "closed"
+
+
+def test_half_open_trial_failure_reopens_and_success_closes():
+    resilient = caller(max_attempts=1, breaker_threshold=2, breaker_reset=60)
+    open_breaker(resilient)
+    with pytest.raises(ProviderUnavailable):
+        asyncio.run(resilient.call(failing(status_error(503), [])))
+    assert resilient.breaker.state == "open"
+
+    open_breaker(resilient)
+    assert asyncio.run(resilient.call(ok)) == "ok"
+    assert resilient.breaker.state == "closed" and resilient.breaker.failures == 0
+
+
+def test_only_one_trial_at_a_time():
+    breaker = CircuitBreaker(threshold=1, reset=60)
+    breaker.failure()
+    breaker.opened_at = -10 ** 9
+    assert breaker.check("test") is True
+    with pytest.raises(CircuitOpen):
+        breaker.check("test")
+    breaker.end_trial()
+    assert breaker.check("test") is True
@@ -0,0 +1,58 @@
+"""Request coalescing: one solve for concurrent duplicates, and whose spend it is"""
+
+import asyncio
+
+from models.schemas import AgentResponse, SolveStats
+from services import singleflight
+from services.singleflight import SingleFlight, coalesce
+
+
+def test_followers_share_the_result_but_not_the_spend(monkeypatch):
+    monkeypatch.setattr(singleflight, "_single_flight", SingleFlight())
+    solves = []
+
+    async def solve() -> AgentResponse:
+        solves.append(1)
+        await asyncio.sleep(0.01)
+        stats = SolveStats(llm_calls=2, tokens_used=300, prompt_tokens=200, completion_tokens=100,
+                           cost_usd=0.0015, rounds=1, stop_reason="consensus")
+        return AgentResponse(success=True, final_answer="47", reasoning_steps=[], total_steps=0, stats=stats)
+
+    async def scenario():
+        return await asyncio.gather(*(coalesce("multi:same", solve, "multi") for _ in range(3)))
+
+    leader, *followers = asyncio.run(scenario())
+
+    assert len(solves) == 1
+    assert not leader.coalesced and leader.stats.llm_calls == 2
+    for follower in followers:
+        assert follower.coalesced and follower.final_answer == "47"
+        assert (follower.stats.llm_calls, follower.stats.tokens_used, follower.stats.cost_usd) == (0, 0, 0.0)
+    # The leader's own stats are untouched by the followers' copies
+    assert leader.stats.cost_usd == 0.0015
+
+
+def test_a_flight_is_cancelled_once_nobody_waits_for_it():
+    flights = SingleFlight()
+    cancelled = []
+
+    async def solve() -> AgentResponse:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def scenario():
+        first = asyncio.create_task(flights.do("k", solve))
+        second = asyncio.create_task(flights.do("k", solve))
+        await asyncio.sleep(0.01)
+        # One caller leaves: the other still wants the result
+        first.cancel()
+        await asyncio.sleep(0.01)
+        assert not cancelled and flights.stats()["in_flight"] == 1
+        second.cancel()
+        await asyncio.sleep(0.01)
+        assert cancelled and flights.stats()["in_flight"] == 0
+
+    asyncio.run(scenario())
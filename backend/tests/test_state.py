@@ -0,0 +1,29 @@
+"""Shared state store: per-deployment files and the queue operations jobs use"""
+
+import pytest
+
+from services.state import LocalStateStore, StateSettings, default_path
+
+
+def test_default_path_is_per_deployment():
+    assert default_path("one-app") != default_path("other-app")
+    assert default_path("one-app") == default_path("one-app")
+
+
+@pytest.mark.parametrize("value, shared", [("1", True), ("yes", True), ("On", True), ("0", False), ("off", False)])
+def test_shared_flag_is_parsed_like_other_booleans(monkeypatch, value, shared):
+    monkeypatch.setenv("STATE_SHARED", value)
+    assert StateSettings().shared is shared
+
+
+def test_add_only_sets_a_missing_key_and_queues_are_fifo(tmp_path):
+    store = LocalStateStore(str(tmp_path / "state.db"))
+    assert store.add("owner", "a", ttl=60)
+    assert not store.add("owner", "b", ttl=60)
+    assert store.get("owner") == "a"
+    assert store.add("expired", "a", ttl=-1) and store.add("expired", "b", ttl=60)
+
+    for value in ("first", "second"):
+        store.push("queue", value)
+    assert store.length("queue") == 2
+    assert [store.pop("queue"), store.pop("queue"), store.pop("queue")] == ["first", "second", None]
@@ -0,0 +1,101 @@
+"""Local arithmetic verifier: verdicts, percentages and when it replaces the critic"""
+
+import asyncio
+
+import pytest
+
+from agents.multi_agent import DebateAgents
+from agents.verifier import extract_calculations, safe_eval, verify_solution
+
+MARBLES = ("Tom has twice as many marbles as Jerry. Jerry has 5 more marbles than Bobby. "
+           "If Bobby has 8 marbles, how many marbles do Tom, Jerry, and Bobby have in total?")
+TRAIN = ("A train travels from City A to City B at 60 mph. The return journey from City B to City A "
+         "takes 3 hours at 80 mph. What is the total distance of the round trip?")
+
+
+def test_safe_eval_only_evaluates_arithmetic():
+    assert safe_eval("(3 + 4) * 2 ^ 2") == 28
+    assert safe_eval("__import__('os')") is None
+    assert safe_eval("10 ** 1000") is None
+    assert safe_eval("1 / 0") is None
+
+
+def test_correct_work_is_correct():
+    response = "Jerry: 8 + 5 = 13\nTom: 13 * 2 = 26\nTotal: 26 + 13 + 8 = 47\nMY PROPOSED ANSWER: 47 marbles"
+    assert verify_solution(MARBLES, response, "47 marbles").verdict == "CORRECT"
+
+
+def test_arithmetic_error_is_incorrect():
+    response = "96 / 8 = 12\n12 * 3 = 36\n36 * 12 = 384\nMY PROPOSED ANSWER: 384"
+    verification = verify_solution("perimeter 96, 3 times as long", response, "384")
+    assert verification.verdict == "INCORRECT"
+    assert verification.mismatches == ["36 * 12 = 384 (actually 432)"]
+
+
+@pytest.mark.parametrize("response, answer", [
+    ("Let me think about it.\nMY PROPOSED ANSWER: 47", "47"),           # No calculations
+    ("8 + 5 = 13\n13 * 2 = 26\nMY PROPOSED ANSWER: 50", "50"),          # Answer not computed
+    ("80 * 3 = 240\nMY PROPOSED ANSWER: 240 miles", "240 miles"),       # 60 mph never used
+    ("8 + 5 = 13\n13 * 2 = 26\nMY PROPOSED ANSWER: 13", "13"),          # Answer is not the last result
+    ("8 + 5 = 13\n13 * 2 = 26\n8 + 5 + 2 = 15\nMY PROPOSED ANSWER: 15", "15"),  # 26 goes nowhere
+    ("Total = 8 + 5 = 13\nMY PROPOSED ANSWER: 13", "13"),               # "twice" never used
+])
+def test_unverifiable_work_is_unclear(response, answer):
+    problem = TRAIN if "miles" in answer else MARBLES
+    assert verify_solution(problem, response, answer).verdict == "UNCLEAR"
+
+
+def test_percentages_of_and_as_factors_are_checked():
+    assert extract_calculations("20% of 50 = 10")[0][1] == pytest.approx(10)
+    assert extract_calculations("50 * 20% = 10")[0][1] == pytest.approx(10)
+    assert extract_calculations("10 / 50 = 20%")[0][1] == pytest.approx(20)
+    assert verify_solution("50, 20%", "50 * 20% = 12\nMY PROPOSED ANSWER: 12", "12").verdict == "INCORRECT"
+
+
+@pytest.mark.parametrize("line", ["50 + 20% = 60", "100 - 15% = 85", "50 + 20% + 10 * 2 = 80"])
+def test_ambiguous_percentages_are_unchecked_not_wrong(line):
+    assert extract_calculations(line) == []
+    assert verify_solution("50 and 20%", f"{line}\nMY PROPOSED ANSWER: 60", "60").verdict != "INCORRECT"
+
+
+def test_number_words_in_the_problem_must_be_used():
+    problem = "A garden is half as wide as it is long. It is 30 meters long. What is its area?"
+    assert verify_solution(problem, "30 / 2 = 15\n15 * 30 = 450\nMY PROPOSED ANSWER: 450", "450").verdict == "CORRECT"
+    assert verify_solution(problem, "30 * 0.5 = 15\n15 * 30 = 450\nMY PROPOSED ANSWER: 450", "450").verdict == "CORRECT"
+    assert verify_solution(problem, "30 * 30 = 900\nMY PROPOSED ANSWER: 900", "900").verdict == "UNCLEAR"
+
+
+def test_checked_derivation_skips_the_critic(scripted_debate):
+    replies, calls = scripted_debate
+    replies["proposer"] = "Jerry: 8 + 5 = 13\nTom: 13 * 2 = 26\nTotal: 26 + 13 + 8 = 47\nMY PROPOSED ANSWER: 47"
+
+    result = asyncio.run(DebateAgents(api_key="mock").solve(MARBLES))
+
+    assert [role for role, _, _ in calls] == ["proposer"]
+    assert result.final_answer == "47"
+    assert result.stats.stop_reason == "verified locally"
+    assert result.stats.calls_saved == 1
+
+
+def test_correct_arithmetic_does_not_skip_the_critic(scripted_debate):
+    replies, calls = scripted_debate
+    # Right sum, wrong question: only the critic can tell
+    replies["proposer"] = "Total = 8 + 5 = 13\nMY PROPOSED ANSWER: 13"
+    replies["critic"] = "Tom has 26.\n26 + 13 + 8 = 47\nVERDICT: INCORRECT\nMY ANSWER: 47"
+
+    result = asyncio.run(DebateAgents(api_key="mock").solve(MARBLES))
+
+    assert "critic" in [role for role, _, _ in calls]
+    assert result.final_answer == "47"
+    assert result.stats.stop_reason != "verified locally"
+
+
+def test_arithmetic_errors_are_passed_to_the_critic(scripted_debate):
+    replies, calls = scripted_debate
+    replies["proposer"] = "36 * 12 = 384\nMY PROPOSED ANSWER: 384"
+    replies["critic"] = "VERDICT: INCORRECT\nMY ANSWER: 432"
+
+    asyncio.run(DebateAgents(api_key="mock", max_rounds=1).solve("perimeter 96, 3 times as long"))
+
+    critic_prompt = next(prompt for role, prompt, _ in calls if role == "critic")
+    assert "36 * 12 = 384 (actually 432)" in critic_prompt
@@ -0,0 +1,61 @@
+"""
+Job Worker - Run queued solves outside the API processes
+The API starts JOBS_WORKERS worker tasks of its own. To scale workers
+separately, set JOBS_WORKERS=0 on the API, point the API and the workers at
+the same shared queue (JOBS_BACKEND=sqlite, JOBS_PATH=..., or the shared
+state store with STATE_SHARED=true) and start as many worker processes as
+needed.
+
+Usage (from the backend directory):
+    JOBS_BACKEND=sqlite python worker.py --concurrency 8
+    STATE_SHARED=true STATE_BACKEND=redis python worker.py --concurrency 8
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+from dotenv import load_dotenv
+
+from agents.backends import api_key_variable
+from agents.clients import close_client_registry
+from agents.multi_agent import solve_with_multi_agent
+from agents.single_agent import solve_with_single_agent
+from models.schemas import AgentResponse, Job
+from services.jobs import MemoryJobBackend, SQLiteJobBackend, get_job_queue
+
+load_dotenv()
+
+
+async def solve_job(job: Job) -> AgentResponse:
+    """Run a job's solve with the API key its model backend needs from the environment"""
+    variable = api_key_variable(job.mode)
+    api_key = os.getenv(variable) if variable else None
+    if job.mode == "single":
+        return await solve_with_single_agent(job.problem, api_key)
+    return await solve_with_multi_agent(job.problem, api_key, job.latency_budget_ms, job.token_budget)
+
+
+async def main(concurrency: int):
+    try:
+        await asyncio.gather(*get_job_queue().start_workers(solve_job, concurrency))
+    finally:
+        await close_client_registry()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run job queue workers")
+    parser.add_argument("--concurrency", type=int, default=4, help="Jobs solved at once by this process")
+    args = parser.parse_args()
+
+    backend = get_job_queue().backend
+    if isinstance(backend, MemoryJobBackend):
+        sys.exit("The in-process job queue cannot be shared with the API; "
+                 "set JOBS_BACKEND=sqlite or STATE_SHARED=true")
+    source = backend.path if isinstance(backend, SQLiteJobBackend) else "the shared state store"
+    print(f"Worker running {args.concurrency} jobs at a time from {source}")
+    try:
+        asyncio.run(main(args.concurrency))
+    except KeyboardInterrupt:
+        pass